@@ -11,7 +11,7 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
-# 初始化 Excel
+# 初始化数据存储
 init_excel()
 
 st.title(f"{PAGE_ICON} {PAGE_TITLE}")
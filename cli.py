@@ -7,7 +7,8 @@ from core.calculator import (
     generate_schedule,
     generate_combined_schedule,
     calc_irr,
-    calc_remaining_irr
+    calc_remaining_irr,
+    calc_remaining_irr_curve,
 )
 from data_manager.excel_handler import (
     get_all_plans,
@@ -99,6 +100,34 @@ def calc_remaining_irr_command(remaining_principal, schedule_file):
     irr = calc_remaining_irr(remaining_principal, schedule)
     click.echo(f"Remaining IRR: {irr:.4f}%")
 
+@cli.command('remaining-irr-curve')
+@click.option('--plan-id', type=str, help='Plan ID (uses the stored plan and its events)')
+@click.option('--schedule-file', type=click.Path(exists=True), help='Path to a repayment schedule CSV file')
+def remaining_irr_curve_command(plan_id, schedule_file):
+    """Calculates the remaining IRR at every period."""
+    if schedule_file:
+        schedule = pd.read_csv(schedule_file)
+    elif plan_id:
+        schedule = get_plan_schedule(plan_id)
+    else:
+        raise click.UsageError("Either --plan-id or --schedule-file is required.")
+    curve = calc_remaining_irr_curve(schedule)
+    click.echo(curve.to_csv(index=False))
+
+@cli.command('export-schedules')
+@click.option('--output-dir', type=click.Path(file_okay=False), required=True, help='Directory for one CSV per plan')
+@click.argument('plan_ids', nargs=-1)
+def export_schedules_command(output_dir, plan_ids):
+    """Exports the repayment schedules of the given plans (all plans by default) as CSV files."""
+    from pathlib import Path
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    if not plan_ids:
+        plan_ids = get_all_plans()["plan_id"].tolist()
+    for plan_id in plan_ids:
+        get_plan_schedule(plan_id).to_csv(out / f"{plan_id}.csv", index=False)
+    click.echo(f"Exported {len(plan_ids)} schedule(s) to '{output_dir}'.")
+
 @cli.command('list-plans')
 def list_plans():
     """Lists all loan plans."""
@@ -255,6 +284,57 @@ def set_config_command(key, value, description):
     set_config(key, value, description)
     click.echo(f"Config with key '{key}' set successfully.")
 
+@cli.command('import-excel')
+@click.argument('excel_file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--db-file', type=click.Path(dir_okay=False), help='SQLite database (defaults to the configured one)')
+def import_excel_command(excel_file, db_file):
+    """Replaces the SQLite store's contents with an Excel workbook."""
+    from pathlib import Path
+    from config.settings import SQLITE_FILE
+    from data_manager.sqlite_handler import import_excel
+    import_excel(Path(excel_file), Path(db_file) if db_file else SQLITE_FILE)
+    click.echo(f"Imported '{excel_file}'.")
+
+@cli.command('export-excel')
+@click.argument('excel_file', type=click.Path(dir_okay=False))
+@click.option('--db-file', type=click.Path(dir_okay=False), help='SQLite database (defaults to the configured one)')
+def export_excel_command(excel_file, db_file):
+    """Exports the SQLite store to an Excel workbook."""
+    from pathlib import Path
+    from config.settings import SQLITE_FILE
+    from data_manager.sqlite_handler import export_excel
+    export_excel(Path(excel_file), Path(db_file) if db_file else SQLITE_FILE)
+    click.echo(f"Exported to '{excel_file}'.")
+
+@cli.command('list-backups')
+@click.option('--file', 'data_file', type=click.Path(dir_okay=False), help='Data file (defaults to the configured one)')
+def list_backups_command(data_file):
+    """Lists the backup snapshots of the data file."""
+    from pathlib import Path
+    from config.settings import DATA_FILE
+    from data_manager.backup import list_snapshots
+    snapshots = list_snapshots(Path(data_file) if data_file else DATA_FILE)
+    if not snapshots:
+        click.echo("No backups found.")
+        return
+    click.echo(pd.DataFrame(snapshots).to_string(index=False))
+
+@cli.command('restore-backup')
+@click.option('--snapshot-id', type=str, help='Snapshot to restore (defaults to the latest)')
+@click.option('--file', 'data_file', type=click.Path(dir_okay=False), help='Data file (defaults to the configured one)')
+@click.confirmation_option(prompt='This overwrites the current data file. Continue?')
+def restore_backup_command(snapshot_id, data_file):
+    """Restores the data file from a backup snapshot."""
+    from pathlib import Path
+    from config.settings import DATA_FILE
+    from data_manager.excel_handler import restore_backup
+    filepath = Path(data_file) if data_file else DATA_FILE
+    try:
+        restored = restore_backup(snapshot_id, filepath)
+    except KeyError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Restored snapshot '{restored['snapshot_id']}' ({restored['created_at']}).")
+
 @cli.command('compare-plans')
 @click.argument('plan_ids', nargs=-1)
 def compare_plans_command(plan_ids):
@@ -511,3 +511,210 @@ def create_separate_principal_interest_lines(
         template=template,
     )
     return fig
+
+
+def create_savings_heatmap(
+    saved: pd.DataFrame,
+    title: str = "提前还款节省利息",
+    template: str = "loan_dashboard_light",
+) -> go.Figure:
+    """提前还款节省利息热力图（行=提前还款期数，列=提前还款金额）"""
+    fig = go.Figure(go.Heatmap(
+        x=saved.columns,
+        y=saved.index,
+        z=saved.values,
+        colorscale="Viridis",
+        colorbar=dict(title="节省(元)"),
+        hovertemplate="第%{y}期 还款%{x:,.0f}元<br>节省利息: %{z:,.2f}元<extra></extra>",
+    ))
+
+    fig.update_layout(
+        title=title,
+        xaxis_title="提前还款金额(元)",
+        yaxis_title="期数",
+        margin=dict(t=60, b=60, l=60, r=20),
+        height=450,
+        template=template,
+    )
+    return fig
+
+
+def create_fan_chart(
+    percentiles: pd.DataFrame,
+    title: str = "分位数扇形图",
+    y_label: str = "金额(元)",
+    x_labels: list = None,
+    template: str = "loan_dashboard_light",
+) -> go.Figure:
+    """
+    扇形图：percentiles 行为期数、列为分位（升序，如 5/25/50/75/95），
+    由外向内成对填充分位区间，中位数画实线。
+    """
+    x = x_labels if x_labels is not None else percentiles.index
+    qs = list(percentiles.columns)
+    fig = go.Figure()
+
+    for i in range(len(qs) // 2):
+        lo, hi = qs[i], qs[-1 - i]
+        opacity = 0.15 + 0.2 * i
+        fig.add_trace(go.Scatter(
+            x=x, y=percentiles[hi], mode="lines", line=dict(width=0),
+            showlegend=False, hoverinfo="skip",
+        ))
+        fig.add_trace(go.Scatter(
+            x=x, y=percentiles[lo], mode="lines", line=dict(width=0),
+            fill="tonexty", fillcolor=f"rgba(31,119,180,{opacity:.2f})",
+            name=f"P{lo:g}–P{hi:g}",
+            hovertemplate="%{x}<br>%{y:,.2f}<extra></extra>",
+        ))
+
+    if len(qs) % 2:
+        mid = qs[len(qs) // 2]
+        fig.add_trace(go.Scatter(
+            x=x, y=percentiles[mid], mode="lines", name=f"P{mid:g}（中位数）",
+            line=dict(color=COLORS["primary"], width=2),
+            hovertemplate="%{x}<br>%{y:,.2f}<extra></extra>",
+        ))
+
+    fig.update_layout(
+        title=title,
+        xaxis_title="期数",
+        yaxis_title=y_label,
+        hovermode="x unified",
+        margin=dict(t=60, b=60, l=60, r=20),
+        height=400,
+        xaxis=dict(
+            tickmode="auto",
+            nticks=15,
+            tickangle=45,
+        ),
+        template=template,
+    )
+    return fig
+
+
+def create_remaining_irr_line(curve: pd.DataFrame, prepayment_periods: list = None, template: str = "loan_dashboard_light") -> go.Figure:
+    """各期剩余年化率(IRR)与执行利率对比曲线"""
+    fig = go.Figure()
+    x_labels = _get_x_labels(curve)
+
+    fig.add_trace(go.Scatter(
+        x=x_labels,
+        y=curve["remaining_irr"],
+        mode="lines",
+        name="剩余年化率(IRR)",
+        line=dict(color=COLORS["primary"], width=2),
+        hovertemplate="%{x}<br>剩余年化率: %{y:.4f}%<extra></extra>",
+    ))
+    fig.add_trace(go.Scatter(
+        x=x_labels,
+        y=curve["applied_rate"],
+        mode="lines",
+        name="执行利率",
+        line=dict(color=COLORS["secondary"], width=2, dash="dash"),
+        hovertemplate="%{x}<br>执行利率: %{y:.2f}%<extra></extra>",
+    ))
+
+    # 标注提前还款点
+    if prepayment_periods:
+        pp_mask = curve["period"].isin(prepayment_periods).to_numpy()
+        fig.add_trace(go.Scatter(
+            x=[x for x, m in zip(x_labels, pp_mask) if m],
+            y=curve.loc[pp_mask, "remaining_irr"],
+            mode="markers",
+            name="提前还款",
+            marker=dict(color=COLORS["danger"], size=12, symbol="star"),
+        ))
+
+    fig.update_layout(
+        title="剩余年化率变化",
+        xaxis_title="期数",
+        yaxis_title="年化率(%)",
+        hovermode="x unified",
+        margin=dict(t=60, b=60, l=60, r=20),
+        height=400,
+        xaxis=dict(
+            tickmode="auto",
+            nticks=15,
+            tickangle=45,
+        ),
+        template=template,
+    )
+    return fig
+
+
+def create_real_cost_bands(bands: pd.DataFrame, template: str = "loan_dashboard_light") -> go.Figure:
+    """各方案实际总还款区间（P5–P95 误差线，点为中位数）与名义总还款对比"""
+    fig = go.Figure()
+    names = bands.index.astype(str).tolist()
+
+    fig.add_trace(go.Bar(
+        name="名义总还款",
+        x=names,
+        y=bands["nominal_total_payment"],
+        marker_color=COLORS["primary"],
+        opacity=0.4,
+    ))
+    fig.add_trace(go.Scatter(
+        name="实际总还款（P50，P5–P95）",
+        x=names,
+        y=bands["real_total_payment_p50"],
+        mode="markers",
+        marker=dict(color=COLORS["interest"], size=12),
+        error_y=dict(
+            type="data",
+            symmetric=False,
+            array=bands["real_total_payment_p95"] - bands["real_total_payment_p50"],
+            arrayminus=bands["real_total_payment_p50"] - bands["real_total_payment_p5"],
+        ),
+        hovertemplate="%{x}<br>%{y:,.2f}元<extra></extra>",
+    ))
+
+    fig.update_layout(
+        title="通胀情景下的实际总还款",
+        yaxis_title="金额(元)",
+        margin=dict(t=60, b=40, l=60, r=20),
+        height=400,
+        template=template,
+    )
+    return fig
+
+
+def create_pareto_scatter(
+    table: pd.DataFrame,
+    front: pd.DataFrame,
+    x_col: str,
+    y_col: str,
+    template: str = "loan_dashboard_light",
+) -> go.Figure:
+    """全部候选方案散点，Pareto 前沿高亮连线"""
+    fig = go.Figure()
+
+    fig.add_trace(go.Scattergl(
+        x=table[x_col],
+        y=table[y_col],
+        mode="markers",
+        name="候选方案",
+        marker=dict(color=COLORS["primary"], size=5, opacity=0.35),
+        hovertemplate=f"{x_col}: %{{x:,.2f}}<br>{y_col}: %{{y:,.2f}}<extra></extra>",
+    ))
+    front = front.sort_values(x_col)
+    fig.add_trace(go.Scatter(
+        x=front[x_col],
+        y=front[y_col],
+        mode="lines+markers",
+        name="Pareto 前沿",
+        line=dict(color=COLORS["danger"], width=2),
+        marker=dict(size=8),
+        hovertemplate=f"{x_col}: %{{x:,.2f}}<br>{y_col}: %{{y:,.2f}}<extra></extra>",
+    ))
+
+    fig.update_layout(
+        title="Pareto 前沿",
+        xaxis_title=x_col,
+        yaxis_title=y_col,
+        margin=dict(t=60, b=60, l=60, r=20),
+        height=450,
+        template=template,
+    )
+    return fig
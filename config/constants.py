@@ -39,11 +39,42 @@ class PrepaymentMethod(str, Enum):
         }[self.value]
 
 
+class PlanObjective(str, Enum):
+    MAX_INTEREST_SAVED = "max_interest_saved"  # 节省利息最多
+    EARLIEST_PAYOFF = "earliest_payoff"  # 最早还清
+
+    @property
+    def label(self) -> str:
+        return {
+            "max_interest_saved": "节省利息最多",
+            "earliest_payoff": "最早还清",
+        }[self.value]
+
+
 class RateType(str, Enum):
     COMMERCIAL = "commercial"
     PROVIDENT = "provident"
 
 
+class MoneyMode(str, Enum):
+    FLOAT = "float"  # 浮点（元）
+    FEN = "fen"  # 整数分定点
+
+
+class RoundingRule(str, Enum):
+    HALF_UP = "half_up"  # 四舍五入
+    HALF_EVEN = "half_even"  # 银行家舍入
+    DOWN = "down"  # 截断
+
+    @property
+    def label(self) -> str:
+        return {
+            "half_up": "四舍五入",
+            "half_even": "银行家舍入",
+            "down": "截断",
+        }[self.value]
+
+
 class PlanStatus(str, Enum):
     ACTIVE = "active"
     COMPLETED = "completed"
@@ -6,8 +6,32 @@ PROJECT_ROOT = Path(__file__).parent.parent
 # 数据文件路径
 DATA_DIR = PROJECT_ROOT / "data"
 EXCEL_FILE = DATA_DIR / "loan_data.xlsx"
+SQLITE_FILE = DATA_DIR / "loan_data.db"
+
+# 存储后端："excel" / "sqlite"；sqlite 时 Excel 仅作导入导出格式
+STORAGE_BACKEND = "excel"
+DATA_FILE = SQLITE_FILE if STORAGE_BACKEND == "sqlite" else EXCEL_FILE
+
+# 物化还款计划的磁盘缓存（按方案及事件指纹失效）
+SCHEDULE_STORE_ENABLED = True
+SCHEDULE_STORE_DIR = DATA_DIR / "schedule_store"
+
+# 并发：等待跨进程写锁的秒数；版本冲突时读-改-写操作的重试次数
+LOCK_TIMEOUT = 30.0
+WRITE_RETRIES = 5
+
+# Excel 事件日志：后台压缩间隔(秒)，以及触发立即压缩的追加条数
+JOURNAL_COMPACT_INTERVAL = 30.0
+JOURNAL_COMPACT_THRESHOLD = 200
 BACKUP_DIR = DATA_DIR
 
+# 备份：存于数据文件同目录下的子目录；按数量和天数保留；写入突发合并为一次快照
+BACKUP_SUBDIR = "backups"
+BACKUP_KEEP_COUNT = 20
+BACKUP_MAX_AGE_DAYS = 30
+BACKUP_COALESCE_SECONDS = 2.0
+BACKUP_MAX_DELAY_SECONDS = 30.0
+
 # 默认利率 (%)
 DEFAULT_COMMERCIAL_RATE = 3.45
 DEFAULT_PROVIDENT_RATE = 2.85
@@ -43,3 +67,8 @@ COLORS = {
 # 金额精度
 AMOUNT_PRECISION = 2
 RATE_PRECISION = 4
+
+# 还款计划计算模式："float" 浮点（默认）/ "fen" 整数分定点，与银行对账单逐分一致
+MONEY_MODE = "float"
+# 整数分模式下每期金额的舍入规则："half_up" / "half_even" / "down"，最后一期吸收尾差
+FEN_ROUNDING = "half_up"
@@ -0,0 +1,228 @@
+"""批量还款计划：一次计算成千上万笔贷款的还款计划（二维向量化）"""
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, Iterable, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from config import settings
+from config.constants import MoneyMode, RepaymentMethod
+from core.fixed_point import amortize_fen_2d, to_fen
+from utils.date_utils import clamp_due_dates
+
+MONEY_COLUMNS = [
+    "monthly_payment", "principal", "interest", "remaining_principal",
+    "cumulative_principal", "cumulative_interest",
+]
+
+# 每块处理的贷款笔数，控制中间数组的内存峰值
+DEFAULT_CHUNK_SIZE = 512
+
+
+@dataclass
+class BatchSchedule:
+    """
+    N 笔贷款的列式还款计划。
+
+    money 中每列为 N×T 的 float64 数组（T 为最长期数；整数分模式下为 int64 分），
+    超出各自期数的位置流量为 0、累计值沿用最后一期，mask 标记有效期次。
+    """
+    term_months: np.ndarray
+    mask: np.ndarray
+    money: Dict[str, np.ndarray]
+    due_date: Optional[np.ndarray] = None
+    fen: bool = False
+    period: np.ndarray = field(init=False)
+
+    def __post_init__(self):
+        self.period = np.arange(1, self.mask.shape[1] + 1, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.term_months)
+
+    def __getitem__(self, col: str) -> np.ndarray:
+        return self.money[col]
+
+    def total_payment(self) -> np.ndarray:
+        return self.money["monthly_payment"].sum(axis=1)
+
+    def total_interest(self) -> np.ndarray:
+        return self.money["interest"].sum(axis=1)
+
+    def to_frame(self) -> pd.DataFrame:
+        """转为长表：每行一笔贷款的一期，loan_index 标识贷款序号"""
+        loan_idx, period_idx = np.nonzero(self.mask)
+        data = {
+            "loan_index": loan_idx,
+            "period": self.period[period_idx],
+        }
+        if self.due_date is not None:
+            data["due_date"] = self.due_date[loan_idx, period_idx]
+        for col, values in self.money.items():
+            data[col] = values[loan_idx, period_idx]
+        return pd.DataFrame(data)
+
+
+def _as_method_mask(repayment_methods: Union[str, Sequence[str]], n: int) -> np.ndarray:
+    """返回是否等额本息的布尔数组"""
+    if isinstance(repayment_methods, str):
+        return np.full(n, repayment_methods == RepaymentMethod.EQUAL_INSTALLMENT.value)
+    return np.asarray(repayment_methods) == RepaymentMethod.EQUAL_INSTALLMENT.value
+
+
+def _broadcast(values, n: int, dtype) -> np.ndarray:
+    arr = np.asarray(values, dtype=dtype)
+    if arr.ndim == 0:
+        arr = np.full(n, arr, dtype=dtype)
+    return arr
+
+
+def _amortize_2d(
+    principal: np.ndarray,
+    r: np.ndarray,
+    term: np.ndarray,
+    is_ei: np.ndarray,
+    width: int,
+    columns: Sequence[str],
+) -> Dict[str, np.ndarray]:
+    """二维闭式摊还，与 core.calculator._amortize 逐笔结果一致"""
+    n = len(principal)
+    k = np.arange(width, dtype=np.float64)
+    opening = np.empty((n, width), dtype=np.float64)
+    prin = np.empty((n, width), dtype=np.float64)
+    annuity = np.zeros(n, dtype=np.float64)
+
+    ei = np.flatnonzero(is_ei)
+    if len(ei):
+        P, rr, nn = principal[ei], r[ei], term[ei]
+        zero_rate = rr == 0
+        safe_r = np.where(zero_rate, 1.0, rr)
+        grow_n = np.exp(np.log1p(rr) * nn)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            a = np.where(zero_rate, P / nn, P * rr * grow_n / (grow_n - 1))
+        annuity[ei] = a
+        # 期初余额 = P(1+r)^k - M((1+r)^k - 1)/r = (1+r)^k (P - M/r) + M/r
+        c = np.where(zero_rate, 0.0, a / safe_r)
+        block = np.exp(np.outer(np.log1p(rr), k))
+        block *= (P - c)[:, None]
+        block += c[:, None]
+        if zero_rate.any():
+            zr = np.flatnonzero(zero_rate)
+            block[zr] = P[zr, None] - k * a[zr, None]
+        opening[ei] = block
+        prin[ei] = a[:, None] - block * rr[:, None]
+
+    ep = np.flatnonzero(~is_ei)
+    if len(ep):
+        base = principal[ep] / term[ep]
+        opening[ep] = principal[ep, None] - k * base[:, None]
+        prin[ep] = base[:, None]
+
+    interest = opening * r[:, None]
+
+    # 最后一期尾差调整
+    rows = np.arange(n)
+    last = term - 1
+    prin[rows, last] = opening[rows, last]
+    interest[ei, last[ei]] = annuity[ei] - opening[ei, last[ei]]
+
+    mask = k[None, :] < term[:, None]
+    if not mask.all():
+        prin[~mask] = 0.0
+        interest[~mask] = 0.0
+
+    out = {"mask": mask}
+    if "monthly_payment" in columns:
+        out["monthly_payment"] = prin + interest
+    if "remaining_principal" in columns:
+        remaining = opening
+        remaining -= prin
+        remaining[(remaining < 0.005) | ~mask] = 0.0
+        out["remaining_principal"] = remaining
+    out["principal"] = prin
+    out["interest"] = interest
+    if "cumulative_principal" in columns:
+        out["cumulative_principal"] = np.cumsum(prin, axis=1)
+    if "cumulative_interest" in columns:
+        out["cumulative_interest"] = np.cumsum(interest, axis=1)
+    return out
+
+
+def generate_schedules_batch(
+    principals: Iterable[float],
+    annual_rates: Union[float, Iterable[float]],
+    term_months: Union[int, Iterable[int]],
+    repayment_methods: Union[str, Sequence[str]],
+    start_dates: Union[date, Sequence[date], np.ndarray, None] = None,
+    repayment_days: Union[int, Iterable[int]] = 1,
+    columns: Optional[Sequence[str]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    money_mode: Optional[str] = None,
+) -> BatchSchedule:
+    """
+    批量生成 N 笔贷款的还款计划。
+
+    Args:
+        principals: 各笔贷款本金
+        annual_rates: 年利率(%)，标量或长度 N
+        term_months: 期数，标量或长度 N
+        repayment_methods: 还款方式，标量或长度 N
+        start_dates: 起始日期，标量或长度 N；为 None 时不计算还款日
+        repayment_days: 还款日，标量或长度 N
+        columns: 需要输出的金额列（默认全部），只取部分列可显著降低内存
+        chunk_size: 分块大小
+        money_mode: "fen" 时按整数分定点计算，金额列为 int64 分；默认取 settings.MONEY_MODE
+
+    Returns:
+        BatchSchedule，金额列为 N×T 数组
+
+    Raises:
+        ValueError: 存在小于 1 的期数，或 columns 含未知列名
+    """
+    principal = np.asarray(principals, dtype=np.float64).ravel()
+    n = len(principal)
+    annual_rate = _broadcast(annual_rates, n, np.float64)
+    r = annual_rate / 100 / 12
+    term = _broadcast(term_months, n, np.int64)
+    is_ei = _as_method_mask(repayment_methods, n)
+    columns = list(columns) if columns is not None else MONEY_COLUMNS
+    if (term < 1).any():
+        bad = np.flatnonzero(term < 1)
+        raise ValueError(f"期数必须至少为 1：第 {bad.tolist()[:10]} 笔贷款的期数为 {term[bad].tolist()[:10]}")
+    unknown = [col for col in columns if col not in MONEY_COLUMNS]
+    if unknown:
+        raise ValueError(f"未知的金额列 {unknown}，可选 {MONEY_COLUMNS}")
+    width = int(term.max()) if n else 0
+
+    fen = (money_mode or settings.MONEY_MODE) == MoneyMode.FEN.value
+    if fen:
+        principal = to_fen(principal)
+
+    money = {col: np.empty((n, width), dtype=np.int64 if fen else np.float64) for col in columns}
+    mask = np.empty((n, width), dtype=bool)
+    for lo in range(0, n, chunk_size):
+        hi = min(lo + chunk_size, n)
+        if fen:
+            part = amortize_fen_2d(
+                principal[lo:hi], annual_rate[lo:hi], term[lo:hi], is_ei[lo:hi], width,
+                settings.FEN_ROUNDING,
+            )
+        else:
+            part = _amortize_2d(principal[lo:hi], r[lo:hi], term[lo:hi], is_ei[lo:hi], width, columns)
+        mask[lo:hi] = part["mask"]
+        for col in columns:
+            money[col][lo:hi] = part[col]
+
+    due_date = None
+    if start_dates is not None:
+        start_months = _broadcast(
+            np.asarray(start_dates, dtype="datetime64[D]").astype("datetime64[M]"),
+            n, "datetime64[M]",
+        )
+        days = _broadcast(repayment_days, n, np.int64)
+        months = start_months[:, None] + np.arange(1, width + 1)
+        due_date = clamp_due_dates(months, days[:, None])
+        due_date[~mask] = np.datetime64("NaT")
+
+    return BatchSchedule(term_months=term, mask=mask, money=money, due_date=due_date, fen=fen)
@@ -1,14 +1,43 @@
 """核心计算：等额本息、等额本金、IRR、组合贷"""
-import math
 from datetime import date
+from functools import lru_cache
 from typing import List, Dict, Tuple
 
 import numpy as np
 import pandas as pd
 from scipy import optimize
 
-from config.constants import RepaymentMethod, LoanType, REPAYMENT_SCHEDULE_COLUMNS
-from utils.date_utils import get_due_date
+from config import settings
+from config.constants import RepaymentMethod, LoanType, MoneyMode
+from core.fixed_point import amortize_fen, to_fen, to_yuan
+from core.schedule import Schedule, MONEY_COLUMNS
+from utils.date_utils import format_dates, get_due_dates
+
+
+@lru_cache(maxsize=4096)
+def _annuity_entry(annual_rate: float, term_months: int) -> float:
+    r = annual_rate / 100 / 12
+    if r == 0:
+        return 1 / term_months
+    growth = (1 + r) ** term_months
+    return r * growth / (growth - 1)
+
+
+def annuity_factor(annual_rate, term_months):
+    """
+    等额本息年金系数（每元本金的月供）r(1+r)^n / ((1+r)^n - 1)，零利率为 1/n。
+    按 (年利率, 期数) 查表缓存；数组输入只对不同的组合各算一次，返回同形状数组。
+    """
+    rate_arr, term_arr = np.broadcast_arrays(
+        np.asarray(annual_rate, dtype=np.float64), np.asarray(term_months, dtype=np.int64),
+    )
+    if rate_arr.ndim == 0:
+        return _annuity_entry(float(rate_arr), int(term_arr))
+    pairs, inverse = np.unique(
+        np.stack([rate_arr.ravel(), term_arr.ravel().astype(np.float64)]), axis=1, return_inverse=True,
+    )
+    table = np.array([_annuity_entry(float(rate), int(term)) for rate, term in pairs.T])
+    return table[inverse.ravel()].reshape(rate_arr.shape)
 
 
 def calc_equal_installment(
@@ -20,12 +49,16 @@ def calc_equal_installment(
     if annual_rate == 0:
         monthly = principal / term_months
         return monthly, 0.0
-    r = annual_rate / 100 / 12
-    monthly = principal * r * (1 + r) ** term_months / ((1 + r) ** term_months - 1)
+    monthly = principal * annuity_factor(annual_rate, term_months)
     total_interest = monthly * term_months - principal
     return monthly, total_interest
 
 
+def equal_principal_total_interest(principal, annual_rate, term_months):
+    """等额本金总利息（等差数列求和）：P·r·(n+1)/2，支持标量或数组"""
+    return principal * (annual_rate / 100 / 12) * (term_months + 1) / 2
+
+
 def calc_equal_principal_first_month(
     principal: float,
     annual_rate: float,
@@ -36,84 +69,192 @@ def calc_equal_principal_first_month(
         monthly = principal / term_months
         return monthly, 0.0
     r = annual_rate / 100 / 12
-    base_principal = principal / term_months
-    first_interest = principal * r
-    first_monthly = base_principal + first_interest
-    total_interest = sum(
-        (principal - i * base_principal) * r for i in range(term_months)
-    )
-    return first_monthly, total_interest
+    first_monthly = principal / term_months + principal * r
+    return first_monthly, equal_principal_total_interest(principal, annual_rate, term_months)
 
 
-def generate_schedule(
-    plan_id: str,
+def _amortize(
     principal: float,
     annual_rate: float,
     term_months: int,
     repayment_method: str,
-    start_date: date,
-    repayment_day: int = 1,
-    start_period: int = 1,
-    existing_cumulative_principal: float = 0.0,
-    existing_cumulative_interest: float = 0.0,
-) -> pd.DataFrame:
-    """生成还款计划表"""
+    base_principal: float = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    向量化摊还核心：闭式一次性计算所有期次。
+    返回 (月供, 本金, 利息, 剩余本金) 四个长度为 term_months 的数组。
+
+    base_principal 仅用于等额本金，指定每期固定本金（默认 principal / term_months），
+    最后一期本金统一取剩余本金（尾差调整）。
+    """
     r = annual_rate / 100 / 12
-    records = []
-    remaining = principal
-    cum_principal = existing_cumulative_principal
-    cum_interest = existing_cumulative_interest
+    k = np.arange(term_months, dtype=np.float64)
 
     if repayment_method == RepaymentMethod.EQUAL_INSTALLMENT.value:
         if r == 0:
             monthly_payment = principal / term_months
+            opening = principal - k * monthly_payment
         else:
+            growth = (1 + r) ** k
             monthly_payment = principal * r * (1 + r) ** term_months / ((1 + r) ** term_months - 1)
+            opening = principal * growth - monthly_payment * (growth - 1) / r
+        interest = opening * r
+        prin = monthly_payment - interest
+        # 最后一期尾差调整
+        prin[-1] = opening[-1]
+        interest[-1] = monthly_payment - prin[-1]
+        payment = prin + interest
     else:
-        base_principal = principal / term_months
+        base = principal / term_months if base_principal is None else base_principal
+        opening = principal - k * base
+        interest = opening * r
+        prin = np.full(term_months, base, dtype=np.float64)
+        # 最后一期尾差调整
+        prin[-1] = opening[-1]
+        payment = prin + interest
+
+    remaining = opening - prin
+    remaining[remaining < 0.005] = 0.0
+    return payment, prin, interest, remaining
+
+
+def _resolve_money_mode(money_mode: str = None) -> str:
+    return money_mode or settings.MONEY_MODE
 
-    for i in range(term_months):
-        period = start_period + i
-        due = get_due_date(start_date, i + 1, repayment_day)
 
-        if repayment_method == RepaymentMethod.EQUAL_INSTALLMENT.value:
-            interest = remaining * r if r > 0 else 0
-            prin = monthly_payment - interest
-            payment = monthly_payment
+class Segment:
+    """
+    一段摊还计划：自 start_period 起，以 principal 按 annual_rate、repayment_method 摊还 term 期，
+    累计本金/利息自 cumulative_principal / cumulative_interest 起算。列在首次访问时生成并缓存。
+    """
+    __slots__ = (
+        "start_period", "principal", "annual_rate", "term", "repayment_method",
+        "start_date", "repayment_day", "base_principal",
+        "cumulative_principal", "cumulative_interest", "money_mode", "rounding", "_columns",
+    )
+
+    def __init__(
+        self,
+        start_period: int,
+        principal: float,
+        annual_rate: float,
+        term: int,
+        repayment_method: str,
+        start_date: date,
+        repayment_day: int,
+        base_principal: float = None,
+        cumulative_principal: float = 0.0,
+        cumulative_interest: float = 0.0,
+        money_mode: str = MoneyMode.FLOAT.value,
+        rounding: str = None,
+    ):
+        self.start_period = int(start_period)
+        self.principal = principal
+        self.annual_rate = annual_rate
+        self.term = int(term)
+        self.repayment_method = repayment_method
+        self.start_date = start_date
+        self.repayment_day = repayment_day
+        self.base_principal = base_principal
+        self.cumulative_principal = cumulative_principal
+        self.cumulative_interest = cumulative_interest
+        self.money_mode = money_mode
+        self.rounding = rounding
+        self._columns = None
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        if self._columns is None:
+            self._columns = self._generate()
+        return self._columns
+
+    def _generate(self) -> Dict[str, np.ndarray]:
+        if self.money_mode == MoneyMode.FEN.value:
+            payment, prin, interest, remaining = amortize_fen(
+                to_fen(self.principal), self.annual_rate, self.term, self.repayment_method,
+                None if self.base_principal is None else to_fen(self.base_principal),
+                self.rounding,
+            )
+            cumulative_principal = to_yuan(to_fen(self.cumulative_principal) + np.cumsum(prin))
+            cumulative_interest = to_yuan(to_fen(self.cumulative_interest) + np.cumsum(interest))
+            payment, prin, interest, remaining = (
+                to_yuan(payment), to_yuan(prin), to_yuan(interest), to_yuan(remaining),
+            )
         else:
-            interest = remaining * r if r > 0 else 0
-            prin = base_principal
-            payment = prin + interest
+            payment, prin, interest, remaining = _amortize(
+                self.principal, self.annual_rate, self.term, self.repayment_method, self.base_principal,
+            )
+            cumulative_principal = self.cumulative_principal + np.cumsum(prin)
+            cumulative_interest = self.cumulative_interest + np.cumsum(interest)
 
-        # 最后一期尾差调整
-        if i == term_months - 1:
-            prin = remaining
-            interest = payment - prin if repayment_method == RepaymentMethod.EQUAL_INSTALLMENT.value else remaining * r
-            payment = prin + interest
-
-        remaining -= prin
-        if remaining < 0.005:
-            remaining = 0.0
-
-        cum_principal += prin
-        cum_interest += interest
-
-        records.append({
-            "plan_id": plan_id,
-            "period": period,
-            "due_date": due.strftime("%Y-%m-%d"),
+        columns = {
+            "period": np.arange(self.start_period, self.start_period + self.term, dtype=np.int32),
+            "due_date": get_due_dates(self.start_date, self.term, self.repayment_day),
             "monthly_payment": payment,
             "principal": prin,
             "interest": interest,
             "remaining_principal": remaining,
-            "cumulative_principal": cum_principal,
-            "cumulative_interest": cum_interest,
-            "applied_rate": annual_rate,
-            "is_paid": False,
-            "actual_pay_date": None,
-        })
+            "cumulative_principal": cumulative_principal,
+            "cumulative_interest": cumulative_interest,
+            "applied_rate": np.full(self.term, float(self.annual_rate)),
+        }
+        for values in columns.values():
+            values.setflags(write=False)
+        return columns
+
+
+def build_schedule(
+    plan_id: str,
+    principal: float,
+    annual_rate: float,
+    term_months: int,
+    repayment_method: str,
+    start_date: date,
+    repayment_day: int = 1,
+    start_period: int = 1,
+    existing_cumulative_principal: float = 0.0,
+    existing_cumulative_interest: float = 0.0,
+    base_principal: float = None,
+    money_mode: str = None,
+) -> Schedule:
+    """生成列式还款计划（core 内部使用，单个惰性分段），参数同 generate_schedule"""
+    if term_months <= 0:
+        return Schedule.empty_schedule(plan_id)
+
+    segment = Segment(
+        start_period, principal, annual_rate, term_months, repayment_method,
+        start_date, repayment_day, base_principal,
+        existing_cumulative_principal, existing_cumulative_interest,
+        _resolve_money_mode(money_mode), settings.FEN_ROUNDING,
+    )
+    return Schedule.from_parts(plan_id, ((segment, 0, segment.term),))
+
+
+def generate_schedule(
+    plan_id: str,
+    principal: float,
+    annual_rate: float,
+    term_months: int,
+    repayment_method: str,
+    start_date: date,
+    repayment_day: int = 1,
+    start_period: int = 1,
+    existing_cumulative_principal: float = 0.0,
+    existing_cumulative_interest: float = 0.0,
+    base_principal: float = None,
+    money_mode: str = None,
+) -> pd.DataFrame:
+    """
+    生成还款计划表
 
-    return pd.DataFrame(records, columns=REPAYMENT_SCHEDULE_COLUMNS)
+    money_mode 为 "fen" 时按整数分定点计算（舍入规则见 settings.FEN_ROUNDING），
+    默认取 settings.MONEY_MODE。
+    """
+    return build_schedule(
+        plan_id, principal, annual_rate, term_months, repayment_method,
+        start_date, repayment_day, start_period,
+        existing_cumulative_principal, existing_cumulative_interest, base_principal,
+        money_mode,
+    ).to_frame()
 
 
 def generate_combined_schedule(
@@ -126,44 +267,126 @@ def generate_combined_schedule(
     repayment_method: str,
     start_date: date,
     repayment_day: int = 1,
+    money_mode: str = None,
 ) -> pd.DataFrame:
     """组合贷还款计划：两部分独立计算后合并"""
-    sch_c = generate_schedule(
+    money_mode = _resolve_money_mode(money_mode)
+    sch_c = build_schedule(
         plan_id, commercial_amount, commercial_rate,
         term_months, repayment_method, start_date, repayment_day,
+        money_mode=money_mode,
     )
-    sch_p = generate_schedule(
+    sch_p = build_schedule(
         plan_id, provident_amount, provident_rate,
         term_months, repayment_method, start_date, repayment_day,
+        money_mode=money_mode,
+    )
+
+    if money_mode == MoneyMode.FEN.value:
+        # 整数分相加无误差，无需整表 round
+        money = (to_yuan(to_fen(getattr(sch_c, col)) + to_fen(getattr(sch_p, col)))
+                 for col in MONEY_COLUMNS)
+    else:
+        money = (getattr(sch_c, col) + getattr(sch_p, col) for col in MONEY_COLUMNS)
+    combined = Schedule(
+        plan_id, sch_c.period, sch_c.due_date, *money,
+        # 利率显示商贷利率（组合贷利率仅参考）
+        sch_c.applied_rate,
     )
+    if money_mode == MoneyMode.FEN.value:
+        return combined.to_frame()
+    return combined.to_frame().round(2)
+
+
+# IRR 求解：月利率的搜索区间（与原 brentq 区间一致）与 Newton 迭代参数
+IRR_BRACKET = (-0.5, 1.0)
+IRR_TOL = 1e-12
+IRR_MAX_ITER = 50
+
+
+def _npv(rate: float, cash_flows: np.ndarray) -> float:
+    return float(cash_flows @ np.exp(-np.log1p(rate) * np.arange(len(cash_flows))))
+
+
+def solve_irr_batch(cash_flows: np.ndarray, guess=0.004) -> np.ndarray:
+    """
+    批量求月 IRR：cash_flows 为 N×T 现金流矩阵（第 0 列为期初流出，不足 T 期的行末尾补 0），
+    guess 为标量或长度 N 的初值（通常取名义月利率）。
+
+    NPV 及其解析导数按矩阵乘法一次算出所有行，Newton 迭代同时推进；
+    不收敛或越出区间的行退回 brentq 区间求解，无解的行为 NaN。
+    """
+    cf = np.atleast_2d(np.asarray(cash_flows, dtype=np.float64))
+    n, width = cf.shape
+    k = np.arange(width, dtype=np.float64)
+    kcf = cf * k
+    rate = np.broadcast_to(np.asarray(guess, dtype=np.float64), (n,)).copy()
+    lo, hi = IRR_BRACKET
+    active = np.ones(n, dtype=bool)
+
+    for _ in range(IRR_MAX_ITER):
+        idx = np.flatnonzero(active)
+        if not len(idx):
+            break
+        log_v = -np.log1p(rate[idx])
+        disc = np.exp(np.outer(log_v, k))
+        npv = np.einsum("ij,ij->i", cf[idx], disc)
+        # d/dr Σ cf_k (1+r)^-k = -Σ k cf_k (1+r)^-(k+1)
+        slope = -np.einsum("ij,ij->i", kcf[idx], disc) * np.exp(log_v)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = npv / slope
+        rate[idx] -= step
+        bad = ~np.isfinite(rate[idx]) | (rate[idx] <= lo) | (rate[idx] >= hi)
+        done = bad | (np.abs(step) < IRR_TOL)
+        rate[idx[bad]] = np.nan
+        active[idx[done]] = False
+    rate[active] = np.nan
+
+    for i in np.flatnonzero(np.isnan(rate)):
+        try:
+            rate[i] = optimize.brentq(_npv, lo, hi, args=(cf[i],))
+        except (ValueError, RuntimeError):
+            rate[i] = np.nan
+    return rate
 
-    combined = sch_c.copy()
-    for col in ["monthly_payment", "principal", "interest",
-                "remaining_principal", "cumulative_principal", "cumulative_interest"]:
-        combined[col] = sch_c[col] + sch_p[col]
 
-    # 利率显示商贷利率（组合贷利率仅参考）
-    combined["applied_rate"] = commercial_rate
-    combined = combined.round(2)
-    return combined
+@lru_cache(maxsize=1024)
+def _cached_monthly_irr(cash_flow_bytes: bytes, guess: float) -> float:
+    """按现金流字节指纹缓存求解结果，重复渲染同一计划不再重复求解"""
+    return float(solve_irr_batch(np.frombuffer(cash_flow_bytes, dtype=np.float64), guess)[0])
+
+
+def _annualize(monthly_irr):
+    return np.round(((1 + monthly_irr) ** 12 - 1) * 100, 4)
+
+
+def _nominal_monthly_rate(schedule: pd.DataFrame) -> float:
+    if "applied_rate" in schedule.columns and len(schedule):
+        return float(schedule["applied_rate"].iloc[0]) / 100 / 12
+    return 0.004
 
 
 def calc_irr(principal: float, schedule: pd.DataFrame) -> float:
-    """用 IRR 法计算真实年化率"""
-    cash_flows = [-principal]
-    payments = schedule["monthly_payment"].tolist()
-    cash_flows.extend(payments)
-
-    try:
-        # numpy_financial 风格的 IRR
-        def npv(rate):
-            return sum(cf / (1 + rate) ** i for i, cf in enumerate(cash_flows))
-
-        monthly_irr = optimize.brentq(npv, -0.5, 1.0)
-        annual_irr = (1 + monthly_irr) ** 12 - 1
-        return round(annual_irr * 100, 4)
-    except (ValueError, RuntimeError):
+    """用 IRR 法计算真实年化率（Newton 迭代，以名义利率为初值）"""
+    cash_flows = np.concatenate((
+        [-float(principal)], schedule["monthly_payment"].to_numpy(dtype=np.float64),
+    ))
+    monthly_irr = _cached_monthly_irr(cash_flows.tobytes(), _nominal_monthly_rate(schedule))
+    if np.isnan(monthly_irr):
         return 0.0
+    return float(_annualize(monthly_irr))
+
+
+def calc_irr_batch(principals, payments, guesses=None) -> np.ndarray:
+    """
+    批量计算真实年化率(%)。payments 为 N×T 月供矩阵（较短的计划末尾补 0），
+    guesses 为名义月利率初值；无解的位置为 0.0，与 calc_irr 一致。
+    """
+    payments = np.atleast_2d(np.asarray(payments, dtype=np.float64))
+    principals = np.asarray(principals, dtype=np.float64).reshape(-1, 1)
+    cash_flows = np.hstack((-np.broadcast_to(principals, (len(payments), 1)), payments))
+    monthly_irr = solve_irr_batch(cash_flows, 0.004 if guesses is None else guesses)
+    return np.where(np.isnan(monthly_irr), 0.0, _annualize(monthly_irr))
 
 
 def calc_remaining_irr(
@@ -174,3 +397,32 @@ def calc_remaining_irr(
     if remaining_schedule.empty or remaining_principal <= 0:
         return 0.0
     return calc_irr(remaining_principal, remaining_schedule)
+
+
+def calc_remaining_irr_curve(schedule) -> pd.DataFrame:
+    """
+    每一期的剩余年化率：第 t 期还款前的剩余本金对第 t 期及以后全部月供的 IRR。
+
+    T 条后缀现金流组成一个矩阵一次批量求解，各期以当期执行利率为初值：
+    后缀按该利率摊还时它就是精确解，只有跨越利率调整或提前还款的期次需要迭代，
+    通常一两步 Newton 即收敛。以上一期的解为初值需要逐期串行求解，反而失去批量求解的好处。
+    返回列 period / due_date / remaining_principal（期初）/ applied_rate / remaining_irr。
+    """
+    sch = Schedule.coerce(schedule)
+    n = len(sch)
+    columns = ["period", "due_date", "remaining_principal", "applied_rate", "remaining_irr"]
+    if n == 0:
+        return pd.DataFrame(columns=columns)
+    payments = sch.monthly_payment
+    opening = sch.remaining_principal + sch.principal
+    suffixes = np.lib.stride_tricks.sliding_window_view(np.concatenate((payments, np.zeros(n - 1))), n)
+    cash_flows = np.hstack((-opening[:, None], suffixes))
+    monthly_irr = solve_irr_batch(cash_flows, sch.applied_rate / 100 / 12)
+    return pd.DataFrame({
+        "period": sch.period.astype(np.int64),
+        "due_date": format_dates(sch.due_date),
+        "remaining_principal": opening,
+        "applied_rate": sch.applied_rate,
+        "remaining_irr": np.where(np.isnan(monthly_irr), 0.0, _annualize(monthly_irr)),
+    }, columns=columns)
+
@@ -1,14 +1,68 @@
 """方案对比计算"""
-from typing import List, Dict
+from typing import List, Dict, Sequence
 
+import numpy as np
 import pandas as pd
 
-from core.calculator import calc_equal_installment, calc_equal_principal_first_month, calc_irr, generate_schedule
+from core.batch import generate_schedules_batch
+from core.calculator import (
+    calc_equal_installment, calc_equal_principal_first_month, calc_irr_batch, generate_schedule,
+)
 from core.inflation import adjust_for_inflation
-from config.constants import RepaymentMethod
+from config.constants import RepaymentMethod, MoneyMode
 from datetime import date
 
 
+# 对比指标列（compute_metrics 输出，均可用于排序和 Pareto 筛选）
+METRIC_COLUMNS = [
+    "首月月供", "末月月供", "平均月供", "最高月供", "总还款额", "总利息", "利息占比", "真实年化率(%)",
+]
+
+
+def _stack(values: Sequence[np.ndarray]) -> np.ndarray:
+    """长短不一的序列堆成 N×T 矩阵，末尾补 0"""
+    width = max((len(v) for v in values), default=0)
+    out = np.zeros((len(values), width))
+    for i, v in enumerate(values):
+        out[i, :len(v)] = v
+    return out
+
+
+def compute_metrics(
+    principals,
+    payments: np.ndarray,
+    interest: np.ndarray,
+    terms,
+    nominal_rates=None,
+) -> pd.DataFrame:
+    """
+    列式计算 N 个方案的对比指标。
+
+    Args:
+        principals: 各方案贷款总额
+        payments / interest: N×T 月供与利息矩阵，超出各自期数的位置为 0
+        terms: 各方案期数
+        nominal_rates: 名义年利率(%)，作为 IRR 求解初值
+    """
+    terms = np.asarray(terms, dtype=np.int64)
+    n = len(terms)
+    total_payment = payments.sum(axis=1)
+    total_interest = interest.sum(axis=1)
+    guesses = 0.004 if nominal_rates is None else np.asarray(nominal_rates, dtype=np.float64) / 1200
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = np.where(total_payment > 0, total_interest / total_payment * 100, 0.0)
+    return pd.DataFrame({
+        "首月月供": payments[:, 0].round(2),
+        "末月月供": payments[np.arange(n), terms - 1].round(2),
+        "平均月供": (total_payment / terms).round(2),
+        "最高月供": payments.max(axis=1).round(2),
+        "总还款额": total_payment.round(2),
+        "总利息": total_interest.round(2),
+        "利息占比": share.round(2),
+        "真实年化率(%)": calc_irr_batch(principals, payments, guesses),
+    }, columns=METRIC_COLUMNS)
+
+
 def compare_plans(plans: List[Dict], schedules: Dict[str, pd.DataFrame]) -> pd.DataFrame:
     """
     对比多个方案的关键指标。
@@ -16,40 +70,115 @@ def compare_plans(plans: List[Dict], schedules: Dict[str, pd.DataFrame]) -> pd.D
     schedules: {plan_id: schedule_df}
     返回对比表 DataFrame
     """
-    rows = []
-    for plan in plans:
-        pid = plan["plan_id"]
-        sch = schedules.get(pid, pd.DataFrame())
-
-        total_amount = plan["total_amount"]
-        term_months = plan["term_months"]
-
-        if sch.empty:
-            continue
-
-        total_payment = sch["monthly_payment"].sum()
-        total_interest = sch["interest"].sum()
-        first_monthly = float(sch.iloc[0]["monthly_payment"])
-        last_monthly = float(sch.iloc[-1]["monthly_payment"])
-        avg_monthly = sch["monthly_payment"].mean()
-        irr = calc_irr(total_amount, sch)
-
-        rows.append({
-            "方案名称": plan["plan_name"],
-            "贷款类型": plan["loan_type"],
-            "贷款总额": total_amount,
-            "贷款期限(月)": term_months,
-            "还款方式": plan["repayment_method"],
-            "首月月供": round(first_monthly, 2),
-            "末月月供": round(last_monthly, 2),
-            "平均月供": round(avg_monthly, 2),
-            "总还款额": round(total_payment, 2),
-            "总利息": round(total_interest, 2),
-            "利息占比": round(total_interest / total_payment * 100, 2) if total_payment > 0 else 0,
-            "真实年化率(%)": irr,
-        })
-
-    return pd.DataFrame(rows)
+    plans = [p for p in plans if not schedules.get(p["plan_id"], pd.DataFrame()).empty]
+    if not plans:
+        return pd.DataFrame()
+    sch = [schedules[p["plan_id"]] for p in plans]
+    metrics = compute_metrics(
+        [p["total_amount"] for p in plans],
+        _stack([s["monthly_payment"].to_numpy(dtype=np.float64) for s in sch]),
+        _stack([s["interest"].to_numpy(dtype=np.float64) for s in sch]),
+        [len(s) for s in sch],
+        [float(s["applied_rate"].iloc[0]) for s in sch] if all("applied_rate" in s.columns for s in sch) else None,
+    )
+    head = pd.DataFrame({
+        "方案名称": [p["plan_name"] for p in plans],
+        "贷款类型": [p["loan_type"] for p in plans],
+        "贷款总额": [p["total_amount"] for p in plans],
+        "贷款期限(月)": [p["term_months"] for p in plans],
+        "还款方式": [p["repayment_method"] for p in plans],
+    })
+    columns = ["首月月供", "末月月供", "平均月供", "总还款额", "总利息", "利息占比", "真实年化率(%)"]
+    return pd.concat([head, metrics[columns]], axis=1)
+
+
+def candidate_grid(
+    total_amount: float,
+    provident_amounts: Sequence[float],
+    term_months: Sequence[int],
+    repayment_methods: Sequence[str] = tuple(m.value for m in RepaymentMethod),
+) -> pd.DataFrame:
+    """候选贷款结构：公积金额度 × 期限 × 还款方式 的全组合，其余为商贷"""
+    prov, term, method = np.meshgrid(
+        np.asarray(provident_amounts, dtype=np.float64),
+        np.asarray(term_months, dtype=np.int64),
+        np.arange(len(repayment_methods)),
+        indexing="ij",
+    )
+    prov = np.minimum(prov.ravel(), total_amount)
+    return pd.DataFrame({
+        "贷款总额": float(total_amount),
+        "商贷金额": total_amount - prov,
+        "公积金金额": prov,
+        "贷款期限(月)": term.ravel(),
+        "还款方式": np.asarray(repayment_methods)[method.ravel()],
+    })
+
+
+def evaluate_candidates(
+    candidates: pd.DataFrame,
+    commercial_rate: float,
+    provident_rate: float,
+) -> pd.DataFrame:
+    """
+    一次批量生成所有候选结构的商贷、公积金两部分计划并列式计算指标，
+    返回 candidates 追加 METRIC_COLUMNS 后的表。
+    """
+    if candidates.empty:
+        return candidates.reindex(columns=list(candidates.columns) + METRIC_COLUMNS)
+    terms = candidates["贷款期限(月)"].to_numpy(dtype=np.int64)
+    methods = candidates["还款方式"].tolist()
+    columns = ["monthly_payment", "interest"]
+    parts = [
+        generate_schedules_batch(
+            candidates[col].to_numpy(dtype=np.float64), rate, terms, methods,
+            columns=columns, money_mode=MoneyMode.FLOAT.value,
+        )
+        for col, rate in (("商贷金额", commercial_rate), ("公积金金额", provident_rate))
+    ]
+    total = candidates["贷款总额"].to_numpy(dtype=np.float64)
+    # 名义利率按金额加权，作为 IRR 初值
+    weighted = (
+        candidates["商贷金额"].to_numpy() * commercial_rate
+        + candidates["公积金金额"].to_numpy() * provident_rate
+    ) / np.where(total > 0, total, 1)
+    metrics = compute_metrics(
+        total,
+        parts[0]["monthly_payment"] + parts[1]["monthly_payment"],
+        parts[0]["interest"] + parts[1]["interest"],
+        terms,
+        weighted,
+    )
+    return pd.concat([candidates.reset_index(drop=True), metrics], axis=1)
+
+
+def rank_plans(table: pd.DataFrame, metric: str, k: int = 10, ascending: bool = True) -> pd.DataFrame:
+    """按任一指标取前 k 个方案（ascending=True 取最小）"""
+    if ascending:
+        return table.nsmallest(k, metric)
+    return table.nlargest(k, metric)
+
+
+def pareto_front(table: pd.DataFrame, objectives: Dict[str, str], chunk_size: int = 1024) -> pd.DataFrame:
+    """
+    Pareto 筛选：objectives 为 {指标列: "min" / "max"}，保留不被任何其他方案支配的行。
+    支配判断按块两两广播比较，N 为数千时仍只需几十毫秒。
+    """
+    values = np.column_stack([
+        table[col].to_numpy(dtype=np.float64) * (1 if goal == "min" else -1)
+        for col, goal in objectives.items()
+    ])
+    n = len(values)
+    dominated = np.zeros(n, dtype=bool)
+    for lo in range(0, n, chunk_size):
+        block = values[lo:lo + chunk_size]
+        no_worse = np.ones((len(block), n), dtype=bool)
+        better = np.zeros((len(block), n), dtype=bool)
+        for k in range(values.shape[1]):
+            no_worse &= values[None, :, k] <= block[:, k, None]
+            better |= values[None, :, k] < block[:, k, None]
+        dominated[lo:lo + chunk_size] = (no_worse & better).any(axis=1)
+    return table[~dominated].sort_values(list(objectives)[0])
 
 
 def compare_repayment_methods(
@@ -0,0 +1,173 @@
+"""
+整数分定点计算
+
+金额以 int64 分表示，年利率以万分之一个百分点为单位转为整数，每期利息
+由整数除法按舍入规则取整，结果与银行对账单逐分一致，无需再做整表 round。
+"""
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from config.constants import RepaymentMethod, RoundingRule
+
+FEN_PER_YUAN = 100
+# 年利率(%) 精度：4 位小数
+RATE_SCALE = 10_000
+# 月利率 = rate_units / RATE_DENOMINATOR
+RATE_DENOMINATOR = 12 * 100 * RATE_SCALE
+
+
+def to_fen(amount):
+    """元 -> 分（四舍五入），标量返回 int，数组返回 int64 数组"""
+    arr = np.asarray(amount, dtype=np.float64)
+    # 容差吸收十进制小数的二进制表示误差（如 1234.565 实际存为 1234.56499...）
+    fen = np.sign(arr) * np.floor(np.abs(arr) * FEN_PER_YUAN + 0.5 + 1e-6)
+    if arr.ndim == 0:
+        return int(fen)
+    return fen.astype(np.int64)
+
+
+def to_yuan(fen) -> np.ndarray:
+    """分 -> 元"""
+    return np.asarray(fen, dtype=np.float64) / FEN_PER_YUAN
+
+
+def rate_units(annual_rate):
+    """年利率(%) -> 整数利率单位"""
+    arr = np.rint(np.asarray(annual_rate, dtype=np.float64) * RATE_SCALE).astype(np.int64)
+    return int(arr) if arr.ndim == 0 else arr
+
+
+def div_round(num, den, rounding: str = RoundingRule.HALF_UP.value):
+    """
+    非负整数除法并按规则取整，同时支持 Python int 与 int64 数组。
+    """
+    if rounding == RoundingRule.DOWN.value:
+        return num // den
+    if rounding == RoundingRule.HALF_EVEN.value:
+        q = num // den
+        rem2 = 2 * (num - q * den)
+        return q + (rem2 > den) + ((rem2 == den) & (q & 1))
+    return (2 * num + den) // (2 * den)
+
+
+def round_float(x, rounding: str = RoundingRule.HALF_UP.value):
+    """非负浮点（单位：分）按规则取整为整数分"""
+    x = np.asarray(x, dtype=np.float64)
+    if rounding == RoundingRule.DOWN.value:
+        out = np.floor(x + 1e-6)
+    elif rounding == RoundingRule.HALF_EVEN.value:
+        out = np.rint(x)
+    else:
+        out = np.floor(x + 0.5 + 1e-6)
+    return int(out) if out.ndim == 0 else out.astype(np.int64)
+
+
+def installment_fen(principal_fen, annual_rate, term_months, rounding: str = RoundingRule.HALF_UP.value):
+    """等额本息月供（分），支持标量或数组"""
+    p = np.asarray(principal_fen, dtype=np.float64)
+    n = np.asarray(term_months, dtype=np.float64)
+    r = np.asarray(annual_rate, dtype=np.float64) / 100 / 12
+    growth = np.exp(np.log1p(r) * n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payment = np.where(r == 0, p / n, p * r * growth / (growth - 1))
+    return round_float(payment, rounding)
+
+
+def amortize_fen(
+    principal_fen: int,
+    annual_rate: float,
+    term_months: int,
+    repayment_method: str,
+    base_principal_fen: Optional[int] = None,
+    rounding: str = RoundingRule.HALF_UP.value,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    单笔贷款整数分摊还，返回 (月供, 本金, 利息, 剩余本金) 四个 int64 数组。
+
+    每期利息 = 期初本金 × 月利率 按规则取整；最后一期本金取剩余本金，吸收全部尾差。
+    """
+    units = rate_units(annual_rate)
+    if repayment_method == RepaymentMethod.EQUAL_INSTALLMENT.value:
+        # 等额本息每期期初本金依赖上一期取整结果，只能逐期递推；单笔用 Python 整数最快
+        payment = installment_fen(principal_fen, annual_rate, term_months, rounding)
+        prin = np.empty(term_months, dtype=np.int64)
+        interest = np.empty(term_months, dtype=np.int64)
+        opening = principal_fen
+        for k in range(term_months):
+            i = div_round(opening * units, RATE_DENOMINATOR, rounding)
+            p = opening if k == term_months - 1 else min(payment - i, opening)
+            prin[k] = p
+            interest[k] = i
+            opening -= p
+    else:
+        if base_principal_fen is None:
+            base_principal_fen = div_round(principal_fen, term_months, rounding)
+        k = np.arange(term_months, dtype=np.int64)
+        opening = np.maximum(principal_fen - k * base_principal_fen, 0)
+        interest = div_round(opening * units, RATE_DENOMINATOR, rounding)
+        prin = np.minimum(base_principal_fen, opening)
+        prin[-1] = opening[-1]
+
+    remaining = principal_fen - np.cumsum(prin)
+    return prin + interest, prin, interest, remaining
+
+
+def amortize_fen_2d(
+    principal_fen: np.ndarray,
+    annual_rate: np.ndarray,
+    term: np.ndarray,
+    is_ei: np.ndarray,
+    width: int,
+    rounding: str = RoundingRule.HALF_UP.value,
+) -> Dict[str, np.ndarray]:
+    """
+    N 笔贷款整数分摊还，与 amortize_fen 逐笔结果一致。
+    等额本息按期递推、每期对所有贷款向量化；等额本金整块计算。
+    """
+    n = len(principal_fen)
+    units = rate_units(annual_rate)
+    k = np.arange(width, dtype=np.int64)
+    mask = k[None, :] < term[:, None]
+    last = term - 1
+    prin = np.zeros((n, width), dtype=np.int64)
+    interest = np.zeros((n, width), dtype=np.int64)
+
+    ei = np.flatnonzero(is_ei)
+    if len(ei):
+        payment = installment_fen(principal_fen[ei], annual_rate[ei], term[ei], rounding)
+        opening = principal_fen[ei].copy()
+        u = units[ei]
+        for col in range(width):
+            i = div_round(opening * u, RATE_DENOMINATOR, rounding)
+            p = np.minimum(payment - i, opening)
+            np.copyto(p, opening, where=last[ei] == col)
+            active = col <= last[ei]
+            i[~active] = 0
+            p[~active] = 0
+            interest[ei, col] = i
+            prin[ei, col] = p
+            opening -= p
+
+    ep = np.flatnonzero(~is_ei)
+    if len(ep):
+        base = div_round(principal_fen[ep], term[ep], rounding)
+        opening = np.maximum(principal_fen[ep, None] - k * base[:, None], 0)
+        interest[ep] = div_round(opening * units[ep, None], RATE_DENOMINATOR, rounding)
+        block = np.minimum(base[:, None], opening)
+        rows = np.arange(len(ep))
+        block[rows, last[ep]] = opening[rows, last[ep]]
+        prin[ep] = block
+        prin[ep] *= mask[ep]
+        interest[ep] *= mask[ep]
+
+    cumulative_principal = np.cumsum(prin, axis=1)
+    return {
+        "mask": mask,
+        "monthly_payment": prin + interest,
+        "principal": prin,
+        "interest": interest,
+        "remaining_principal": principal_fen[:, None] - cumulative_principal,
+        "cumulative_principal": cumulative_principal,
+        "cumulative_interest": np.cumsum(interest, axis=1),
+    }
@@ -1,4 +1,8 @@
 """通胀调整计算"""
+from dataclasses import dataclass
+from typing import Optional, Sequence, Union
+
+import numpy as np
 import pandas as pd
 
 from config.settings import DEFAULT_INFLATION_RATE
@@ -12,13 +16,13 @@ def adjust_for_inflation(
     df = schedule.copy()
     monthly_rate = annual_inflation_rate / 100 / 12
 
-    periods = df["period"].values
-    discount_factors = [(1 + monthly_rate) ** (-p) for p in periods]
+    periods = df["period"].to_numpy(dtype=np.float64)
+    discount_factors = np.power(1 + monthly_rate, -periods)
 
     df["real_monthly_payment"] = (df["monthly_payment"] * discount_factors).round(2)
     df["real_principal"] = (df["principal"] * discount_factors).round(2)
     df["real_interest"] = (df["interest"] * discount_factors).round(2)
-    df["discount_factor"] = [round(f, 6) for f in discount_factors]
+    df["discount_factor"] = np.round(discount_factors, 6)
 
     return df
 
@@ -45,10 +49,11 @@ def calc_real_cost(
 
     # PV 计算：优先用实际月供序列，否则用平均值近似
     if monthly_payments is not None and len(monthly_payments) > 0:
-        pv = sum(p / (1 + monthly_rate) ** (i + 1) for i, p in enumerate(monthly_payments))
+        payments = np.asarray(monthly_payments, dtype=np.float64)
     else:
         avg_monthly = total_payment / term_months if term_months > 0 else 0
-        pv = sum(avg_monthly / (1 + monthly_rate) ** i for i in range(1, term_months + 1))
+        payments = np.full(max(term_months, 0), avg_monthly)
+    pv = float(payments @ np.power(1 + monthly_rate, -np.arange(1, len(payments) + 1, dtype=np.float64)))
 
     # 名义利率：优先用传入的年利率，否则从总利息/本金简单年化近似
     if annual_rate is not None:
@@ -70,3 +75,106 @@ def calc_real_cost(
         "nominal_interest_rate": round(nominal_rate, 2),
         "real_interest_rate": round(real_rate, 2),
     }
+
+
+def sample_inflation_paths(
+    n_paths: int,
+    months: int,
+    mean_annual_rate: float = DEFAULT_INFLATION_RATE,
+    annual_volatility: float = 1.0,
+    persistence: float = 0.95,
+    seed: Optional[int] = None,
+) -> np.ndarray:
+    """
+    生成 n_paths×months 的月通胀率矩阵（小数，如 0.002）。
+
+    年化通胀率按 AR(1) 围绕 mean_annual_rate 波动：x' = μ + φ(x - μ) + σ√(1-φ²)·ε，
+    使长期标准差为 annual_volatility（百分点），再按 年率/12 折算为月率
+    （与 adjust_for_inflation、calc_real_cost 相同）。
+    """
+    rng = np.random.default_rng(seed)
+    shocks = rng.standard_normal((n_paths, months)) * annual_volatility * np.sqrt(1 - persistence ** 2)
+    annual = np.empty((n_paths, months), dtype=np.float64)
+    x = np.full(n_paths, float(mean_annual_rate))
+    for t in range(months):
+        x = mean_annual_rate + persistence * (x - mean_annual_rate) + shocks[:, t]
+        annual[:, t] = x
+    return annual / 100 / 12
+
+
+@dataclass
+class RealCostScenarios:
+    """
+    N 个方案 × S 条通胀路径下的实际成本。
+
+    real_total_payment: N×S，按各路径累计通胀折现后的总还款
+    real_interest_rate: N×S，按各路径在方案期限内的年化通胀用 Fisher 方程求得的实际利率(%)
+    """
+    names: list
+    nominal_total_payment: np.ndarray
+    real_total_payment: np.ndarray
+    real_interest_rate: np.ndarray
+
+    def bands(self, q: Sequence[float] = (5, 50, 95)) -> pd.DataFrame:
+        """每个方案实际总还款与实际利率的分位数表"""
+        pay = np.percentile(self.real_total_payment, q, axis=1)
+        rate = np.percentile(self.real_interest_rate, q, axis=1)
+        data = {"nominal_total_payment": self.nominal_total_payment}
+        for i, qi in enumerate(q):
+            data[f"real_total_payment_p{qi:g}"] = pay[i]
+        for i, qi in enumerate(q):
+            data[f"real_interest_rate_p{qi:g}"] = rate[i]
+        return pd.DataFrame(data, index=pd.Index(self.names, name="plan")).round(2)
+
+
+def calc_real_cost_scenarios(
+    monthly_payments: Union[np.ndarray, Sequence[Sequence[float]]],
+    nominal_rates: Union[float, Sequence[float]],
+    inflation_paths: np.ndarray,
+    names: Optional[list] = None,
+    terms: Optional[Sequence[int]] = None,
+) -> RealCostScenarios:
+    """
+    多方案、多通胀路径的实际成本。
+
+    Args:
+        monthly_payments: N 个方案的月供序列（可长短不一）或 N×T 矩阵（末尾补 0）
+        nominal_rates: 各方案年化名义利率(%)，标量或长度 N
+        inflation_paths: S×T' 月通胀率矩阵（小数），T' 不少于最长方案的期数
+        names: 方案名称，默认 0..N-1
+        terms: 各方案期数，只取每行前 terms[i] 期；默认取到最后一笔非零月供
+
+    Raises:
+        ValueError: 通胀路径不是二维矩阵，或短于最长方案的期数
+    """
+    rows = [np.asarray(p, dtype=np.float64) for p in monthly_payments]
+    if terms is None:
+        terms = [int(np.flatnonzero(r)[-1]) + 1 if r.any() else 0 for r in rows]
+    terms = np.asarray(terms, dtype=np.int64)
+    width = int(terms.max()) if len(rows) else 0
+    payments = np.zeros((len(rows), width))
+    for i, (r, n) in enumerate(zip(rows, terms)):
+        payments[i, :n] = r[:n]
+
+    paths = np.asarray(inflation_paths, dtype=np.float64)
+    if paths.ndim != 2:
+        raise ValueError(f"inflation_paths 应为 S×T 矩阵，实际维度为 {paths.ndim}")
+    if paths.shape[1] < width:
+        raise ValueError(f"通胀路径只有 {paths.shape[1]} 个月，短于最长方案的 {width} 期")
+    paths = paths[:, :width]
+    growth = np.cumprod(1 + paths, axis=1)
+    real_total = payments @ (1 / growth).T
+
+    # 各方案期限内的平均月通胀（几何平均）按 ×12 年化，与路径的 年率/12 口径一致
+    term_growth = growth[:, np.maximum(terms, 1) - 1].T
+    annual_inflation = (np.power(term_growth, 1 / np.maximum(terms, 1)[:, None]) - 1) * 12
+    nominal = np.broadcast_to(np.asarray(nominal_rates, dtype=np.float64), (len(rows),))[:, None] / 100
+    real_rate = ((1 + nominal) / (1 + annual_inflation) - 1) * 100
+
+    return RealCostScenarios(
+        names=list(names) if names is not None else list(range(len(rows))),
+        nominal_total_payment=payments.sum(axis=1),
+        real_total_payment=real_total,
+        real_interest_rate=real_rate,
+    )
+
@@ -0,0 +1,241 @@
+"""LPR 利率路径蒙特卡洛模拟：批量生成利率路径，并在每条路径下重定价还款计划"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from config.constants import RepaymentMethod
+from core.schedule import Schedule
+from utils.date_utils import clamp_due_dates
+
+RANDOM_WALK = "random_walk"
+MEAN_REVERTING = "mean_reverting"
+
+# LPR 按 5 个基点报价
+LPR_TICK = 0.05
+# 每个子任务模拟的路径数，控制单进程内 路径×期数 矩阵的大小
+DEFAULT_CHUNK_PATHS = 2048
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+@dataclass
+class LprSimulation:
+    """
+    S 条路径的模拟结果。
+
+    rates / payments / remaining 为 S×T 矩阵（T 为自 from_period 起的剩余期数），
+    已还清之后的期次月供与剩余本金为 0；payoff_period 为各路径的还清期数。
+    """
+    periods: np.ndarray
+    due_dates: np.ndarray
+    rates: np.ndarray
+    payments: np.ndarray
+    remaining: np.ndarray
+    total_interest: np.ndarray
+    payoff_period: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.total_interest)
+
+    def percentiles(self, name: str, q: Sequence[float] = DEFAULT_PERCENTILES) -> pd.DataFrame:
+        """按期计算某个矩阵（"rates" / "payments" / "remaining"）的分位数，行为期数、列为分位"""
+        values = np.percentile(getattr(self, name), q, axis=0)
+        return pd.DataFrame(values.T, index=pd.Index(self.periods, name="period"), columns=list(q))
+
+    def payoff_dates(self) -> np.ndarray:
+        return self.due_dates[self.payoff_period - self.periods[0]]
+
+
+def _repricing_index(due_dates: np.ndarray, repricing_month: int, repricing_day: int) -> np.ndarray:
+    """
+    各期适用的重定价次数：每年 repricing_month 月 repricing_day 日重定价，
+    自该日及之后的第一个还款日起执行新利率。
+    """
+    months = due_dates.astype("datetime64[M]")
+    years = months.astype("datetime64[Y]")
+    # 重定价日超出当月天数时取月末（如 2 月 30 日取 2 月 28/29 日）
+    repricing = clamp_due_dates(years.astype("datetime64[M]") + (repricing_month - 1), repricing_day)
+    # 当年重定价日已过（含当天）的还款日计入当年，否则仍按上一年的利率
+    year_no = years.astype(np.int64) - years[0].astype(np.int64)
+    count = year_no + (due_dates >= repricing).astype(np.int64)
+    return count - count[0]
+
+
+def simulate_lpr_paths(
+    n_paths: int,
+    steps: int,
+    current_lpr: float,
+    model: str = RANDOM_WALK,
+    volatility: float = 0.25,
+    drift: float = 0.0,
+    long_run_lpr: Optional[float] = None,
+    reversion_speed: float = 0.3,
+    floor: float = 0.0,
+    seed: Union[int, np.random.SeedSequence, None] = None,
+) -> np.ndarray:
+    """
+    生成 n_paths 条、每条 steps 次年度重定价后的 LPR（单位 %），返回 n_paths×(steps+1)，第 0 列为当前值。
+
+    random_walk:    L' = L + drift + volatility·ε
+    mean_reverting: L' = L + reversion_speed·(long_run_lpr - L) + volatility·ε
+    结果按 5 个基点取整，且不低于 floor。
+    """
+    rng = np.random.default_rng(seed)
+    shocks = rng.standard_normal((n_paths, steps)) * volatility
+    levels = np.empty((n_paths, steps + 1), dtype=np.float64)
+    levels[:, 0] = current_lpr
+    if model == MEAN_REVERTING:
+        theta = current_lpr if long_run_lpr is None else long_run_lpr
+        x = np.full(n_paths, float(current_lpr))
+        for j in range(steps):
+            x = np.maximum(x + reversion_speed * (theta - x) + shocks[:, j], floor)
+            levels[:, j + 1] = x
+    else:
+        levels[:, 1:] = np.maximum(current_lpr + np.cumsum(shocks + drift, axis=1), floor)
+    levels[:, 1:] = np.maximum(np.round(levels[:, 1:] / LPR_TICK) * LPR_TICK, floor)
+    return levels
+
+
+def _reprice_kernel(
+    principal: float,
+    annual_rates: np.ndarray,
+    repayment_method: str,
+    keep_payment: bool,
+    base_principal: Optional[float],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    在 S×T 的逐期年利率矩阵下摊还 principal，逐期推进、各路径向量化。
+
+    等额本息每期按剩余本金和剩余期数重算月供（利率不变时与原月供一致，即银行重定价规则）；
+    keep_payment=True 时月供保持不变、利率下行则提前还清，只有原月供不足以在原到期日前还清时才上调。
+    等额本金保持每期本金不变。返回 (月供, 本金, 剩余本金) 三个 S×T 矩阵。
+    """
+    n_paths, width = annual_rates.shape
+    r = annual_rates / 100 / 12
+    balance = np.full(n_paths, float(principal))
+    fixed_payment = np.zeros(n_paths)
+    payments = np.zeros((n_paths, width))
+    principals = np.zeros((n_paths, width))
+    remaining = np.zeros((n_paths, width))
+    is_ei = repayment_method == RepaymentMethod.EQUAL_INSTALLMENT.value
+    base = principal / width if base_principal is None else base_principal
+
+    for t in range(width):
+        rt = r[:, t]
+        left = width - t
+        interest = balance * rt
+        if is_ei:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                growth = np.exp(np.log1p(rt) * left)
+                annuity = np.where(rt == 0, balance / left, balance * rt * growth / (growth - 1))
+            payment = np.maximum(fixed_payment, annuity) if keep_payment else annuity
+            fixed_payment = payment
+            prin = np.minimum(payment - interest, balance)
+        else:
+            prin = np.minimum(np.full(n_paths, base), balance)
+        if t == width - 1:
+            prin = balance.copy()
+        payments[:, t] = prin + interest
+        principals[:, t] = prin
+        balance = balance - prin
+        balance[balance < 0.005] = 0.0
+        remaining[:, t] = balance
+    return payments, principals, remaining
+
+
+def _simulate_chunk(args) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    (n_paths, seed, repricing_idx, current_lpr, spread, principal, repayment_method,
+     keep_payment, base_principal, path_kwargs) = args
+    levels = simulate_lpr_paths(n_paths, int(repricing_idx[-1]), current_lpr, seed=seed, **path_kwargs)
+    lpr = levels[:, repricing_idx]
+    rates = np.maximum(lpr + spread, 0.0)
+    payments, principals, remaining = _reprice_kernel(
+        principal, rates, repayment_method, keep_payment, base_principal,
+    )
+    return rates, payments, principals, remaining
+
+
+def simulate_schedule_under_lpr(
+    schedule: Union[pd.DataFrame, Schedule],
+    repayment_method: str,
+    current_lpr: float,
+    n_paths: int = 10000,
+    from_period: Optional[int] = None,
+    repricing_month: int = 1,
+    repricing_day: int = 1,
+    model: str = RANDOM_WALK,
+    volatility: float = 0.25,
+    drift: float = 0.0,
+    long_run_lpr: Optional[float] = None,
+    reversion_speed: float = 0.3,
+    floor: float = 0.0,
+    keep_payment: bool = False,
+    seed: Optional[int] = None,
+    chunk_paths: int = DEFAULT_CHUNK_PATHS,
+    max_workers: Optional[int] = None,
+) -> LprSimulation:
+    """
+    在 n_paths 条 LPR 路径下重定价 schedule 自 from_period 起的剩余部分。
+
+    加点（执行利率 - 当前 LPR）在整个期限内保持不变；路径按 chunk_paths 分块，
+    多核时分发到进程池并行计算。每块的随机种子由 seed 派生，结果与进程数无关。
+
+    Args:
+        schedule: 当前还款计划（含已执行的利率调整和提前还款）
+        repayment_method: 还款方式
+        current_lpr: 当前 5 年期以上 LPR(%)
+        from_period: 起始期数（默认首期），该期执行利率减去 current_lpr 即为加点
+        repricing_month / repricing_day: 每年的重定价日
+        model: "random_walk" / "mean_reverting"
+        volatility: 每次重定价 LPR 变动的标准差（百分点）
+        keep_payment: 等额本息重定价时保持月供不变（缩短期限）而非重算月供
+        max_workers: 进程数，默认 CPU 核数；为 1 时在当前进程内计算
+    """
+    sch = Schedule.coerce(schedule)
+    start = sch.first_period if from_period is None else max(int(from_period), sch.first_period)
+    idx = sch.index_of(start)
+    periods = sch.period[idx:].astype(np.int64)
+    due_dates = sch.due_date[idx:]
+    principal = sch.opening_principal(start)
+    spread = sch.value_at("applied_rate", start) - current_lpr
+    base_principal = None
+    if repayment_method == RepaymentMethod.EQUAL_PRINCIPAL.value:
+        base_principal = sch.value_at("principal", start)
+
+    repricing_idx = _repricing_index(due_dates, repricing_month, repricing_day)
+    path_kwargs = dict(
+        model=model, volatility=volatility, drift=drift, long_run_lpr=long_run_lpr,
+        reversion_speed=reversion_speed, floor=floor,
+    )
+    sizes = [min(chunk_paths, n_paths - lo) for lo in range(0, n_paths, chunk_paths)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [
+        (size, s, repricing_idx, current_lpr, spread, principal, repayment_method,
+         keep_payment, base_principal, path_kwargs)
+        for size, s in zip(sizes, seeds)
+    ]
+
+    workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_simulate_chunk, tasks))
+    else:
+        parts = [_simulate_chunk(task) for task in tasks]
+
+    rates, payments, principals, remaining = (np.concatenate(cols) for cols in zip(*parts))
+    total_interest = (payments - principals).sum(axis=1)
+    # 还清期：最后一笔本金为正的期次
+    paid = principals > 0
+    payoff_period = periods[paid.shape[1] - 1 - np.argmax(paid[:, ::-1], axis=1)]
+    return LprSimulation(
+        periods=periods,
+        due_dates=due_dates,
+        rates=rates,
+        payments=payments,
+        remaining=remaining,
+        total_interest=total_interest,
+        payoff_period=payoff_period,
+    )
@@ -0,0 +1,212 @@
+"""提前还款规划：在现金约束下自动决定何时、还多少、用哪种方式、还哪一部分"""
+from dataclasses import dataclass
+from datetime import date
+from itertools import permutations
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config.constants import PrepaymentMethod, PlanObjective
+from core.prepayment import (
+    PREPAYMENT_METHODS, apply_prepayment, calc_interest_saved, calc_reduce_payment, calc_shorten_term,
+)
+from core.schedule import Schedule, merge_components
+from core.schedule_generator import PlanSchedules
+
+COMPONENT_TYPES = ("commercial", "provident")
+
+
+@dataclass
+class PrepaymentPlan:
+    """
+    规划结果：events 为建议的提前还款记录（字段同提前还款记录表，可直接预览或保存），
+    schedules 为应用全部建议后的计划。
+    """
+    events: List[Dict]
+    schedules: PlanSchedules
+    interest_saved: float
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.events)
+
+
+def _cash_inflows(due_dates: np.ndarray, monthly_surplus: float, annual_bonus: float, bonus_month: int) -> np.ndarray:
+    """每期新增的可支配现金：月结余 + 奖金（还款日落在 bonus_month 的那一期）"""
+    months = due_dates.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    return monthly_surplus + np.where(months == bonus_month, annual_bonus, 0.0)
+
+
+def _evaluate_options(
+    components: List[Schedule],
+    period: int,
+    budget: float,
+    amount_step: float,
+    repayment_method: str,
+    objective: str,
+    methods: Tuple[str, ...],
+) -> Optional[Tuple[str, np.ndarray, float]]:
+    """
+    枚举「还款方式 × 各部分填充顺序」，每个选项在所有部分上一次向量化计算，
+    返回按目标最优的 (方式, 各部分金额, 节省利息)；没有可还部分时返回 None。
+    """
+    opening = np.array([c.opening_principal(period) for c in components])
+    monthly = np.array([c.value_at("monthly_payment", period, 0.0) for c in components])
+    rate = np.array([c.value_at("applied_rate", period, 0.0) for c in components])
+    remaining_term = np.array([max(c.last_period - period + 1, 0) for c in components])
+    # 每部分至少保留一个金额步长的本金（全额还清走结清流程）
+    capacity = np.where(remaining_term > 0, np.floor((opening - amount_step) / amount_step) * amount_step, 0.0)
+    capacity = np.maximum(capacity, 0.0)
+    live = np.flatnonzero(capacity > 0)
+    if not len(live):
+        return None
+    opening, monthly, rate, term = opening[live], monthly[live], rate[live], remaining_term[live]
+    # 无可还额度的部分（已还清或本金不足一个步长）不参与计算，但仍决定最终还清期
+    other_term = int(np.delete(remaining_term, live).max(initial=0))
+
+    best, best_score = None, None
+    for order in permutations(range(len(live))):
+        alloc = np.zeros(len(live))
+        left = budget
+        for i in order:
+            alloc[i] = min(capacity[live[i]], left)
+            left -= alloc[i]
+        active = alloc > 0
+        for method in methods:
+            saved = np.where(active, calc_interest_saved(
+                opening, alloc, rate, term, repayment_method, method,
+            ), 0.0)
+            if method == PrepaymentMethod.SHORTEN_TERM.value:
+                new_term, _ = calc_shorten_term(opening, alloc, rate, monthly, repayment_method)
+            else:
+                new_term, _ = calc_reduce_payment(opening, alloc, rate, term, repayment_method)
+            payoff = max(int(np.max(np.where(active, new_term, term))), other_term)
+            total_saved = float(saved.sum())
+            if objective == PlanObjective.EARLIEST_PAYOFF.value:
+                score = (-payoff, total_saved)
+            else:
+                score = (total_saved, -payoff)
+            if best_score is None or score > best_score:
+                full = np.zeros(len(components))
+                full[live] = alloc
+                best, best_score = (method, full, total_saved), score
+    return best
+
+
+def plan_prepayments(
+    plan: pd.Series,
+    schedules: PlanSchedules,
+    start_date: date,
+    repayment_day: int,
+    from_period: int,
+    monthly_surplus: float = 0.0,
+    annual_bonus: float = 0.0,
+    bonus_month: int = 12,
+    initial_cash: float = 0.0,
+    liquidity_floor: float = 0.0,
+    min_amount: float = 10000.0,
+    amount_step: float = 1000.0,
+    objective: str = PlanObjective.MAX_INTEREST_SAVED.value,
+    methods: Tuple[str, ...] = PREPAYMENT_METHODS,
+) -> PrepaymentPlan:
+    """
+    贪心规划提前还款：现金余额（扣除流动性底线）一旦达到 min_amount 就在当期还款，
+    金额按 amount_step 向下取整；每次在「方式 × 组合贷部分」中选目标最优的选项，
+    用 apply_prepayment 推进计划后继续向后搜索。提前还款越早节省越多，故尽早还即为贪心最优的时点。
+
+    Args:
+        plan: 贷款方案 Series
+        schedules: 当前计划（含已有事件）
+        from_period: 最早可提前还款的期数（通常为当前未还期）
+        monthly_surplus: 每月可用于提前还款的结余
+        annual_bonus / bonus_month: 每年奖金及其到账月份
+        initial_cash: 当前已有现金
+        liquidity_floor: 始终保留的最低现金
+        objective: PlanObjective 的取值
+    """
+    repayment_method = plan["repayment_method"]
+    merged = schedules.merged
+    if schedules.is_combined:
+        components = [schedules.commercial, schedules.provident]
+        # 沿用 generate_plan_schedules 合并时的利率（已按两位小数取整）
+        component_rate = float(merged.applied_rate[0]) if len(merged) else round(float(plan["commercial_rate"]), 2)
+    else:
+        components = [schedules.merged]
+
+    first_idx = max(merged.index_of(from_period), 0)
+    periods = merged.period[first_idx:].astype(np.int64)
+    inflows = _cash_inflows(merged.due_date[first_idx:], monthly_surplus, annual_bonus, bonus_month)
+    # 第 k 期还款前可动用的现金（未扣已花费）
+    available = initial_cash + np.cumsum(inflows) - liquidity_floor
+
+    events = []
+    spent = 0.0
+    total_saved = 0.0
+    k = 0
+    while k < len(periods):
+        hits = np.flatnonzero(available[k:] - spent >= min_amount)
+        if not len(hits):
+            break
+        k += int(hits[0])
+        period = int(periods[k])
+        if period > max(c.last_period for c in components):
+            break
+        budget = np.floor((available[k] - spent) / amount_step) * amount_step
+        choice = _evaluate_options(
+            components, period, budget, amount_step, repayment_method, objective, methods,
+        )
+        if choice is None:
+            break
+        method, alloc, _ = choice
+        if alloc.sum() < min_amount:
+            break
+
+        before = [c.opening_principal(period) for c in components]
+        old_monthly = sum(c.value_at("monthly_payment", period, 0.0) for c in components)
+        old_term = max(c.last_period for c in components) - period + 1
+        saved = 0.0
+        for i, amount in enumerate(alloc):
+            if amount <= 0:
+                continue
+            components[i], info = apply_prepayment(
+                components[i].plan_id, components[i], period, float(amount), method,
+                components[i].value_at("applied_rate", period), repayment_method,
+                start_date, repayment_day,
+            )
+            saved += float(info["interest_saved"])
+
+        amount = float(alloc.sum())
+        event = {
+            "plan_id": plan["plan_id"],
+            "prepayment_date": pd.Timestamp(merged.due_date[first_idx + k]).strftime("%Y-%m-%d"),
+            "prepayment_period": period,
+            "amount": amount,
+            "method": method,
+            "remaining_principal_before": float(sum(before)),
+            "remaining_principal_after": float(sum(before)) - amount,
+            "old_term_remaining": old_term,
+            "new_term_remaining": max(c.last_period for c in components) - period + 1,
+            "old_monthly_payment": old_monthly,
+            "new_monthly_payment": sum(c.value_at("monthly_payment", period, 0.0) for c in components),
+            "interest_saved": saved,
+        }
+        if schedules.is_combined:
+            active = [t for t, a in zip(COMPONENT_TYPES, alloc) if a > 0]
+            event.update({
+                "prepayment_type": active[0] if len(active) == 1 else "both",
+                "amount_commercial": float(alloc[0]),
+                "amount_provident": float(alloc[1]),
+            })
+        events.append(event)
+        spent += amount
+        total_saved += saved
+        k += 1
+
+    if schedules.is_combined:
+        result = PlanSchedules(
+            merge_components(merged.plan_id, components[0], components[1], component_rate),
+            commercial=components[0], provident=components[1],
+        )
+    else:
+        result = PlanSchedules(components[0])
+    return PrepaymentPlan(events=events, schedules=result, interest_saved=total_saved)
@@ -1,146 +1,145 @@
 """提前还款计算"""
-import math
+from dataclasses import dataclass
 from datetime import date
-from typing import Dict, Tuple, Optional
+from typing import Dict, Tuple, Optional, Union
 
+import numpy as np
 import pandas as pd
+from numpy.typing import ArrayLike
 
 from config.constants import RepaymentMethod, PrepaymentMethod, LoanType
-from core.calculator import generate_schedule, calc_equal_installment, generate_combined_schedule
+from core.calculator import (
+    build_schedule, annuity_factor, equal_principal_total_interest,
+)
+from core.schedule import Schedule, merge_components
+from utils.date_utils import add_months
+
+
+def _is_scalar(*values) -> bool:
+    return all(np.ndim(v) == 0 for v in values)
 
 
 def calc_shorten_term(
-    remaining_principal: float,
-    prepay_amount: float,
-    annual_rate: float,
-    old_monthly_payment: float,
+    remaining_principal: ArrayLike,
+    prepay_amount: ArrayLike,
+    annual_rate: ArrayLike,
+    old_monthly_payment: ArrayLike,
     repayment_method: str,
-) -> Tuple[int, float]:
-    """缩短年限：月供不变，计算新期数。返回 (新剩余期数, 新月供)"""
-    new_principal = remaining_principal - prepay_amount
-    r = annual_rate / 100 / 12
+) -> Tuple[ArrayLike, ArrayLike]:
+    """
+    缩短年限：月供不变，计算新期数。返回 (新剩余期数, 新月供)。
+    参数可为数组（按广播规则逐项计算），标量输入返回标量。
+    """
+    scalar = _is_scalar(remaining_principal, prepay_amount, annual_rate, old_monthly_payment)
+    remaining_principal = np.asarray(remaining_principal, dtype=np.float64)
+    old_monthly_payment = np.asarray(old_monthly_payment, dtype=np.float64)
+    new_principal = remaining_principal - np.asarray(prepay_amount, dtype=np.float64)
+    r = np.asarray(annual_rate, dtype=np.float64) / 100 / 12
 
-    if repayment_method == RepaymentMethod.EQUAL_INSTALLMENT.value:
-        if r == 0:
-            new_term = math.ceil(new_principal / old_monthly_payment)
-        else:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if repayment_method == RepaymentMethod.EQUAL_INSTALLMENT.value:
             # M = P * r * (1+r)^n / ((1+r)^n - 1)
             # 解 n: n = -ln(1 - P*r/M) / ln(1+r)
             ratio = new_principal * r / old_monthly_payment
-            if ratio >= 1:
-                # 月供不足以覆盖利息，无法缩短
-                new_term = math.ceil(new_principal / old_monthly_payment)
-            else:
-                new_term = math.ceil(-math.log(1 - ratio) / math.log(1 + r))
-        new_monthly = old_monthly_payment
-    else:
-        # 等额本金：保持每月还的本金不变
-        old_base = old_monthly_payment - remaining_principal * r  # 近似
-        if old_base <= 0:
-            old_base = remaining_principal / 360  # fallback
-        new_term = math.ceil(new_principal / old_base)
-        new_monthly = old_base + new_principal * r  # 新首月月供
+            # 零利率或月供不足以覆盖利息（无法缩短）时按本金 / 月供计
+            solvable = (r != 0) & (ratio < 1)
+            new_term = np.where(
+                solvable,
+                np.ceil(-np.log(1 - np.where(solvable, ratio, 0)) / np.log(1 + np.where(solvable, r, 1))),
+                np.ceil(new_principal / old_monthly_payment),
+            )
+            new_monthly = np.broadcast_to(old_monthly_payment, new_term.shape)
+        else:
+            # 等额本金：保持每月还的本金不变
+            old_base = old_monthly_payment - remaining_principal * r  # 近似
+            old_base = np.where(old_base <= 0, remaining_principal / 360, old_base)  # fallback
+            new_term = np.ceil(new_principal / old_base)
+            new_monthly = old_base + new_principal * r  # 新首月月供
 
-    return max(new_term, 1), new_monthly
+    new_term = np.maximum(new_term, 1).astype(np.int64)
+    if scalar:
+        return int(new_term), float(new_monthly)
+    return new_term, new_monthly
 
 
 def calc_reduce_payment(
-    remaining_principal: float,
-    prepay_amount: float,
-    annual_rate: float,
-    remaining_term: int,
+    remaining_principal: ArrayLike,
+    prepay_amount: ArrayLike,
+    annual_rate: ArrayLike,
+    remaining_term: ArrayLike,
     repayment_method: str,
-) -> Tuple[int, float]:
-    """减少月供：期数不变，计算新月供。返回 (剩余期数, 新月供)"""
-    new_principal = remaining_principal - prepay_amount
-    r = annual_rate / 100 / 12
+) -> Tuple[ArrayLike, ArrayLike]:
+    """减少月供：期数不变，计算新月供。返回 (剩余期数, 新月供)，支持数组输入"""
+    scalar = _is_scalar(remaining_principal, prepay_amount, annual_rate, remaining_term)
+    new_principal = np.asarray(remaining_principal, dtype=np.float64) - np.asarray(prepay_amount, dtype=np.float64)
 
     if repayment_method == RepaymentMethod.EQUAL_INSTALLMENT.value:
-        if r == 0:
-            new_monthly = new_principal / remaining_term
-        else:
-            new_monthly = new_principal * r * (1 + r) ** remaining_term / ((1 + r) ** remaining_term - 1)
+        new_monthly = new_principal * annuity_factor(annual_rate, remaining_term)
     else:
-        base = new_principal / remaining_term
-        new_monthly = base + new_principal * r  # 新首月
+        r = np.asarray(annual_rate, dtype=np.float64) / 100 / 12
+        new_monthly = new_principal / remaining_term + new_principal * r  # 新首月
 
-    return remaining_term, new_monthly
+    if scalar:
+        return remaining_term, float(new_monthly)
+    term = np.broadcast_to(np.asarray(remaining_term, dtype=np.int64), np.shape(new_monthly))
+    return term, new_monthly
+
+
+def _remaining_interest(principal, annual_rate, term, repayment_method: str):
+    """剩余 term 期的总利息（闭式）"""
+    if repayment_method == RepaymentMethod.EQUAL_INSTALLMENT.value:
+        total = principal * annuity_factor(annual_rate, term) * term - principal
+        return np.where(np.asarray(annual_rate) == 0, 0.0, total)
+    return equal_principal_total_interest(principal, annual_rate, term)
 
 
 def calc_interest_saved(
-    remaining_principal: float,
-    prepay_amount: float,
-    annual_rate: float,
-    remaining_term: int,
+    remaining_principal: ArrayLike,
+    prepay_amount: ArrayLike,
+    annual_rate: ArrayLike,
+    remaining_term: ArrayLike,
     repayment_method: str,
     method: str,
-) -> float:
-    """计算提前还款节省的利息"""
-    r = annual_rate / 100 / 12
+) -> ArrayLike:
+    """计算提前还款节省的利息，支持数组输入（标量输入返回 float）"""
+    scalar = _is_scalar(remaining_principal, prepay_amount, annual_rate, remaining_term)
+    remaining_principal = np.asarray(remaining_principal, dtype=np.float64)
+    annual_rate = np.asarray(annual_rate, dtype=np.float64)
+    remaining_term = np.asarray(remaining_term, dtype=np.int64)
+    new_principal = remaining_principal - np.asarray(prepay_amount, dtype=np.float64)
 
     # 原方案剩余总利息
-    if repayment_method == RepaymentMethod.EQUAL_INSTALLMENT.value:
-        if r == 0:
-            original_total_interest = 0
-        else:
-            monthly = remaining_principal * r * (1 + r) ** remaining_term / ((1 + r) ** remaining_term - 1)
-            original_total_interest = monthly * remaining_term - remaining_principal
-    else:
-        base = remaining_principal / remaining_term
-        original_total_interest = sum(
-            (remaining_principal - i * base) * r for i in range(remaining_term)
-        )
+    original_total_interest = _remaining_interest(
+        remaining_principal, annual_rate, remaining_term, repayment_method,
+    )
 
     # 新方案剩余总利息
-    new_principal = remaining_principal - prepay_amount
     if method == PrepaymentMethod.SHORTEN_TERM.value:
-        # 先算出原月供
+        # 先算出原月供（等额本金为原首月月供），再求缩短后的期数
         if repayment_method == RepaymentMethod.EQUAL_INSTALLMENT.value:
-            if r == 0:
-                old_mp = remaining_principal / remaining_term
-            else:
-                old_mp = remaining_principal * r * (1 + r) ** remaining_term / ((1 + r) ** remaining_term - 1)
-            new_term, _ = calc_shorten_term(
-                remaining_principal, prepay_amount, annual_rate,
-                old_mp, repayment_method,
-            )
-            new_total_interest = old_mp * new_term - new_principal
+            old_mp = remaining_principal * annuity_factor(annual_rate, remaining_term)
         else:
-            # 等额本金：计算原首月月供，然后调用 calc_shorten_term
-            if r == 0:
-                old_mp = remaining_principal / remaining_term
-            else:
-                old_base = remaining_principal / remaining_term
-                old_mp = old_base + remaining_principal * r
-            new_term, new_monthly_first = calc_shorten_term(
-                remaining_principal, prepay_amount, annual_rate,
-                old_mp, repayment_method,
-            )
-            base = new_principal / new_term
-            new_total_interest = sum(
-                (new_principal - i * base) * r for i in range(new_term)
-            )
-    else:
-        new_term = remaining_term
+            old_mp = remaining_principal / remaining_term + remaining_principal * (annual_rate / 100 / 12)
+        new_term, _ = calc_shorten_term(
+            remaining_principal, prepay_amount, annual_rate,
+            old_mp, repayment_method,
+        )
         if repayment_method == RepaymentMethod.EQUAL_INSTALLMENT.value:
-            if r == 0:
-                new_monthly = new_principal / new_term
-            else:
-                new_monthly = new_principal * r * (1 + r) ** new_term / ((1 + r) ** new_term - 1)
-            new_total_interest = new_monthly * new_term - new_principal
+            new_total_interest = old_mp * new_term - new_principal
         else:
-            base = new_principal / new_term
-            new_total_interest = sum(
-                (new_principal - i * base) * r for i in range(new_term)
-            )
+            new_total_interest = equal_principal_total_interest(new_principal, annual_rate, new_term)
+    else:
+        new_total_interest = _remaining_interest(
+            new_principal, annual_rate, remaining_term, repayment_method,
+        )
 
-    saved = original_total_interest - new_total_interest
-    return max(saved, 0)
+    saved = np.maximum(original_total_interest - new_total_interest, 0.0)
+    return float(saved) if scalar else saved
 
 
 def apply_prepayment(
     plan_id: str,
-    schedule: pd.DataFrame,
+    schedule: Union[pd.DataFrame, Schedule],
     prepay_period: int,
     prepay_amount: float,
     method: str,
@@ -148,29 +147,24 @@ def apply_prepayment(
     repayment_method: str,
     start_date: date,
     repayment_day: int,
-) -> Tuple[pd.DataFrame, Dict]:
+) -> Tuple[Union[pd.DataFrame, Schedule], Dict]:
     """
     执行提前还款：保留已还部分，从提前还款点重新生成后续计划。
-    返回 (新完整还款计划, 提前还款记录信息)
+    返回 (新完整还款计划, 提前还款记录信息)，计划类型与传入的 schedule 一致。
     """
+    sch = Schedule.coerce(schedule)
+
     # 已还部分保留
-    paid_part = schedule[schedule["period"] < prepay_period].copy()
+    paid_part = sch.before(prepay_period)
 
-    # 找到提前还款前的剩余本金
-    if prepay_period == 1:
-        remaining_before = schedule.iloc[0]["remaining_principal"] + schedule.iloc[0]["principal"]
-    else:
-        prev = schedule[schedule["period"] == prepay_period - 1]
-        if prev.empty:
-            prev = schedule[schedule["period"] < prepay_period].iloc[-1:]
-        remaining_before = float(prev.iloc[0]["remaining_principal"])
+    # 找到提前还款前的剩余本金：取本期期初余额，同一期已有的提前还款已计入其中
+    remaining_before = sch.opening_principal(prepay_period)
 
     remaining_after = remaining_before - prepay_amount
-    old_remaining_term = len(schedule) - prepay_period + 1
+    old_remaining_term = len(sch) - prepay_period + 1
 
     # 旧月供
-    current_row = schedule[schedule["period"] == prepay_period]
-    old_monthly = float(current_row.iloc[0]["monthly_payment"]) if not current_row.empty else 0
+    old_monthly = sch.value_at("monthly_payment", prepay_period, 0)
 
     if method == PrepaymentMethod.SHORTEN_TERM.value:
         new_term, new_monthly = calc_shorten_term(
@@ -192,85 +186,40 @@ def apply_prepayment(
     )
 
     # 累计值
-    cum_p = float(paid_part["cumulative_principal"].iloc[-1]) if not paid_part.empty else 0
-    cum_i = float(paid_part["cumulative_interest"].iloc[-1]) if not paid_part.empty else 0
+    cum_p = paid_part.last_value("cumulative_principal")
+    cum_i = paid_part.last_value("cumulative_interest")
     cum_p += prepay_amount
 
     # 生成新的后续还款计划
-    from utils.date_utils import add_months, get_due_date
-    from config.constants import REPAYMENT_SCHEDULE_COLUMNS
-
     new_start = add_months(start_date, prepay_period - 1)
+    base_principal = None
 
     # ========== 等额本金+缩短年限特殊处理：保持每月本金不变 ==========
     if (repayment_method == RepaymentMethod.EQUAL_PRINCIPAL.value
         and method == PrepaymentMethod.SHORTEN_TERM.value
-        and len(schedule) > 0):
+        and len(sch) > 0):
 
         # 获取原来的每月本金（从第一期获取最准确）
-        original_base_principal = float(schedule.iloc[0]["principal"])
+        base_principal = sch.value_at("principal", sch.first_period)
 
         # 用剩余本金和原来的每月本金计算新期限
-        new_term = max(1, int(remaining_after / original_base_principal))
+        new_term = max(1, int(remaining_after / base_principal))
         # 向上取整修正
-        if remaining_after - new_term * original_base_principal > 0.01:
+        if remaining_after - new_term * base_principal > 0.01:
             new_term += 1
 
-        r = annual_rate / 100 / 12
-        remaining = remaining_after
-        current_cum_p = cum_p
-        current_cum_i = cum_i
-
-        records = []
-        for i in range(new_term):
-            period = prepay_period + i
-            due = get_due_date(start_date, prepay_period + i, repayment_day)
-
-            # 每月本金保持不变，最后一期调整
-            if i == new_term - 1:
-                prin = remaining
-            else:
-                prin = original_base_principal
-
-            interest = remaining * r if r > 0 else 0
-            payment = prin + interest
-
-            remaining -= prin
-            if remaining < 0.005:
-                remaining = 0.0
-
-            current_cum_p += prin
-            current_cum_i += interest
-
-            records.append({
-                "plan_id": plan_id,
-                "period": period,
-                "due_date": due.strftime("%Y-%m-%d"),
-                "monthly_payment": payment,
-                "principal": prin,
-                "interest": interest,
-                "remaining_principal": remaining,
-                "cumulative_principal": current_cum_p,
-                "cumulative_interest": current_cum_i,
-                "applied_rate": annual_rate,
-                "is_paid": False,
-                "actual_pay_date": None,
-            })
-
-        new_schedule = pd.DataFrame(records, columns=REPAYMENT_SCHEDULE_COLUMNS)
-        new_monthly = float(new_schedule.iloc[0]["monthly_payment"]) if len(new_schedule) > 0 else 0
-
-    else:
-        # 其他情况用正常方式生成
-        new_schedule = generate_schedule(
-            plan_id, remaining_after, annual_rate, new_term,
-            repayment_method, new_start, repayment_day,
-            start_period=prepay_period,
-            existing_cumulative_principal=cum_p,
-            existing_cumulative_interest=cum_i,
-        )
+    new_schedule = build_schedule(
+        plan_id, remaining_after, annual_rate, new_term,
+        repayment_method, new_start, repayment_day,
+        start_period=prepay_period,
+        existing_cumulative_principal=cum_p,
+        existing_cumulative_interest=cum_i,
+        base_principal=base_principal,
+    )
+    if base_principal is not None:
+        new_monthly = new_schedule.value_at("monthly_payment", prepay_period, 0)
 
-    full_schedule = pd.concat([paid_part, new_schedule], ignore_index=True)
+    full_schedule = Schedule.concat(paid_part, new_schedule)
 
     prepay_info = {
         "remaining_principal_before": remaining_before,
@@ -282,7 +231,9 @@ def apply_prepayment(
         "interest_saved": interest_saved,
     }
 
-    return full_schedule, prepay_info
+    if isinstance(schedule, Schedule):
+        return full_schedule, prepay_info
+    return full_schedule.to_frame(), prepay_info
 
 
 def split_combined_schedule(schedule: pd.DataFrame, plan_id: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
@@ -309,8 +260,8 @@ def apply_combined_prepayment(
     method: str,
     start_date: date,
     repayment_day: int,
-    sch_c_current: Optional[pd.DataFrame] = None,
-    sch_p_current: Optional[pd.DataFrame] = None,
+    sch_c_current: Optional[Union[pd.DataFrame, Schedule]] = None,
+    sch_p_current: Optional[Union[pd.DataFrame, Schedule]] = None,
 ) -> Tuple[pd.DataFrame, Dict]:
     """
     组合贷提前还款：分别处理商贷和公积金部分，然后合并
@@ -330,11 +281,6 @@ def apply_combined_prepayment(
     Returns:
         (新合并计划, 汇总信息)
     """
-    from core.calculator import generate_schedule
-
-    # 已还部分保留
-    paid_part = schedule[schedule["period"] < prepay_period].copy()
-
     commercial_rate = float(plan["commercial_rate"])
     provident_rate = float(plan["provident_rate"])
     repayment_method = plan["repayment_method"]
@@ -342,108 +288,65 @@ def apply_combined_prepayment(
 
     # 使用外部传入的事件感知 schedule（包含历史提前还款），或从原始参数生成
     if sch_c_current is not None:
-        sch_c_full = sch_c_current
+        sch_c_full = Schedule.coerce(sch_c_current)
     else:
         commercial_principal_initial = float(plan["commercial_amount"])
-        sch_c_full = generate_schedule(
+        sch_c_full = build_schedule(
             plan_id + "_c", commercial_principal_initial, commercial_rate, term_months,
             repayment_method, start_date, repayment_day
         )
     if sch_p_current is not None:
-        sch_p_full = sch_p_current
+        sch_p_full = Schedule.coerce(sch_p_current)
     else:
         provident_principal_initial = float(plan["provident_amount"])
-        sch_p_full = generate_schedule(
+        sch_p_full = build_schedule(
             plan_id + "_p", provident_principal_initial, provident_rate, term_months,
             repayment_method, start_date, repayment_day
         )
 
     # 3. 找到 prepay_period 时的剩余本金
-    if prepay_period == 1:
-        rem_before_c = float(sch_c_full.iloc[0]["remaining_principal"]) + float(sch_c_full.iloc[0]["principal"])
-        rem_before_p = float(sch_p_full.iloc[0]["remaining_principal"]) + float(sch_p_full.iloc[0]["principal"])
-    else:
-        prev_c = sch_c_full[sch_c_full["period"] == prepay_period - 1]
-        prev_p = sch_p_full[sch_p_full["period"] == prepay_period - 1]
-        rem_before_c = float(prev_c.iloc[0]["remaining_principal"]) if not prev_c.empty else 0
-        rem_before_p = float(prev_p.iloc[0]["remaining_principal"]) if not prev_p.empty else 0
+    rem_before_c = sch_c_full.opening_principal(prepay_period)
+    rem_before_p = sch_p_full.opening_principal(prepay_period)
 
     # 4. 对商贷部分提前还款（如果需要）
-    sch_c_result = None
-    info_c = {}
     if prepay_type in ["commercial", "both"] and amount_commercial > 0:
         sch_c_result, info_c = apply_prepayment(
             plan_id + "_c", sch_c_full, prepay_period, amount_commercial,
             method, commercial_rate, repayment_method, start_date, repayment_day
         )
     else:
-        sch_c_result = sch_c_full.copy()
+        sch_c_result = sch_c_full
         info_c = {"interest_saved": 0.0, "new_monthly_payment": 0.0}
 
     # 5. 对公积金部分提前还款（如果需要）
-    sch_p_result = None
-    info_p = {}
     if prepay_type in ["provident", "both"] and amount_provident > 0:
         sch_p_result, info_p = apply_prepayment(
             plan_id + "_p", sch_p_full, prepay_period, amount_provident,
             method, provident_rate, repayment_method, start_date, repayment_day
         )
     else:
-        sch_p_result = sch_p_full.copy()
+        sch_p_result = sch_p_full
         info_p = {"interest_saved": 0.0, "new_monthly_payment": 0.0}
 
-    # 6. 合并两个计划 - 按 period 对齐合并
-    # 创建 period 到数据的映射
-    c_by_period = {row["period"]: row for _, row in sch_c_result.iterrows()}
-    p_by_period = {row["period"]: row for _, row in sch_p_result.iterrows()}
-
-    all_periods = sorted(set(list(c_by_period.keys()) + list(p_by_period.keys())))
-
-    # 合并记录
-    combined_records = []
-    for period in all_periods:
-        c_row = c_by_period.get(period)
-        p_row = p_by_period.get(period)
-
-        if c_row is not None and p_row is not None:
-            # 两部分都有数据，直接合并
-            record = c_row.copy()
-            for col in ["monthly_payment", "principal", "interest",
-                        "remaining_principal", "cumulative_principal", "cumulative_interest"]:
-                record[col] = c_row[col] + p_row[col]
-        elif c_row is not None:
-            # 只有商贷有数据（公积金已还清）
-            record = c_row.copy()
-        else:
-            # 只有公积金有数据（商贷已还清）
-            record = p_row.copy()
+    # 计算新月供（首月）
+    old_monthly = 0
+    new_monthly = 0
+    for full, result in [(sch_c_full, sch_c_result), (sch_p_full, sch_p_result)]:
+        if result.index_of(prepay_period) >= 0:
+            old_monthly += full.value_at("monthly_payment", prepay_period)
+            new_monthly += result.value_at("monthly_payment", prepay_period)
 
-        combined_records.append(record)
+    old_term_remaining = max(len(sch_c_full), len(sch_p_full)) - prepay_period + 1
+    new_term_remaining = max(len(sch_c_result), len(sch_p_result)) - prepay_period + 1
 
-    combined = pd.DataFrame(combined_records)
-    combined["applied_rate"] = commercial_rate
-    combined["plan_id"] = plan_id
+    # 6. 按期数对齐合并两个计划（已还清的一方流量补 0，累计值沿用最后一期）
+    combined = merge_components(plan_id, sch_c_result, sch_p_result, commercial_rate).to_frame()
 
     # 7. 汇总信息
     total_rem_before = rem_before_c + rem_before_p
     total_rem_after = (rem_before_c - amount_commercial) + (rem_before_p - amount_provident)
     total_saved = info_c.get("interest_saved", 0) + info_p.get("interest_saved", 0)
 
-    # 计算新月供（首月）
-    row_c = sch_c_result[sch_c_result["period"] == prepay_period]
-    row_p = sch_p_result[sch_p_result["period"] == prepay_period]
-    old_monthly = 0
-    new_monthly = 0
-    if not row_c.empty:
-        old_monthly += float(sch_c_full[sch_c_full["period"] == prepay_period].iloc[0]["monthly_payment"])
-        new_monthly += float(row_c.iloc[0]["monthly_payment"])
-    if not row_p.empty:
-        old_monthly += float(sch_p_full[sch_p_full["period"] == prepay_period].iloc[0]["monthly_payment"])
-        new_monthly += float(row_p.iloc[0]["monthly_payment"])
-
-    old_term_remaining = max(len(sch_c_full), len(sch_p_full)) - prepay_period + 1
-    new_term_remaining = max(len(sch_c_result), len(sch_p_result)) - prepay_period + 1
-
     prepay_info = {
         "remaining_principal_before": total_rem_before,
         "remaining_principal_after": total_rem_after,
@@ -460,3 +363,84 @@ def apply_combined_prepayment(
     }
 
     return combined, prepay_info
+
+
+PREPAYMENT_METHODS = (PrepaymentMethod.SHORTEN_TERM.value, PrepaymentMethod.REDUCE_PAYMENT.value)
+
+
+@dataclass
+class PrepaymentGrid:
+    """
+    提前还款 what-if 网格：每个数组形状为 (期数, 金额, 方式)。
+
+    金额不小于当期剩余本金的格子（应走结清流程）填 NaN / -1。
+    """
+    periods: np.ndarray
+    amounts: np.ndarray
+    methods: Tuple[str, ...]
+    interest_saved: np.ndarray
+    new_term: np.ndarray
+    new_payment: np.ndarray
+
+    def method_index(self, method: str) -> int:
+        return self.methods.index(method)
+
+    def saved_frame(self, method: str) -> pd.DataFrame:
+        """某种方式的节省利息矩阵（行=期数，列=金额），用于热力图"""
+        return pd.DataFrame(
+            self.interest_saved[:, :, self.method_index(method)],
+            index=pd.Index(self.periods, name="period"),
+            columns=pd.Index(self.amounts, name="amount"),
+        )
+
+
+def prepayment_grid(
+    schedule: Union[pd.DataFrame, Schedule],
+    amounts: ArrayLike,
+    repayment_method: str,
+    from_period: Optional[int] = None,
+    methods: Tuple[str, ...] = PREPAYMENT_METHODS,
+) -> PrepaymentGrid:
+    """
+    一次向量化计算「每个未来期数 × 每个金额 × 每种方式」的提前还款效果。
+
+    每期的剩余本金、剩余期数、月供和执行利率取自 schedule，
+    再按广播规则套用 calc_shorten_term / calc_reduce_payment / calc_interest_saved 的闭式公式。
+    """
+    sch = Schedule.coerce(schedule)
+    amounts = np.asarray(amounts, dtype=np.float64).ravel()
+    start = sch.first_period if from_period is None else max(int(from_period), sch.first_period)
+    idx = np.arange(max(start - sch.first_period, 0), len(sch))
+
+    periods = sch.period[idx].astype(np.int64)
+    # (P, 1) 与 (1, A) 广播为 (P, A)
+    opening = (sch.remaining_principal[idx] + sch.principal[idx])[:, None]
+    monthly = sch.monthly_payment[idx][:, None]
+    rate = sch.applied_rate[idx][:, None]
+    remaining_term = (len(sch) - idx)[:, None]
+    amount = amounts[None, :]
+
+    shape = (len(periods), len(amounts), len(methods))
+    interest_saved = np.full(shape, np.nan)
+    new_term = np.full(shape, -1, dtype=np.int64)
+    new_payment = np.full(shape, np.nan)
+    valid = (amount > 0) & (amount < opening)
+
+    for k, method in enumerate(methods):
+        if method == PrepaymentMethod.SHORTEN_TERM.value:
+            term, payment = calc_shorten_term(opening, amount, rate, monthly, repayment_method)
+        else:
+            term, payment = calc_reduce_payment(opening, amount, rate, remaining_term, repayment_method)
+        saved = calc_interest_saved(opening, amount, rate, remaining_term, repayment_method, method)
+        new_term[:, :, k] = np.where(valid, term, -1)
+        new_payment[:, :, k] = np.where(valid, payment, np.nan)
+        interest_saved[:, :, k] = np.where(valid, saved, np.nan)
+
+    return PrepaymentGrid(
+        periods=periods,
+        amounts=amounts,
+        methods=tuple(methods),
+        interest_saved=interest_saved,
+        new_term=new_term,
+        new_payment=new_payment,
+    )
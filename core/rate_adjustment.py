@@ -1,47 +1,47 @@
 """利率调整处理"""
 from datetime import date
-from typing import Tuple, Dict
+from typing import Tuple, Dict, Union
 
 import pandas as pd
 
-from core.calculator import generate_schedule
+from core.calculator import build_schedule
+from core.schedule import Schedule
 from utils.date_utils import add_months
 
 
 def apply_rate_adjustment(
     plan_id: str,
-    schedule: pd.DataFrame,
+    schedule: Union[pd.DataFrame, Schedule],
     effective_period: int,
     new_rate: float,
     repayment_method: str,
     start_date: date,
     repayment_day: int,
-) -> Tuple[pd.DataFrame, Dict]:
+) -> Tuple[Union[pd.DataFrame, Schedule], Dict]:
     """
     从 effective_period 开始用新利率重新生成后续还款计划。
-    返回 (新完整计划, 调整影响摘要)
+    返回 (新完整计划, 调整影响摘要)，计划类型与传入的 schedule 一致。
     """
+    sch = Schedule.coerce(schedule)
+
     # 保留生效前的已有记录
-    before = schedule[schedule["period"] < effective_period].copy()
+    before = sch.before(effective_period)
 
     if before.empty:
-        remaining = schedule.iloc[0]["remaining_principal"] + schedule.iloc[0]["principal"]
+        remaining = sch.opening_principal(sch.first_period)
         cum_p = 0.0
         cum_i = 0.0
     else:
-        last = before.iloc[-1]
-        remaining = float(last["remaining_principal"])
-        cum_p = float(last["cumulative_principal"])
-        cum_i = float(last["cumulative_interest"])
+        remaining = before.last_value("remaining_principal")
+        cum_p = before.last_value("cumulative_principal")
+        cum_i = before.last_value("cumulative_interest")
 
-    old_rate = float(schedule[schedule["period"] == effective_period].iloc[0]["applied_rate"]) \
-        if not schedule[schedule["period"] == effective_period].empty \
-        else float(schedule.iloc[0]["applied_rate"])
+    old_rate = sch.value_at("applied_rate", effective_period, sch.value_at("applied_rate", sch.first_period))
 
-    remaining_term = len(schedule) - effective_period + 1
+    remaining_term = len(sch) - effective_period + 1
     new_start = add_months(start_date, effective_period - 1)
 
-    after = generate_schedule(
+    after = build_schedule(
         plan_id, remaining, new_rate, remaining_term,
         repayment_method, new_start, repayment_day,
         start_period=effective_period,
@@ -49,15 +49,14 @@ def apply_rate_adjustment(
         existing_cumulative_interest=cum_i,
     )
 
-    full = pd.concat([before, after], ignore_index=True)
+    full = Schedule.concat(before, after)
 
     # 计算影响
-    old_remaining_interest = schedule[schedule["period"] >= effective_period]["interest"].sum()
-    new_remaining_interest = after["interest"].sum()
+    old_remaining_interest = sch.total("interest", sch.first_period + len(before))
+    new_remaining_interest = after.total("interest")
 
-    old_monthly = float(schedule[schedule["period"] == effective_period].iloc[0]["monthly_payment"]) \
-        if not schedule[schedule["period"] == effective_period].empty else 0
-    new_monthly = float(after.iloc[0]["monthly_payment"]) if not after.empty else 0
+    old_monthly = sch.value_at("monthly_payment", effective_period, 0)
+    new_monthly = after.value_at("monthly_payment", effective_period, 0)
 
     summary = {
         "old_rate": old_rate,
@@ -70,4 +69,6 @@ def apply_rate_adjustment(
         "interest_change": round(new_remaining_interest - old_remaining_interest, 2),
     }
 
-    return full, summary
+    if isinstance(schedule, Schedule):
+        return full, summary
+    return full.to_frame(), summary
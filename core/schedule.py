@@ -0,0 +1,281 @@
+"""
+列式还款计划
+
+core 内部统一使用 Schedule 在模块间传递还款计划：金额列为连续的 float64 数组，
+期数为 int32，还款日为 datetime64[D]。期数连续递增，按期数定位为 O(1)。
+仅在 UI / CLI 边界通过 to_frame() 转换为 DataFrame。
+
+Schedule 由若干分段拼接而成，每段是某个数据源的 [lo, hi) 行区间：
+摊还分段（core.calculator.Segment，按参数惰性生成）或已物化的数组块。
+提前还款、利率调整只截断分段列表并追加新分段，不复制行数据；
+列仅在首次访问时拼接并缓存。对外返回的列数组均为只读。
+"""
+from bisect import bisect_right
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config.constants import REPAYMENT_SCHEDULE_COLUMNS
+from core.fixed_point import to_fen
+from utils.date_utils import format_dates
+
+MONEY_COLUMNS = (
+    "monthly_payment", "principal", "interest", "remaining_principal",
+    "cumulative_principal", "cumulative_interest",
+)
+
+COLUMN_DTYPES = {
+    "period": np.dtype(np.int32),
+    "due_date": np.dtype("datetime64[D]"),
+    **{col: np.dtype(np.float64) for col in MONEY_COLUMNS + ("applied_rate",)},
+}
+
+
+class _Block:
+    """已物化的连续期次（来自 DataFrame 或显式数组）"""
+    __slots__ = ("start_period", "term", "_columns")
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        self._columns = columns
+        self.term = len(columns["period"])
+        self.start_period = int(columns["period"][0]) if self.term else 1
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        return self._columns
+
+
+def _column(name: str) -> property:
+    return property(lambda self: self.column(name), doc=f"{name} 列（只读）")
+
+
+class Schedule:
+    __slots__ = ("plan_id", "_parts", "_offsets", "_cache")
+
+    def __init__(
+        self,
+        plan_id: str,
+        period: np.ndarray,
+        due_date: np.ndarray,
+        monthly_payment: np.ndarray,
+        principal: np.ndarray,
+        interest: np.ndarray,
+        remaining_principal: np.ndarray,
+        cumulative_principal: np.ndarray,
+        cumulative_interest: np.ndarray,
+        applied_rate: np.ndarray,
+    ):
+        values = (period, due_date, monthly_payment, principal, interest, remaining_principal,
+                  cumulative_principal, cumulative_interest, applied_rate)
+        block = _Block({
+            name: np.ascontiguousarray(arr, dtype=dtype)
+            for (name, dtype), arr in zip(COLUMN_DTYPES.items(), values)
+        })
+        self._init(plan_id, ((block, 0, block.term),))
+
+    def _init(self, plan_id: str, parts: Sequence[Tuple]):
+        self.plan_id = plan_id
+        self._parts = tuple(p for p in parts if p[2] > p[1])
+        offsets = [0]
+        for _, lo, hi in self._parts:
+            offsets.append(offsets[-1] + hi - lo)
+        self._offsets = offsets
+        self._cache = {}
+
+    @classmethod
+    def from_parts(cls, plan_id: str, parts: Sequence[Tuple]) -> "Schedule":
+        """由 (分段, lo, hi) 列表构建，不复制数据"""
+        sch = cls.__new__(cls)
+        sch._init(plan_id, parts)
+        return sch
+
+    @classmethod
+    def empty_schedule(cls, plan_id: str = "") -> "Schedule":
+        return cls.from_parts(plan_id, ())
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, plan_id: Optional[str] = None) -> "Schedule":
+        """从 DataFrame 构建（UI 层传入的计划可能含字符串或 object 列）"""
+        if df is None or df.empty:
+            return cls.empty_schedule(plan_id or "")
+        if plan_id is None:
+            plan_id = str(df["plan_id"].iloc[0]) if "plan_id" in df.columns else ""
+        money = {
+            col: pd.to_numeric(df[col], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+            for col in MONEY_COLUMNS + ("applied_rate",)
+        }
+        due = pd.to_datetime(df["due_date"]).to_numpy().astype("datetime64[D]")
+        return cls(plan_id, df["period"].to_numpy(dtype=np.int32), due, **money)
+
+    @staticmethod
+    def coerce(schedule) -> "Schedule":
+        return schedule if isinstance(schedule, Schedule) else Schedule.from_frame(schedule)
+
+    # ---------- 列访问（按需物化） ----------
+
+    period = _column("period")
+    due_date = _column("due_date")
+    monthly_payment = _column("monthly_payment")
+    principal = _column("principal")
+    interest = _column("interest")
+    remaining_principal = _column("remaining_principal")
+    cumulative_principal = _column("cumulative_principal")
+    cumulative_interest = _column("cumulative_interest")
+    applied_rate = _column("applied_rate")
+
+    def column(self, name: str) -> np.ndarray:
+        values = self._cache.get(name)
+        if values is None:
+            pieces = [part.columns()[name][lo:hi] for part, lo, hi in self._parts]
+            if not pieces:
+                values = np.empty(0, dtype=COLUMN_DTYPES[name])
+            elif len(pieces) == 1:
+                values = pieces[0]
+            else:
+                values = np.concatenate(pieces)
+            values.setflags(write=False)
+            self._cache[name] = values
+        return values
+
+    def to_frame(self, fen: bool = False) -> pd.DataFrame:
+        """转为 DataFrame；fen=True 时金额列输出为 int64 分（用于对账导出）"""
+        money = {col: self.column(col) for col in MONEY_COLUMNS}
+        if fen:
+            money = {col: to_fen(values) for col, values in money.items()}
+        return pd.DataFrame({
+            "plan_id": self.plan_id,
+            "period": self.period.astype(np.int64),
+            "due_date": format_dates(self.due_date),
+            **money,
+            "applied_rate": self.applied_rate,
+            "is_paid": False,
+            "actual_pay_date": None,
+        }, columns=REPAYMENT_SCHEDULE_COLUMNS)
+
+    # ---------- 按期数定位（只生成所在分段） ----------
+
+    def __len__(self) -> int:
+        return self._offsets[-1]
+
+    @property
+    def empty(self) -> bool:
+        return len(self) == 0
+
+    @property
+    def segment_count(self) -> int:
+        return len(self._parts)
+
+    @property
+    def first_period(self) -> int:
+        if not self._parts:
+            return 1
+        part, lo, _ = self._parts[0]
+        return part.start_period + lo
+
+    @property
+    def last_period(self) -> int:
+        return self.first_period + len(self) - 1 if self._parts else 0
+
+    def index_of(self, period: int) -> int:
+        """期数对应的行号（期数连续，O(1)）；不存在时返回 -1"""
+        idx = int(period) - self.first_period
+        return idx if 0 <= idx < len(self) else -1
+
+    def value_at(self, name: str, period: int, default: Optional[float] = None) -> Optional[float]:
+        """第 period 期某列的值；期数不存在时返回 default"""
+        idx = self.index_of(period)
+        if idx < 0:
+            return default
+        k = bisect_right(self._offsets, idx) - 1
+        part, lo, _ = self._parts[k]
+        return float(part.columns()[name][lo + idx - self._offsets[k]])
+
+    def last_value(self, name: str, default: float = 0.0) -> float:
+        return self.value_at(name, self.last_period, default)
+
+    def total(self, name: str, from_period: Optional[int] = None) -> float:
+        """某列从 from_period（默认首期）起的合计"""
+        start = 0 if from_period is None else max(int(from_period) - self.first_period, 0)
+        result = 0.0
+        for (part, lo, hi), offset in zip(self._parts, self._offsets):
+            skip = max(start - offset, 0)
+            if lo + skip < hi:
+                result += float(part.columns()[name][lo + skip:hi].sum())
+        return result
+
+    def row(self, period: int) -> Optional[Dict]:
+        idx = self.index_of(period)
+        if idx < 0:
+            return None
+        return {
+            "period": int(period),
+            "due_date": self.due_date[idx],
+            **{col: self.value_at(col, period) for col in MONEY_COLUMNS + ("applied_rate",)},
+        }
+
+    def opening_principal(self, period: int) -> float:
+        """第 period 期还款前的剩余本金"""
+        if self.index_of(period) < 0:
+            return self.last_value("remaining_principal") if period > self.last_period and len(self) else 0.0
+        return self.value_at("remaining_principal", period) + self.value_at("principal", period)
+
+    # ---------- 分段操作（O(分段数)，不复制行数据） ----------
+
+    def _slice(self, start: int, stop: int) -> "Schedule":
+        """第 [start, stop) 行"""
+        parts = []
+        for (part, lo, hi), offset in zip(self._parts, self._offsets):
+            a = max(start - offset, 0)
+            b = min(stop - offset, hi - lo)
+            if a < b:
+                parts.append((part, lo + a, lo + b))
+        return Schedule.from_parts(self.plan_id, parts)
+
+    def head(self, n: int) -> "Schedule":
+        """前 n 行"""
+        return self._slice(0, max(0, n))
+
+    def before(self, period: int) -> "Schedule":
+        """period 之前的所有期次"""
+        return self.head(int(period) - self.first_period)
+
+    def window(self, first_period: int, last_period: int) -> "Schedule":
+        """[first_period, last_period] 区间内的期次，仅生成涉及的分段"""
+        return self._slice(int(first_period) - self.first_period, int(last_period) - self.first_period + 1)
+
+    def with_plan_id(self, plan_id: str) -> "Schedule":
+        sch = Schedule.from_parts(plan_id, self._parts)
+        sch._cache = dict(self._cache)
+        return sch
+
+    @staticmethod
+    def concat(head: "Schedule", tail: "Schedule") -> "Schedule":
+        if head.empty:
+            return tail
+        if tail.empty:
+            return head
+        return Schedule.from_parts(tail.plan_id, head._parts + tail._parts)
+
+
+def merge_components(plan_id: str, first: Schedule, second: Schedule, applied_rate: float) -> Schedule:
+    """
+    按期数对齐合并组合贷的两部分（两者均从同一期开始）。
+    较短一方结束后流量按 0 计，累计本金/利息沿用其最后一期的值。
+    """
+    longer = first if len(first) >= len(second) else second
+    n = len(longer)
+    money = {}
+    for col in MONEY_COLUMNS:
+        total = np.zeros(n, dtype=np.float64)
+        for sch in (first, second):
+            values = sch.column(col)
+            if len(values) == 0:
+                continue
+            total[:len(values)] += values
+            if col.startswith("cumulative_") and len(values) < n:
+                total[len(values):] += values[-1]
+        money[col] = total
+    return Schedule(
+        plan_id, longer.period, longer.due_date, **money,
+        applied_rate=np.full(n, float(applied_rate)),
+    )
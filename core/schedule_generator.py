@@ -4,22 +4,31 @@
 根据贷款方案基础信息 + 事件历史（利率调整、提前还款）动态生成完整还款计划，
 不再存储完整计划到 Excel，保证每次计算的准确性。
 """
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import date, datetime
-from typing import Optional, Tuple, Dict, List
+from typing import Any, Callable, Optional, Dict, List
 
+import numpy as np
 import pandas as pd
 
-from config.constants import RepaymentMethod, LoanType, PrepaymentMethod, REPAYMENT_SCHEDULE_COLUMNS
-from core.calculator import generate_schedule, generate_combined_schedule
+from config import settings
+from config.constants import LoanType, PrepaymentMethod, REPAYMENT_SCHEDULE_COLUMNS
+from core.calculator import build_schedule
 from core.prepayment import apply_prepayment
 from core.rate_adjustment import apply_rate_adjustment
+from core.schedule import Schedule, merge_components
+from core.schedule_store import plan_fingerprint, load_schedules, save_schedules
+from utils.date_utils import periods_on_or_after
 
 
-def _mark_is_paid_by_date(schedule: pd.DataFrame) -> pd.DataFrame:
-    """根据 due_date <= today 自动标记 is_paid"""
-    today = date.today()
-    schedule["is_paid"] = pd.to_datetime(schedule["due_date"]).dt.date <= today
-    return schedule
+def _to_marked_frame(schedule: Schedule) -> pd.DataFrame:
+    """Schedule -> DataFrame，并直接用 datetime64 还款日标记 is_paid"""
+    df = schedule.to_frame()
+    df["is_paid"] = schedule.due_date <= np.datetime64(date.today(), "D")
+    return df
 
 
 def _parse_date(d) -> Optional[date]:
@@ -42,7 +51,7 @@ def _event_sort_key(event: Dict) -> tuple:
     return (event["period"], priority.get(event["type"], 9), event.get("_order", 0))
 
 
-def _normalize_combined_prepayment(pp: pd.Series, plan: pd.Series) -> Dict[str, float | str]:
+def _normalize_combined_prepayment(pp: Dict, plan: pd.Series) -> Dict[str, float | str]:
     prepayment_type = pp.get("prepayment_type")
     if prepayment_type == "combined":
         prepayment_type = "both"
@@ -81,13 +90,102 @@ def _normalize_prepayment_method(method) -> str:
     return PrepaymentMethod.SHORTEN_TERM.value
 
 
-def generate_plan_schedule_from_events(
+# 事件重放检查点：键为 hash(方案 + 有序事件前缀)，值为应用完该前缀后的计划状态
+# （Schedule 或组合贷的 (商贷, 公积金) 二元组）。Schedule 是摊还分段列表，每段记录起始期数、
+# 期初本金、利率、期数、还款方式与累计本息偏移，检查点之间共享分段，几乎不占额外内存。
+# 方案或某个事件变化只会改变其后的键，重放从第一个变化的事件开始。
+REPLAY_CACHE_SIZE = 4096
+_CHECKPOINTS: "OrderedDict[str, Any]" = OrderedDict()
+# 各页面会话线程共享检查点，查找（含 LRU 调整）、插入与淘汰都要持锁
+_checkpoints_lock = threading.Lock()
+
+_EVENT_FIELDS = {
+    "rate_adjustment": ("new_rate",),
+    "prepayment": ("amount", "method", "prepayment_type", "amount_commercial", "amount_provident"),
+}
+
+
+def _chain_key(prefix_key: str, item: tuple) -> str:
+    return hashlib.blake2b(f"{prefix_key}|{item!r}".encode(), digest_size=16).hexdigest()
+
+
+def _event_fingerprint(event: Dict) -> tuple:
+    data = event["data"]
+    return (event["type"], event["period"]) + tuple(
+        str(data.get(f)) for f in _EVENT_FIELDS[event["type"]]
+    )
+
+
+def _replay(
+    base_key: str,
+    events: List[Dict],
+    initial_state: Callable[[], Any],
+    apply_event: Callable[[Any, Dict], Any],
+):
+    """从最长的已缓存事件前缀继续重放，并为之后的每个事件记录检查点"""
+    keys = []
+    key = base_key
+    for event in events:
+        key = _chain_key(key, _event_fingerprint(event))
+        keys.append(key)
+
+    start, state = 0, None
+    with _checkpoints_lock:
+        for i in range(len(keys) - 1, -1, -1):
+            cached = _CHECKPOINTS.get(keys[i])
+            if cached is not None:
+                _CHECKPOINTS.move_to_end(keys[i])
+                start, state = i + 1, cached
+                break
+    if state is None:
+        state = initial_state()
+
+    # 重放本身不持锁，只在登记检查点时加锁
+    for i in range(start, len(events)):
+        state = apply_event(state, events[i])
+        with _checkpoints_lock:
+            _CHECKPOINTS[keys[i]] = state
+            if len(_CHECKPOINTS) > REPLAY_CACHE_SIZE:
+                _CHECKPOINTS.popitem(last=False)
+    return state
+
+
+def clear_replay_cache() -> None:
+    with _checkpoints_lock:
+        _CHECKPOINTS.clear()
+
+
+@dataclass(frozen=True)
+class PlanSchedules:
+    """
+    一次事件重放得到的全部计划。
+
+    merged 为方案的完整计划；组合贷另含 commercial / provident 两个分量（其余贷款为 None）。
+    计划均为不可变的 Schedule，可在页面间缓存共享，to_frame() 每次返回新的 DataFrame。
+    """
+    merged: Schedule
+    commercial: Optional[Schedule] = None
+    provident: Optional[Schedule] = None
+
+    @property
+    def is_combined(self) -> bool:
+        return self.commercial is not None
+
+    def to_frame(self, which: str = "merged") -> pd.DataFrame:
+        """which: "merged" / "commercial" / "provident"，并按今天的日期标记 is_paid"""
+        schedule = getattr(self, which)
+        if schedule is None:
+            return pd.DataFrame(columns=REPAYMENT_SCHEDULE_COLUMNS)
+        return _to_marked_frame(schedule)
+
+
+def generate_plan_schedules(
     plan: pd.Series,
     prepayments: Optional[pd.DataFrame] = None,
     rate_adjustments: Optional[pd.DataFrame] = None,
-) -> pd.DataFrame:
+) -> PlanSchedules:
     """
-    根据贷款方案和事件历史动态生成完整还款计划
+    根据贷款方案和事件历史一次重放生成合并计划及组合贷各分量
 
     Args:
         plan: 贷款方案 Series，包含所有必要字段
@@ -95,7 +193,7 @@ def generate_plan_schedule_from_events(
         rate_adjustments: 利率调整记录 DataFrame
 
     Returns:
-        完整的还款计划 DataFrame
+        PlanSchedules
     """
     # 解析基础参数
     plan_id = plan["plan_id"]
@@ -104,7 +202,7 @@ def generate_plan_schedule_from_events(
     start_date = _parse_date(plan["start_date"])
     repayment_day = int(plan.get("repayment_day", 1))
     if start_date is None:
-        return pd.DataFrame(columns=REPAYMENT_SCHEDULE_COLUMNS)
+        return PlanSchedules(Schedule.empty_schedule(plan_id))
 
     # 初始本金和利率
     if loan_type == LoanType.COMBINED.value:
@@ -123,26 +221,23 @@ def generate_plan_schedule_from_events(
 
     term_months = int(plan["term_months"])
 
-    # 基础计划（用于映射生效日期到期数）
-    base_schedule = generate_schedule(
-        plan_id, principal, annual_rate, term_months,
-        repayment_method, start_date, repayment_day,
-    )
-
     # 收集所有事件，按期数排序
     events = []
 
-    # 添加利率调整事件
+    # 添加利率调整事件：生效日期统一在还款日历上一次映射为期数
     order = 0
     if rate_adjustments is not None and not rate_adjustments.empty:
-        for _, ra in rate_adjustments.iterrows():
-            effective_date = _parse_date(ra.get("effective_date"))
-            if effective_date is not None:
-                base_schedule["due_date_dt"] = pd.to_datetime(base_schedule["due_date"])
-                eff_rows = base_schedule[base_schedule["due_date_dt"] >= pd.Timestamp(effective_date)]
-                if eff_rows.empty:
+        records = rate_adjustments.to_dict("records")
+        effective_dates = [_parse_date(ra.get("effective_date")) for ra in records]
+        dated = [i for i, d in enumerate(effective_dates) if d is not None]
+        mapped = dict(zip(dated, periods_on_or_after(
+            start_date, term_months, repayment_day, [effective_dates[i] for i in dated],
+        ).tolist()))
+        for i, ra in enumerate(records):
+            if i in mapped:
+                period = mapped[i]
+                if period == 0:
                     continue
-                period = int(eff_rows.iloc[0]["period"])
             else:
                 if "effective_period" not in ra or pd.isna(ra["effective_period"]):
                     continue
@@ -157,7 +252,7 @@ def generate_plan_schedule_from_events(
 
     # 添加提前还款事件
     if prepayments is not None and not prepayments.empty:
-        for _, pp in prepayments.iterrows():
+        for pp in prepayments.to_dict("records"):
             # 兼容旧数据：如果没有 prepayment_period，暂时跳过
             if "prepayment_period" not in pp or pd.isna(pp["prepayment_period"]):
                 continue
@@ -172,25 +267,34 @@ def generate_plan_schedule_from_events(
     # 按期数排序事件
     events.sort(key=_event_sort_key)
 
+    base_key = _chain_key("", (
+        plan_id, loan_type, repayment_method, start_date.isoformat(), repayment_day,
+        term_months, plan.get("commercial_amount"), plan.get("provident_amount"),
+        plan.get("commercial_rate"), plan.get("provident_rate"),
+        settings.MONEY_MODE, settings.FEN_ROUNDING,
+    ))
+
     # ========== 组合贷特殊处理：分别维护商贷和公积金两个独立 schedule ==========
     if loan_type == LoanType.COMBINED.value:
-        # 生成初始独立计划
-        sch_c = generate_schedule(
-            plan_id + "_c", commercial_principal, commercial_rate, term_months,
-            repayment_method, start_date, repayment_day
-        )
-        sch_p = generate_schedule(
-            plan_id + "_p", provident_principal, provident_rate, term_months,
-            repayment_method, start_date, repayment_day
-        )
+        def initial_state():
+            # 生成初始独立计划
+            sch_c = build_schedule(
+                plan_id + "_c", commercial_principal, commercial_rate, term_months,
+                repayment_method, start_date, repayment_day
+            )
+            sch_p = build_schedule(
+                plan_id + "_p", provident_principal, provident_rate, term_months,
+                repayment_method, start_date, repayment_day
+            )
+            return sch_c, sch_p
 
-        # 依次应用事件到两个独立 schedule
-        for event in events:
+        def apply_event(state, event):
+            sch_c, sch_p = state
             event_period = event["period"]
 
             max_len = max(len(sch_c), len(sch_p))
             if event_period < 1 or event_period > max_len:
-                continue
+                return state
 
             if event["type"] == "prepayment":
                 pp = event["data"]
@@ -213,56 +317,20 @@ def generate_plan_schedule_from_events(
                             plan_id + "_p", sch_p, event_period, amount_p, method,
                             provident_rate, repayment_method, start_date, repayment_day
                         )
+            return sch_c, sch_p
 
-        # 最后合并两个 schedule
-        c_by_period = {row["period"]: row for _, row in sch_c.iterrows()}
-        p_by_period = {row["period"]: row for _, row in sch_p.iterrows()}
-        last_c = sch_c.iloc[-1] if not sch_c.empty else None
-        last_p = sch_p.iloc[-1] if not sch_p.empty else None
-        last_c_cum_p = float(last_c["cumulative_principal"]) if last_c is not None else 0.0
-        last_c_cum_i = float(last_c["cumulative_interest"]) if last_c is not None else 0.0
-        last_p_cum_p = float(last_p["cumulative_principal"]) if last_p is not None else 0.0
-        last_p_cum_i = float(last_p["cumulative_interest"]) if last_p is not None else 0.0
-        all_periods = sorted(set(list(c_by_period.keys()) + list(p_by_period.keys())))
-
-        combined_records = []
-        for period in all_periods:
-            c_row = c_by_period.get(period)
-            p_row = p_by_period.get(period)
-
-            if c_row is not None and p_row is not None:
-                record = c_row.copy()
-                for col in ["monthly_payment", "principal", "interest",
-                            "remaining_principal", "cumulative_principal", "cumulative_interest"]:
-                    record[col] = c_row[col] + p_row[col]
-            elif c_row is not None:
-                record = c_row.copy()
-                record["cumulative_principal"] = float(c_row["cumulative_principal"]) + last_p_cum_p
-                record["cumulative_interest"] = float(c_row["cumulative_interest"]) + last_p_cum_i
-            else:
-                record = p_row.copy()
-                record["cumulative_principal"] = float(p_row["cumulative_principal"]) + last_c_cum_p
-                record["cumulative_interest"] = float(p_row["cumulative_interest"]) + last_c_cum_i
-
-            combined_records.append(record)
+        sch_c, sch_p = _replay(base_key, events, initial_state, apply_event)
 
-        schedule = pd.DataFrame(combined_records)
-        schedule["applied_rate"] = commercial_rate
-        schedule["plan_id"] = plan_id
-
-        _mark_is_paid_by_date(schedule)
-        return schedule
+        # 最后按期数对齐合并两个 schedule
+        merged = merge_components(plan_id, sch_c, sch_p, commercial_rate)
+        return PlanSchedules(merged, commercial=sch_c, provident=sch_p)
 
     # ========== 普通贷款处理 ==========
-    # 第一步：生成初始计划
-    schedule = base_schedule.copy()
-
-    # 依次应用事件
-    for event in events:
+    def apply_event(schedule, event):
         event_period = event["period"]
 
         if event_period < 1 or event_period > len(schedule):
-            continue
+            return schedule
 
         if event["type"] == "rate_adjustment":
             ra = event["data"]
@@ -277,41 +345,109 @@ def generate_plan_schedule_from_events(
             method = _normalize_prepayment_method(pp.get("method"))
 
             # 普通贷款提前还款
-            current_row = schedule[schedule["period"] == event_period]
-            applied_rate = float(current_row.iloc[0]["applied_rate"]) if not current_row.empty else annual_rate
+            applied_rate = schedule.value_at("applied_rate", event_period, annual_rate)
             schedule, _ = apply_prepayment(
                 plan_id, schedule, event_period, prepay_amount, method,
                 applied_rate, repayment_method, start_date, repayment_day,
             )
+        return schedule
 
-    _mark_is_paid_by_date(schedule)
-    return schedule
+    def initial_state():
+        return build_schedule(
+            plan_id, principal, annual_rate, term_months,
+            repayment_method, start_date, repayment_day,
+        )
 
+    return PlanSchedules(_replay(base_key, events, initial_state, apply_event))
 
-def get_plan_schedule(plan_id: str) -> pd.DataFrame:
+
+def generate_plan_schedule_from_events(
+    plan: pd.Series,
+    prepayments: Optional[pd.DataFrame] = None,
+    rate_adjustments: Optional[pd.DataFrame] = None,
+) -> pd.DataFrame:
     """
-    从数据存储读取方案信息和事件历史，动态生成还款计划
+    根据贷款方案和事件历史动态生成完整还款计划
 
-    这是替代 get_repayment_schedule 的新入口函数
+    Args:
+        plan: 贷款方案 Series，包含所有必要字段
+        prepayments: 提前还款记录 DataFrame
+        rate_adjustments: 利率调整记录 DataFrame
+
+    Returns:
+        完整的还款计划 DataFrame
+    """
+    return generate_plan_schedules(plan, prepayments, rate_adjustments).to_frame()
+
+
+def resolve_plan_periods(plan: pd.Series, dates, periods: Optional[int] = None) -> np.ndarray:
+    """
+    将日期（生效日期、提前还款日期等）映射为方案的期数，超出计划范围为 0
+
+    Args:
+        plan: 贷款方案 Series
+        dates: 单个日期或日期序列
+        periods: 计划当前期数（提前还款缩短年限后可能小于 term_months）
+    """
+    start_date = _parse_date(plan["start_date"])
+    if periods is None:
+        periods = int(plan["term_months"])
+    return periods_on_or_after(start_date, periods, int(plan.get("repayment_day", 1)), dates)
+
+
+def get_plan_schedules(plan_id: str) -> PlanSchedules:
+    """
+    从数据存储读取方案信息和事件历史，一次重放得到合并计划及组合贷各分量；
+    结果按方案与事件的指纹持久化到 SCHEDULE_STORE_DIR，指纹不变时直接读取
 
     Args:
         plan_id: 贷款方案 ID
 
     Returns:
-        动态生成的完整还款计划 DataFrame
+        PlanSchedules；方案不存在时 merged 为空计划
     """
     from data_manager.excel_handler import (
-        get_plan_by_id, get_prepayments, get_rate_adjustments,
+        get_plan_by_id, get_prepayments, get_rate_adjustments, read_snapshot,
     )
 
-    plan = get_plan_by_id(plan_id)
-    if plan is None:
-        return pd.DataFrame(columns=REPAYMENT_SCHEDULE_COLUMNS)
+    # 三次读取基于同一版本的数据，避免读到另一会话写了一半的方案与事件组合
+    with read_snapshot():
+        plan = get_plan_by_id(plan_id)
+        if plan is None:
+            return PlanSchedules(Schedule.empty_schedule(plan_id))
+        prepayments = get_prepayments(plan_id)
+        rate_adjustments = get_rate_adjustments(plan_id)
+
+    if not settings.SCHEDULE_STORE_ENABLED:
+        return generate_plan_schedules(plan, prepayments, rate_adjustments)
+
+    # 指纹未变时直接内存映射磁盘上的物化结果，不再重放事件
+    fingerprint = plan_fingerprint(plan, prepayments, rate_adjustments)
+    stored = load_schedules(settings.SCHEDULE_STORE_DIR, plan_id, fingerprint)
+    if stored is not None:
+        return PlanSchedules(**stored)
+    schedules = generate_plan_schedules(plan, prepayments, rate_adjustments)
+    if not schedules.merged.empty:
+        components = {"merged": schedules.merged}
+        if schedules.is_combined:
+            components.update(commercial=schedules.commercial, provident=schedules.provident)
+        save_schedules(settings.SCHEDULE_STORE_DIR, plan_id, fingerprint, components)
+    return schedules
 
-    prepayments = get_prepayments(plan_id)
-    rate_adjustments = get_rate_adjustments(plan_id)
 
-    return generate_plan_schedule_from_events(plan, prepayments, rate_adjustments)
+def get_plan_schedule(plan_id: str) -> pd.DataFrame:
+    """
+    从数据存储读取方案信息和事件历史，动态生成还款计划
+
+    这是替代 get_repayment_schedule 的新入口函数
+
+    Args:
+        plan_id: 贷款方案 ID
+
+    Returns:
+        动态生成的完整还款计划 DataFrame
+    """
+    return get_plan_schedules(plan_id).to_frame()
 
 
 def generate_single_component_schedule(
@@ -349,7 +485,7 @@ def generate_single_component_schedule(
 
     plan_id = plan["plan_id"]
 
-    sch = generate_schedule(
+    sch = build_schedule(
         plan_id + suffix, principal, rate, term_months,
         repayment_method, start_date, repayment_day
     )
@@ -382,5 +518,4 @@ def generate_single_component_schedule(
                         rate, repayment_method, start_date, repayment_day
                     )
 
-    _mark_is_paid_by_date(sch)
-    return sch
+    return _to_marked_frame(sch)
@@ -0,0 +1,110 @@
+"""
+物化还款计划的持久化列式缓存
+
+按方案及其事件历史的指纹把重放结果写到磁盘：每个计划一个目录、每列一个 .npy 文件，
+读取时以只读内存映射打开，Schedule 直接引用映射数组，不复制也不重放。
+指纹变化（方案或事件被修改）时旧目录被替换；同一方案只保留最新一份。
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import settings
+from core.schedule import COLUMN_DTYPES, Schedule
+
+# 计划生成逻辑或存储格式变化时递增，使旧缓存全部失效
+STORE_VERSION = 2
+
+COMPONENTS = ("merged", "commercial", "provident")
+_META_FILE = "meta.json"
+
+
+def plan_fingerprint(
+    plan: pd.Series,
+    prepayments: Optional[pd.DataFrame] = None,
+    rate_adjustments: Optional[pd.DataFrame] = None,
+) -> str:
+    """方案字段 + 两类事件记录 + 金额模式与舍入规则的内容指纹"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"v{STORE_VERSION}|{settings.MONEY_MODE}|{settings.FEN_ROUNDING}|".encode())
+    h.update(repr(sorted((str(k), str(v)) for k, v in plan.items())).encode())
+    for events in (prepayments, rate_adjustments):
+        h.update(b"|")
+        if events is not None and not events.empty:
+            h.update(events.to_csv(index=False).encode())
+    return h.hexdigest()
+
+
+def _plan_prefix(plan_id: str) -> str:
+    return hashlib.blake2b(str(plan_id).encode(), digest_size=6).hexdigest()
+
+
+def _entry_dir(cache_dir: Path, plan_id: str, fingerprint: str) -> Path:
+    return Path(cache_dir) / f"{_plan_prefix(plan_id)}_{fingerprint}"
+
+
+def load_schedules(cache_dir: Path, plan_id: str, fingerprint: str) -> Optional[Dict[str, Schedule]]:
+    """命中时返回 {分量: Schedule}（列为只读内存映射），否则 None"""
+    entry = _entry_dir(cache_dir, plan_id, fingerprint)
+    try:
+        meta = json.loads((entry / _META_FILE).read_text(encoding="utf-8"))
+        return {
+            which: Schedule(
+                meta["plan_ids"][which],
+                *(np.load(entry / which / f"{name}.npy", mmap_mode="r") for name in COLUMN_DTYPES),
+            )
+            for which in meta["components"]
+        }
+    except (FileNotFoundError, KeyError, ValueError):
+        return None
+
+
+def save_schedules(cache_dir: Path, plan_id: str, fingerprint: str, schedules: Dict[str, Schedule]):
+    """
+    写入 {分量: Schedule}，并删除该方案的旧缓存。
+
+    先写到临时目录再整体改名，读者只会看到完整的目录；并发写入同一指纹时后到者直接放弃。
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    target = _entry_dir(cache_dir, plan_id, fingerprint)
+    tmp = Path(tempfile.mkdtemp(prefix=".tmp-", dir=cache_dir))
+    try:
+        for which, schedule in schedules.items():
+            (tmp / which).mkdir()
+            for name in COLUMN_DTYPES:
+                np.save(tmp / which / f"{name}.npy", schedule.column(name))
+        meta = {
+            "plan_id": str(plan_id),
+            "fingerprint": fingerprint,
+            "components": list(schedules),
+            "plan_ids": {which: sch.plan_id for which, sch in schedules.items()},
+        }
+        (tmp / _META_FILE).write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, target)
+    except OSError:
+        if not target.exists():
+            raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    for old in cache_dir.glob(f"{_plan_prefix(plan_id)}_*"):
+        if old != target:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def clear_schedule_store(cache_dir: Path, plan_id: Optional[str] = None):
+    """删除某个方案（或全部）的缓存"""
+    cache_dir = Path(cache_dir)
+    if not cache_dir.exists():
+        return
+    pattern = "*" if plan_id is None else f"{_plan_prefix(plan_id)}_*"
+    for entry in cache_dir.glob(pattern):
+        shutil.rmtree(entry, ignore_errors=True)
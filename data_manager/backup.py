@@ -0,0 +1,319 @@
+"""
+增量、去重、异步的数据文件备份
+
+快照按内容寻址：文件内容的 sha256 即对象名，压缩后存于 <数据目录>/backups/objects，
+内容相同的快照只存一份，与上一个快照相同时直接跳过。每个数据文件有一份快照索引
+<文件名>.index.json，按数量和天数清理旧快照，不再被任何索引引用的对象随之删除。
+
+写入后调用 request_backup 只登记请求，由后台线程在 BACKUP_COALESCE_SECONDS 内
+没有新的写入（最多推迟 BACKUP_MAX_DELAY_SECONDS）后拍一次快照，突发的多次写入合并为一个快照。
+
+拍快照与清理对象持有备份目录的跨进程锁，避免另一进程在索引写入前删掉刚写入的对象；
+恢复持有数据文件的写锁，与工作簿提交互斥。
+
+SQLite 数据库（WAL 模式下文件本身可能不含最新提交）通过 sqlite3 的在线备份接口
+复制出一致的副本再拍快照，恢复时同样经由备份接口写回，其他连接与 -wal/-shm 文件保持一致。
+"""
+import atexit
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from data_manager.locking import file_lock, lock_path
+from config.settings import (
+    BACKUP_SUBDIR, BACKUP_KEEP_COUNT, BACKUP_MAX_AGE_DAYS,
+    BACKUP_COALESCE_SECONDS, BACKUP_MAX_DELAY_SECONDS, LOCK_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+_CHUNK = 1 << 20
+_lock = threading.RLock()
+
+
+def backup_dir(filepath: Path) -> Path:
+    return Path(filepath).parent / BACKUP_SUBDIR
+
+
+def _dir_lock(root: Path):
+    """备份目录的跨进程锁：保护索引读-改-写与对象清理"""
+    return file_lock(root / ".lock")
+
+
+def _index_path(filepath: Path) -> Path:
+    return backup_dir(filepath) / f"{Path(filepath).name}.index.json"
+
+
+def _object_path(root: Path, digest: str) -> Path:
+    return root / "objects" / digest[:2] / f"{digest}.gz"
+
+
+def _digest(f) -> Tuple[str, int]:
+    h = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: f.read(_CHUNK), b""):
+        h.update(chunk)
+        size += len(chunk)
+    return h.hexdigest(), size
+
+
+def _atomic_write(path: Path, write):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def _is_sqlite(filepath: Path) -> bool:
+    from data_manager.excel_handler import is_sqlite_path
+    return is_sqlite_path(filepath)
+
+
+def _remove_sqlite_files(path: str):
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        Path(path + suffix).unlink(missing_ok=True)
+
+
+@contextmanager
+def _open_source(filepath: Path) -> Iterator[Optional[BinaryIO]]:
+    """
+    打开要拍快照的内容，文件不存在时为 None。
+    工作簿直接打开（期间被原子替换时已打开的句柄仍指向同一版本）；
+    SQLite 数据库先用在线备份接口复制出一致的副本。
+    """
+    if not _is_sqlite(filepath):
+        try:
+            src = open(filepath, "rb")
+        except FileNotFoundError:
+            yield None
+            return
+        with src:
+            yield src
+        return
+    if not filepath.exists():
+        yield None
+        return
+    root = backup_dir(filepath)
+    root.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{filepath.name}.", suffix=".copy", dir=root)
+    os.close(fd)
+    try:
+        live, copy = sqlite3.connect(filepath, timeout=LOCK_TIMEOUT), sqlite3.connect(tmp)
+        try:
+            live.backup(copy)
+        finally:
+            copy.close()
+            live.close()
+        with open(tmp, "rb") as src:
+            yield src
+    finally:
+        _remove_sqlite_files(tmp)
+
+
+def list_snapshots(filepath: Path) -> List[dict]:
+    """快照索引（按时间升序），每项含 snapshot_id / digest / size / created_at"""
+    try:
+        return json.loads(_index_path(filepath).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return []
+
+
+def _write_index(filepath: Path, snapshots: List[dict]):
+    data = json.dumps(snapshots, ensure_ascii=False, indent=1).encode("utf-8")
+    _atomic_write(_index_path(filepath), lambda f: f.write(data))
+
+
+def snapshot(filepath: Path, now: Optional[datetime] = None) -> Optional[dict]:
+    """
+    同步拍一次快照；文件不存在或与最新快照内容相同时返回 None。
+    按内容 sha256 去重存储压缩对象，随后执行保留策略。
+    """
+    filepath = Path(filepath)
+    root = backup_dir(filepath)
+    now = now or datetime.now()
+    with _open_source(filepath) as src, _lock, _dir_lock(root):
+        if src is None:
+            return None
+        digest, size = _digest(src)
+        snapshots = list_snapshots(filepath)
+        if snapshots and snapshots[-1]["digest"] == digest:
+            return None
+        obj = _object_path(root, digest)
+        if not obj.exists():
+            def write(f):
+                src.seek(0)
+                with gzip.GzipFile(fileobj=f, mode="wb", mtime=0) as gz:
+                    shutil.copyfileobj(src, gz, _CHUNK)
+            _atomic_write(obj, write)
+        record = {
+            "snapshot_id": now.strftime("%Y%m%d_%H%M%S_%f"),
+            "digest": digest,
+            "size": size,
+            "created_at": now.isoformat(),
+        }
+        snapshots.append(record)
+        _write_index(filepath, _apply_retention(snapshots, now))
+        _collect_garbage(root)
+        return record
+
+
+def _apply_retention(snapshots: List[dict], now: datetime) -> List[dict]:
+    """保留最近 BACKUP_KEEP_COUNT 个且不超过 BACKUP_MAX_AGE_DAYS 天的快照；最新的一个总是保留"""
+    cutoff = now - timedelta(days=BACKUP_MAX_AGE_DAYS)
+    kept = [s for s in snapshots[-BACKUP_KEEP_COUNT:] if datetime.fromisoformat(s["created_at"]) >= cutoff]
+    return kept or snapshots[-1:]
+
+
+def _collect_garbage(root: Path):
+    """删除不再被任何索引引用的对象"""
+    referenced = set()
+    for index in root.glob("*.index.json"):
+        referenced.update(s["digest"] for s in json.loads(index.read_text(encoding="utf-8")))
+    for obj in root.glob("objects/*/*.gz"):
+        if obj.name[:-len(".gz")] not in referenced:
+            obj.unlink(missing_ok=True)
+
+
+def restore_snapshot(filepath: Path, snapshot_id: Optional[str] = None) -> dict:
+    """
+    用快照（默认最新）覆盖 filepath。覆盖前先为当前内容拍快照，恢复操作本身可撤销。
+    全程持有 filepath 的写锁，与其他进程的提交互斥。快照不存在时抛出 KeyError。
+    """
+    filepath = Path(filepath)
+    snapshots = list_snapshots(filepath)
+    matches = [s for s in snapshots if snapshot_id is None or s["snapshot_id"] == snapshot_id]
+    if not matches:
+        raise KeyError(f"找不到快照: {snapshot_id}")
+    target = matches[-1]
+    with file_lock(lock_path(filepath)), _lock:
+        snapshot(filepath)
+        obj = _object_path(backup_dir(filepath), target["digest"])
+
+        def write(f):
+            with gzip.open(obj, "rb") as gz:
+                shutil.copyfileobj(gz, f, _CHUNK)
+        if _is_sqlite(filepath):
+            _restore_sqlite(filepath, write)
+        else:
+            _atomic_write(filepath, write)
+    return target
+
+
+def _restore_sqlite(filepath: Path, write):
+    """把快照解压到临时库，再经在线备份接口整体写入 filepath（由 SQLite 负责加锁与 WAL）"""
+    fd, tmp = tempfile.mkstemp(prefix=f".{filepath.name}.", suffix=".restore", dir=backup_dir(filepath))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        source, live = sqlite3.connect(tmp), sqlite3.connect(filepath, timeout=LOCK_TIMEOUT)
+        try:
+            source.backup(live)
+        finally:
+            live.close()
+            source.close()
+    finally:
+        _remove_sqlite_files(tmp)
+
+
+class _BackupWorker(threading.Thread):
+    """后台快照线程：按文件合并请求，静默 coalesce 秒（最多 max_delay 秒）后拍快照"""
+
+    def __init__(self):
+        super().__init__(name="backup-worker", daemon=True)
+        self.cond = threading.Condition()
+        # 文件 -> (首次请求时刻, 最近请求时刻)
+        self.pending: Dict[Path, Tuple[float, float]] = {}
+
+    def request(self, filepath: Path):
+        now = time.monotonic()
+        with self.cond:
+            first, _ = self.pending.get(filepath, (now, now))
+            self.pending[filepath] = (first, now)
+            self.cond.notify()
+
+    @staticmethod
+    def _due(first: float, last: float) -> float:
+        return min(last + BACKUP_COALESCE_SECONDS, first + BACKUP_MAX_DELAY_SECONDS)
+
+    def _next(self) -> Path:
+        with self.cond:
+            while True:
+                if not self.pending:
+                    self.cond.wait()
+                    continue
+                filepath, times = min(self.pending.items(), key=lambda kv: self._due(*kv[1]))
+                wait = self._due(*times) - time.monotonic()
+                if wait <= 0:
+                    del self.pending[filepath]
+                    return filepath
+                self.cond.wait(wait)
+
+    def run(self):
+        while True:
+            filepath = self._next()
+            try:
+                snapshot(filepath)
+            except Exception:
+                logger.exception("备份失败：%s", filepath)
+
+    def flush(self):
+        with self.cond:
+            paths = list(self.pending)
+            self.pending.clear()
+        for filepath in paths:
+            snapshot(filepath)
+
+
+_worker: Optional[_BackupWorker] = None
+
+
+def _get_worker() -> _BackupWorker:
+    global _worker
+    with _lock:
+        if _worker is None:
+            _worker = _BackupWorker()
+            _worker.start()
+            atexit.register(flush_backups)
+        return _worker
+
+
+_baselines = set()
+
+
+def ensure_baseline(filepath: Path):
+    """本进程第一次写入某文件前同步拍一次快照，保证写入前的版本可恢复"""
+    key = Path(filepath).resolve()
+    with _lock:
+        if key in _baselines:
+            return
+        _baselines.add(key)
+    snapshot(key)
+
+
+def request_backup(filepath: Path):
+    """登记一次异步快照请求，立即返回"""
+    _get_worker().request(Path(filepath).resolve())
+
+
+def flush_backups():
+    """立即处理所有未完成的快照请求（退出时自动调用）"""
+    if _worker is not None:
+        _worker.flush()
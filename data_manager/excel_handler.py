@@ -1,7 +1,18 @@
+import functools
+import hashlib
+import inspect
+import io
+import os
+import random
 import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import pandas as pd
 
@@ -11,7 +22,84 @@ from config.constants import (
     LOAN_PLANS_COLUMNS, RATE_ADJUSTMENTS_COLUMNS,
     REPAYMENT_SCHEDULE_COLUMNS, PREPAYMENTS_COLUMNS, CONFIG_COLUMNS,
 )
-from config.settings import EXCEL_FILE, DATA_DIR, DEFAULT_COMMERCIAL_RATE, DEFAULT_PROVIDENT_RATE, DEFAULT_INFLATION_RATE
+from data_manager import backup, journal
+from data_manager.locking import file_lock, lock_path
+from config.settings import (
+    DATA_FILE, DATA_DIR, DEFAULT_COMMERCIAL_RATE, DEFAULT_PROVIDENT_RATE, DEFAULT_INFLATION_RATE,
+    WRITE_RETRIES,
+)
+
+
+# Sheet 名 -> 表头；读入时补齐缺失列
+SHEET_COLUMNS = {
+    SHEET_LOAN_PLANS: LOAN_PLANS_COLUMNS,
+    SHEET_RATE_ADJUSTMENTS: RATE_ADJUSTMENTS_COLUMNS,
+    SHEET_REPAYMENT_SCHEDULE: REPAYMENT_SCHEDULE_COLUMNS,
+    SHEET_PREPAYMENTS: PREPAYMENTS_COLUMNS,
+    SHEET_CONFIG: CONFIG_COLUMNS,
+}
+
+
+@dataclass
+class _CachedWorkbook:
+    """一次解析得到的全部 Sheet，及解析时文件的 (mtime_ns, size) 与内容摘要"""
+    signature: Tuple[int, int]
+    digest: str
+    sheets: Dict[str, pd.DataFrame] = field(default_factory=dict)
+
+
+# 隐藏 Sheet：记录最近一次并入工作簿的日志 compaction_id，参见 data_manager.journal
+SHEET_JOURNAL_STATE = "_journal"
+JOURNAL_STATE_COLUMN = "applied_compaction"
+
+# 进程内工作簿缓存：解析后的路径 -> _CachedWorkbook
+_workbook_cache: Dict[Path, _CachedWorkbook] = {}
+_cache_lock = threading.Lock()
+# 各工作簿的解析锁：并发未命中时只解析一次
+_load_locks: Dict[Path, threading.Lock] = {}
+# 串行化同一进程内的工作簿提交（含日志压缩）；加锁顺序总是先它后跨进程写锁
+_commit_lock = threading.RLock()
+
+
+@dataclass
+class _Transaction:
+    """进行中的写事务：待提交的 Sheet、事务内首次读取各 Sheet 时的版本，及嵌套深度"""
+    pending: Dict[str, pd.DataFrame] = field(default_factory=dict)
+    versions: Dict[str, str] = field(default_factory=dict)
+    depth: int = 0
+
+
+# 各线程各自的事务与读快照，按工作簿路径区分
+_local = threading.local()
+
+
+class ConcurrentModificationError(RuntimeError):
+    """事务读取后、提交前，要写入的 Sheet 已被其他会话或进程修改"""
+
+
+# 这些后缀的 filepath 由 SQLite 后端处理
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+
+def is_sqlite_path(filepath) -> bool:
+    return Path(filepath).suffix.lower() in SQLITE_SUFFIXES
+
+
+def _routed(target: Optional[str] = None):
+    """filepath 指向 SQLite 数据库时，转发给 sqlite_handler 中的同名（或 target）函数"""
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            if is_sqlite_path(bound.arguments["filepath"]):
+                from data_manager import sqlite_handler
+                return getattr(sqlite_handler, target or func.__name__)(*bound.args, **bound.kwargs)
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
 
 
 def _ensure_data_dir():
@@ -45,13 +133,22 @@ def _append_row(df: pd.DataFrame, record: dict) -> pd.DataFrame:
     return df
 
 
-def init_excel(filepath: Path = EXCEL_FILE):
+@_routed("init_db")
+def init_excel(filepath: Path = DATA_FILE):
     """初始化 Excel 文件，创建所有 Sheet 和表头"""
     _ensure_data_dir()
     if filepath.exists():
         return
 
-    with pd.ExcelWriter(filepath, engine="openpyxl") as writer:
+    with file_lock(lock_path(filepath)):
+        # 持锁后再检查一次：其他进程可能刚刚创建
+        if filepath.exists():
+            return
+        _atomic_save(filepath, _write_empty_workbook)
+
+
+def _write_empty_workbook(path: str):
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
         pd.DataFrame(columns=LOAN_PLANS_COLUMNS).to_excel(
             writer, sheet_name=SHEET_LOAN_PLANS, index=False)
         pd.DataFrame(columns=RATE_ADJUSTMENTS_COLUMNS).to_excel(
@@ -64,61 +161,307 @@ def init_excel(filepath: Path = EXCEL_FILE):
         config_df.to_excel(writer, sheet_name=SHEET_CONFIG, index=False)
 
 
-def backup_excel(filepath: Path = EXCEL_FILE):
-    """写入前自动备份"""
-    if filepath.exists():
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_path = filepath.with_suffix(f".xlsx.bak_{ts}")
-        shutil.copy2(filepath, backup_path)
-        # 只保留最近 5 个备份
-        backups = sorted(filepath.parent.glob(f"{filepath.stem}.xlsx.bak_*"))
-        for old in backups[:-5]:
-            old.unlink()
+def backup_excel(filepath: Path = DATA_FILE):
+    """立即为工作簿拍一次快照（内容未变时跳过），参见 data_manager.backup"""
+    backup.snapshot(Path(filepath))
+
+
+def _file_signature(filepath: Path) -> Tuple[int, int]:
+    stat = filepath.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _sheet_version(df: pd.DataFrame) -> str:
+    """Sheet 内容的版本号（用于乐观并发检查）"""
+    return _digest(df.to_csv(index=False).encode("utf-8"))
+
+
+def invalidate_cache(filepath: Optional[Path] = None):
+    """丢弃工作簿缓存；filepath 为空时清空全部"""
+    with _cache_lock:
+        if filepath is None:
+            _workbook_cache.clear()
+        else:
+            _workbook_cache.pop(Path(filepath).resolve(), None)
+
+
+def _load_workbook_cached(filepath: Path) -> Dict[str, pd.DataFrame]:
+    """
+    返回工作簿全部 Sheet（已补齐表头）。
+
+    文件 mtime 与大小都未变时直接命中缓存；任一变化时先比较内容摘要，
+    内容相同（如仅 touch）只刷新签名，内容不同才整本重新解析。
+    摘要与解析基于同一次读入的字节，写者原子替换文件时读者拿到的总是某个完整版本。
+    _cache_lock 只保护缓存字典本身；读文件与解析在其外进行，同一文件由各自的锁
+    合并为一次解析，装入缓存前确认文件签名仍与读入前一致。
+    返回的字典及其中的 DataFrame 视为不可变，只能复制后修改。
+    """
+    key = filepath.resolve()
+    with _cache_lock:
+        entry = _workbook_cache.get(key)
+        if entry is not None and entry.signature == _file_signature(filepath):
+            return entry.sheets
+        load_lock = _load_locks.setdefault(key, threading.Lock())
+    with load_lock:
+        signature = _file_signature(filepath)
+        with _cache_lock:
+            entry = _workbook_cache.get(key)
+        # 等锁期间另一线程可能已解析好同一版本
+        if entry is not None and entry.signature == signature:
+            return entry.sheets
+        data = filepath.read_bytes()
+        digest = _digest(data)
+        if entry is not None and entry.digest == digest:
+            sheets = entry.sheets
+        else:
+            sheets = pd.read_excel(io.BytesIO(data), sheet_name=None, engine="openpyxl")
+            for name, columns in SHEET_COLUMNS.items():
+                sheets[name] = _ensure_columns(sheets.get(name, pd.DataFrame()), columns)
+        with _cache_lock:
+            if _file_signature(filepath) == signature:
+                _workbook_cache[key] = _CachedWorkbook(signature, digest, sheets)
+        return sheets
+
+
+def _applied_compaction(sheets: Dict[str, pd.DataFrame]) -> Optional[str]:
+    """工作簿记录的已并入日志的 compaction_id"""
+    df = sheets.get(SHEET_JOURNAL_STATE)
+    if df is None or df.empty or JOURNAL_STATE_COLUMN not in df.columns:
+        return None
+    return str(df[JOURNAL_STATE_COLUMN].iloc[0])
+
+
+def _active_transaction(filepath: Path) -> Optional[_Transaction]:
+    return getattr(_local, "transactions", {}).get(Path(filepath).resolve())
+
+
+def _current_state(filepath: Path) -> Tuple[Dict[str, pd.DataFrame], List[dict]]:
+    """当前的 (工作簿 Sheet, 未并入的日志事件)；在读快照中时返回固定的那一份"""
+    pins = _local.__dict__.get("snapshots", {})
+    key = Path(filepath).resolve()
+    state = pins.get(key)
+    if state is not None:
+        return state
+    # 先取日志再取工作簿：期间若恰好完成压缩，工作簿已记录该 .compacting 已并入，合并时跳过
+    log = journal.load_journal(Path(filepath))
+    sheets = _load_workbook_cached(filepath)
+    state = (sheets, log.events(_applied_compaction(sheets)))
+    if key in pins:
+        pins[key] = state
+    return state
+
+
+@_routed()
+@contextmanager
+def read_snapshot(filepath: Path = DATA_FILE) -> Iterator[None]:
+    """
+    读快照：块内所有 read_sheet 都基于同一版本的工作簿和日志（在块内首次读取时固定），
+    多次读取之间其他会话的写入不可见。读快照不加锁，不会被写者阻塞。
+    """
+    key = Path(filepath).resolve()
+    pins = _local.__dict__.setdefault("snapshots", {})
+    if key in pins:
+        yield
+        return
+    pins[key] = None
+    try:
+        yield
+    finally:
+        del pins[key]
 
 
-def read_sheet(sheet_name: str, filepath: Path = EXCEL_FILE) -> pd.DataFrame:
-    """读取指定 Sheet"""
+@_routed()
+def read_sheet(sheet_name: str, filepath: Path = DATA_FILE) -> pd.DataFrame:
+    """
+    读取指定 Sheet（来自进程内缓存，返回副本，调用方可随意修改）。
+    事务中可读到未提交的写入，并记录首次读到的版本，提交时据此检查并发修改。
+    """
     init_excel(filepath)
+    tx = _active_transaction(filepath)
+    if tx is not None and sheet_name in tx.pending:
+        return tx.pending[sheet_name].copy()
+    sheets, events = _current_state(filepath)
+    df = sheets.get(sheet_name)
+    if df is None:
+        return pd.DataFrame()
+    if sheet_name in journal.JOURNAL_KEYS:
+        df = journal.apply_events(df, sheet_name, events)
+    if tx is not None and sheet_name not in tx.versions:
+        tx.versions[sheet_name] = _sheet_version(df)
+    return df.copy()
+
+
+def _atomic_save(filepath: Path, save):
+    """save(临时路径) 写出完整文件后原子替换 filepath，失败时原文件保持不变"""
+    fd, tmp = tempfile.mkstemp(prefix=f".{filepath.stem}.", suffix=".tmp.xlsx", dir=filepath.parent)
+    os.close(fd)
     try:
-        df = pd.read_excel(filepath, sheet_name=sheet_name, engine="openpyxl")
-    except ValueError:
-        df = pd.DataFrame()
-    if sheet_name == SHEET_LOAN_PLANS:
-        return _ensure_columns(df, LOAN_PLANS_COLUMNS)
-    if sheet_name == SHEET_RATE_ADJUSTMENTS:
-        return _ensure_columns(df, RATE_ADJUSTMENTS_COLUMNS)
-    if sheet_name == SHEET_REPAYMENT_SCHEDULE:
-        return _ensure_columns(df, REPAYMENT_SCHEDULE_COLUMNS)
-    if sheet_name == SHEET_PREPAYMENTS:
-        return _ensure_columns(df, PREPAYMENTS_COLUMNS)
-    if sheet_name == SHEET_CONFIG:
-        return _ensure_columns(df, CONFIG_COLUMNS)
-    return df
-
-
-def write_sheet(df: pd.DataFrame, sheet_name: str, filepath: Path = EXCEL_FILE):
-    """写入指定 Sheet（覆盖该 Sheet，保留其他 Sheet）"""
+        save(tmp)
+        os.replace(tmp, filepath)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def _commit(pending: Dict[str, pd.DataFrame], filepath: Path, versions: Optional[Dict[str, str]] = None):
+    """
+    一次备份、一次加载、一次保存提交所有待写 Sheet，并顺带把事件日志并入工作簿。
+
+    持跨进程写锁提交；versions 给出事务读到的 Sheet 版本，若要写入的 Sheet
+    在此之后已被修改（含新的日志事件），抛出 ConcurrentModificationError，不写入任何内容。
+    先写入同目录下的临时文件再原子替换，失败时原文件保持不变；
+    未修改的 Sheet 原样保留，被替换的 Sheet 保持原来的位置，并与 init_excel 一样经
+    to_excel 写出（表头样式、日期格式不变）。
+    pending 中的 Sheet 是调用方基于合并日志后的读取结果整表写入的，其日志事件直接丢弃。
+    并入日志时把 compaction_id 与 Sheet 一起原子保存，保存后崩溃也不会重放这批事件。
+    """
     init_excel(filepath)
-    backup_excel(filepath)
-
-    from openpyxl import load_workbook
-    wb = load_workbook(filepath)
-
-    if sheet_name in wb.sheetnames:
-        del wb[sheet_name]
-    wb.save(filepath)
-
-    with pd.ExcelWriter(filepath, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
-        df.to_excel(writer, sheet_name=sheet_name, index=False)
+    with _commit_lock, file_lock(lock_path(filepath)):
+        current = _load_workbook_cached(filepath)
+        compaction_id, events = journal.begin_compaction(filepath, _applied_compaction(current))
+        for sheet_name, version in (versions or {}).items():
+            if sheet_name not in pending:
+                continue
+            df = current.get(sheet_name, pd.DataFrame())
+            if sheet_name in journal.JOURNAL_KEYS:
+                df = journal.apply_events(df, sheet_name, events)
+            if _sheet_version(df) != version:
+                raise ConcurrentModificationError(f"「{sheet_name}」已被其他会话修改，请重新读取后再保存")
+
+        pending = dict(pending)
+        for sheet_name in {e["sheet"] for e in events} - set(pending):
+            pending[sheet_name] = journal.apply_events(current[sheet_name], sheet_name, events)
+        if not pending:
+            journal.finish_compaction(filepath)
+            return
+
+        backup.ensure_baseline(filepath)
+
+        def save(tmp: str):
+            shutil.copyfile(filepath, tmp)
+            with pd.ExcelWriter(tmp, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
+                for sheet_name, df in pending.items():
+                    df.to_excel(writer, sheet_name=sheet_name, index=False)
+                if events and compaction_id is not None:
+                    pd.DataFrame({JOURNAL_STATE_COLUMN: [compaction_id]}).to_excel(
+                        writer, sheet_name=SHEET_JOURNAL_STATE, index=False)
+                    writer.sheets[SHEET_JOURNAL_STATE].sheet_state = "hidden"
+
+        try:
+            _atomic_save(filepath, save)
+        finally:
+            # 同一秒内的两次写入 mtime 可能相同，自身写入后直接丢弃缓存
+            invalidate_cache(filepath)
+        journal.finish_compaction(filepath)
+    backup.request_backup(filepath)
+
+
+def compact_journal(filepath: Path = DATA_FILE):
+    """把事件日志成批并入工作簿（后台线程定期调用，也可手动调用）"""
+    if is_sqlite_path(filepath):
+        return
+    log = journal.load_journal(Path(filepath))
+    # 已并入但未删除的 .compacting 也要走一次提交，由 begin_compaction 清理
+    if not (log.compacting or log.pending):
+        return
+    _commit({}, Path(filepath))
+
+
+@_routed()
+def restore_backup(snapshot_id: Optional[str] = None, filepath: Path = DATA_FILE) -> dict:
+    """
+    用备份快照（默认最新）恢复工作簿。先把事件日志并入工作簿，恢复前的快照才包含全部数据；
+    合并与恢复在同一次写锁内完成，期间其他会话或进程的提交不会插入或被覆盖。
+    快照不存在时抛出 KeyError。
+    """
+    filepath = Path(filepath)
+    with _commit_lock, file_lock(lock_path(filepath)):
+        compact_journal(filepath)
+        try:
+            return backup.restore_snapshot(filepath, snapshot_id)
+        finally:
+            invalidate_cache(filepath)
+
+
+@_routed()
+@contextmanager
+def transaction(filepath: Path = DATA_FILE) -> Iterator[None]:
+    """
+    写事务：块内对任意 Sheet 的 write_sheet 只记录在内存中，
+    正常退出时一次性提交（一次备份 + 一次原子保存），抛出异常则全部丢弃。
+    块内 read_sheet 能读到尚未提交的写入；嵌套事务并入最外层。
+    块内读过又写回的 Sheet 若在提交前被其他会话修改，提交时抛出 ConcurrentModificationError。
+
+        with transaction():
+            set_config("lpr_5y", "3.45")
+            set_config("provident_rate", "2.85")
+    """
+    key = Path(filepath).resolve()
+    transactions = _local.__dict__.setdefault("transactions", {})
+    tx = transactions.setdefault(key, _Transaction())
+    tx.depth += 1
+    try:
+        yield
+        if tx.depth == 1 and tx.pending:
+            _commit(tx.pending, Path(filepath), tx.versions)
+    finally:
+        tx.depth -= 1
+        if tx.depth == 0:
+            del transactions[key]
+
+
+@_routed()
+def write_sheet(df: pd.DataFrame, sheet_name: str, filepath: Path = DATA_FILE):
+    """写入指定 Sheet（覆盖该 Sheet，保留其他 Sheet）；在事务中时延迟到事务提交"""
+    tx = _active_transaction(filepath)
+    if tx is not None:
+        tx.pending[sheet_name] = df.copy()
+        return
+    _commit({sheet_name: df}, Path(filepath))
+
+
+def _optimistic(func):
+    """
+    读-改-写操作：不在外层事务中时放进独立事务执行。
+    遇到 ConcurrentModificationError 随机退避后基于最新数据重试；
+    最后一次（第 WRITE_RETRIES 次）持写锁完成整个读-改-写，不会再与其他写者冲突。
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        filepath = bound.arguments["filepath"]
+        if _active_transaction(filepath) is not None:
+            return func(*args, **kwargs)
+        for attempt in range(WRITE_RETRIES - 1):
+            try:
+                with transaction(filepath):
+                    return func(*args, **kwargs)
+            except ConcurrentModificationError:
+                # 随机退避，避免多个写者再次同时冲突
+                time.sleep(random.uniform(0, 0.05 * (attempt + 1)))
+        init_excel(filepath)
+        # 与 _commit 相同的加锁顺序：先进程内提交锁，再跨进程写锁
+        with _commit_lock, file_lock(lock_path(filepath)), transaction(filepath):
+            return func(*args, **kwargs)
+    return wrapper
 
 
 # ---- 贷款方案 CRUD ----
 
-def get_all_plans(filepath: Path = EXCEL_FILE) -> pd.DataFrame:
+@_routed()
+def get_all_plans(filepath: Path = DATA_FILE) -> pd.DataFrame:
     return read_sheet(SHEET_LOAN_PLANS, filepath)
 
 
-def get_plan_by_id(plan_id: str, filepath: Path = EXCEL_FILE) -> Optional[pd.Series]:
+@_routed()
+def get_plan_by_id(plan_id: str, filepath: Path = DATA_FILE) -> Optional[pd.Series]:
     df = get_all_plans(filepath)
     match = df[df["plan_id"] == plan_id]
     if match.empty:
@@ -126,7 +469,9 @@ def get_plan_by_id(plan_id: str, filepath: Path = EXCEL_FILE) -> Optional[pd.Ser
     return match.iloc[0].copy()
 
 
-def save_plan(plan_dict: dict, filepath: Path = EXCEL_FILE):
+@_routed()
+@_optimistic
+def save_plan(plan_dict: dict, filepath: Path = DATA_FILE):
     df = get_all_plans(filepath)
     existing = df[df["plan_id"] == plan_dict["plan_id"]]
     if not existing.empty:
@@ -138,7 +483,21 @@ def save_plan(plan_dict: dict, filepath: Path = EXCEL_FILE):
     write_sheet(df, SHEET_LOAN_PLANS, filepath)
 
 
-def delete_plan(plan_id: str, filepath: Path = EXCEL_FILE):
+@_routed()
+def delete_plan(plan_id: str, filepath: Path = DATA_FILE):
+    _delete_plan_rows(plan_id, filepath)
+    _clear_stored_schedules(plan_id)
+
+
+def _clear_stored_schedules(plan_id: str):
+    """删除方案在物化还款计划缓存中的条目"""
+    from config import settings
+    from core.schedule_store import clear_schedule_store
+    clear_schedule_store(settings.SCHEDULE_STORE_DIR, plan_id)
+
+
+@_optimistic
+def _delete_plan_rows(plan_id: str, filepath: Path = DATA_FILE):
     df = get_all_plans(filepath)
     df = df[df["plan_id"] != plan_id]
     write_sheet(df, SHEET_LOAN_PLANS, filepath)
@@ -152,13 +511,13 @@ def delete_plan(plan_id: str, filepath: Path = EXCEL_FILE):
 
 # ---- 还款计划 (已弃用，使用 core/schedule_generator.py 动态生成) ----
 
-def get_repayment_schedule(plan_id: str, filepath: Path = EXCEL_FILE) -> pd.DataFrame:
+def get_repayment_schedule(plan_id: str, filepath: Path = DATA_FILE) -> pd.DataFrame:
     """已弃用：请使用 core.schedule_generator.get_plan_schedule"""
     from core.schedule_generator import get_plan_schedule
     return get_plan_schedule(plan_id)
 
 
-def save_repayment_schedule(plan_id: str, records: pd.DataFrame, filepath: Path = EXCEL_FILE):
+def save_repayment_schedule(plan_id: str, records: pd.DataFrame, filepath: Path = DATA_FILE):
     """已弃用：不再保存完整还款计划，仅保存事件记录"""
     pass
 
@@ -168,12 +527,19 @@ def save_repayment_schedule(plan_id: str, records: pd.DataFrame, filepath: Path
 
 # ---- 利率调整 ----
 
-def get_rate_adjustments(plan_id: str, filepath: Path = EXCEL_FILE) -> pd.DataFrame:
+@_routed()
+def get_rate_adjustments(plan_id: str, filepath: Path = DATA_FILE) -> pd.DataFrame:
     df = read_sheet(SHEET_RATE_ADJUSTMENTS, filepath)
     return df[df["plan_id"] == plan_id].reset_index(drop=True)
 
 
-def save_rate_adjustment(record: dict, filepath: Path = EXCEL_FILE):
+@_routed()
+def save_rate_adjustment(record: dict, filepath: Path = DATA_FILE):
+    if _active_transaction(filepath) is None:
+        # 只追加到事件日志，由后台压缩并入工作簿
+        init_excel(filepath)
+        journal.append_event(Path(filepath), SHEET_RATE_ADJUSTMENTS, journal.OP_APPEND, record)
+        return
     df = read_sheet(SHEET_RATE_ADJUSTMENTS, filepath)
     df = _append_row(df, record)
     write_sheet(df, SHEET_RATE_ADJUSTMENTS, filepath)
@@ -181,24 +547,37 @@ def save_rate_adjustment(record: dict, filepath: Path = EXCEL_FILE):
 
 # ---- 提前还款 ----
 
-def get_prepayments(plan_id: str, filepath: Path = EXCEL_FILE) -> pd.DataFrame:
+@_routed()
+def get_prepayments(plan_id: str, filepath: Path = DATA_FILE) -> pd.DataFrame:
     df = read_sheet(SHEET_PREPAYMENTS, filepath)
     return df[df["plan_id"] == plan_id].reset_index(drop=True)
 
 
-def save_prepayment(record: dict, filepath: Path = EXCEL_FILE):
+@_routed()
+def save_prepayment(record: dict, filepath: Path = DATA_FILE):
+    if _active_transaction(filepath) is None:
+        # 只追加到事件日志，由后台压缩并入工作簿
+        init_excel(filepath)
+        journal.append_event(Path(filepath), SHEET_PREPAYMENTS, journal.OP_APPEND, record)
+        return
     df = read_sheet(SHEET_PREPAYMENTS, filepath)
     df = _append_row(df, record)
     write_sheet(df, SHEET_PREPAYMENTS, filepath)
 
 
-def update_prepayment(prepayment_id: str, updates: dict, filepath: Path = EXCEL_FILE) -> bool:
+@_routed()
+def update_prepayment(prepayment_id: str, updates: dict, filepath: Path = DATA_FILE) -> bool:
     df = read_sheet(SHEET_PREPAYMENTS, filepath)
     if df.empty or "prepayment_id" not in df.columns:
         return False
     mask = df["prepayment_id"] == prepayment_id
     if not mask.any():
         return False
+    if _active_transaction(filepath) is None:
+        record = {col: val for col, val in updates.items() if col in df.columns}
+        record["prepayment_id"] = prepayment_id
+        journal.append_event(Path(filepath), SHEET_PREPAYMENTS, journal.OP_UPDATE, record, key="prepayment_id")
+        return True
     for col, val in updates.items():
         if col in df.columns:
             df.loc[mask, col] = val
@@ -208,7 +587,8 @@ def update_prepayment(prepayment_id: str, updates: dict, filepath: Path = EXCEL_
 
 # ---- 系统配置 ----
 
-def get_config(key: str, filepath: Path = EXCEL_FILE) -> Optional[str]:
+@_routed()
+def get_config(key: str, filepath: Path = DATA_FILE) -> Optional[str]:
     df = read_sheet(SHEET_CONFIG, filepath)
     match = df[df["key"] == key]
     if match.empty:
@@ -216,12 +596,15 @@ def get_config(key: str, filepath: Path = EXCEL_FILE) -> Optional[str]:
     return str(match.iloc[0]["value"])
 
 
-def get_all_config(filepath: Path = EXCEL_FILE) -> pd.DataFrame:
+@_routed()
+def get_all_config(filepath: Path = DATA_FILE) -> pd.DataFrame:
     """获取所有系统配置"""
     return read_sheet(SHEET_CONFIG, filepath)
 
 
-def set_config(key: str, value: str, description: str = "", filepath: Path = EXCEL_FILE):
+@_routed()
+@_optimistic
+def set_config(key: str, value: str, description: str = "", filepath: Path = DATA_FILE):
     df = read_sheet(SHEET_CONFIG, filepath)
     df["value"] = df["value"].astype(str)
     now = datetime.now().isoformat()
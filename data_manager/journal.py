@@ -0,0 +1,264 @@
+"""
+Excel 存储的追加式事件日志。
+
+新增 / 修改事件记录时只向工作簿旁的 <工作簿>.journal 追加一行 JSON 并 fsync，
+不重写工作簿；读取时把日志合并到 Sheet 上。后台线程定期把日志成批并入工作簿。
+每个日志文件的第一行是带唯一 compaction_id 的文件头。
+
+压缩协议（由 excel_handler._commit 在持有工作簿写锁期间完成）：先把 .journal 并入
+.journal.compacting（只是改名或追加，很快），再保存工作簿，并把 .compacting 的
+compaction_id 记入工作簿的隐藏 Sheet，最后删除 .compacting。保存后、删除前崩溃时，
+读取和下一次压缩看到工作簿已记录同一个 compaction_id，便整体跳过这个 .compacting，
+不会把整表写入时已删除的行重新追加回来。
+
+追加与改名持有跨进程的日志锁（只锁很短时间）；读取不加锁，按 .journal、.compacting、
+工作簿的顺序读，并发改名时同一事件可能被读到两次，追加事件按主键去重，修改事件可重复执行。
+"""
+import json
+import logging
+import os
+import threading
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from config.constants import SHEET_RATE_ADJUSTMENTS, SHEET_PREPAYMENTS
+from config.settings import JOURNAL_COMPACT_INTERVAL, JOURNAL_COMPACT_THRESHOLD
+from data_manager.locking import file_lock, lock_path
+
+logger = logging.getLogger(__name__)
+
+OP_APPEND = "append"
+OP_UPDATE = "update"
+
+# 可记入日志的 Sheet -> 主键列
+JOURNAL_KEYS = {
+    SHEET_PREPAYMENTS: "prepayment_id",
+    SHEET_RATE_ADJUSTMENTS: "adjustment_id",
+}
+
+_lock = threading.RLock()
+
+
+@dataclass
+class JournalState:
+    """一次读取得到的日志：.compacting 的 compaction_id 与事件，及 .journal 中的事件"""
+    compaction_id: Optional[str]
+    compacting: List[dict]
+    pending: List[dict]
+
+    def events(self, applied: Optional[str] = None) -> List[dict]:
+        """尚未并入工作簿的事件；applied 为工作簿记录的 compaction_id，与 .compacting 相同时跳过它"""
+        if self.compaction_id is not None and self.compaction_id == applied:
+            return self.pending
+        return self.compacting + self.pending
+
+
+@dataclass
+class _CachedEvents:
+    signature: Tuple
+    state: JournalState
+
+
+_events_cache: Dict[Path, _CachedEvents] = {}
+_compactors: Dict[Path, "_Compactor"] = {}
+
+
+def journal_path(filepath: Path) -> Path:
+    return filepath.with_name(filepath.name + ".journal")
+
+
+def compacting_path(filepath: Path) -> Path:
+    return filepath.with_name(filepath.name + ".journal.compacting")
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def _clean(record: dict) -> dict:
+    return {k: (None if not isinstance(v, str) and pd.isna(v) else v) for k, v in record.items()}
+
+
+def append_event(filepath: Path, sheet_name: str, op: str, record: dict, key: Optional[str] = None):
+    """追加一条事件并 fsync；op 为 append 时 record 为新行，为 update 时 record 为要修改的列"""
+    entry = {"sheet": sheet_name, "op": op, "record": _clean(record)}
+    if key is not None:
+        entry["key"] = key
+    line = json.dumps(entry, ensure_ascii=False, default=_json_default) + "\n"
+    with _lock, file_lock(lock_path(filepath, "journal")):
+        with open(journal_path(filepath), "a", encoding="utf-8") as f:
+            if f.tell() == 0:
+                f.write(json.dumps({"compaction_id": f"c-{uuid.uuid4().hex}"}) + "\n")
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+    _ensure_compactor(filepath)
+
+
+def _read_lines(path: Path) -> Tuple[Optional[str], List[dict]]:
+    """返回 (文件头中的 compaction_id, 事件列表)"""
+    if not path.exists():
+        return None, []
+    compaction_id, events = None, []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # 崩溃时写了一半的最后一行，丢弃
+                continue
+            if "sheet" in entry:
+                events.append(entry)
+            elif compaction_id is None:
+                compaction_id = entry.get("compaction_id")
+    return compaction_id, events
+
+
+def _signature(filepath: Path) -> Tuple:
+    sig = []
+    for path in (compacting_path(filepath), journal_path(filepath)):
+        try:
+            st = path.stat()
+            sig.append((st.st_ino, st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            sig.append(None)
+    return tuple(sig)
+
+
+def load_journal(filepath: Path) -> JournalState:
+    """读取 .compacting 与 .journal，按两个文件的签名缓存"""
+    key = filepath.resolve()
+    with _lock:
+        signature = _signature(filepath)
+        cached = _events_cache.get(key)
+        if cached is not None and cached.signature == signature:
+            return cached.state
+        # 先读 .journal 再读 .compacting：两者之间发生的改名不会漏掉事件
+        _, pending = _read_lines(journal_path(filepath))
+        compaction_id, compacting = _read_lines(compacting_path(filepath))
+        state = JournalState(compaction_id, compacting, pending)
+        _events_cache[key] = _CachedEvents(signature, state)
+        return state
+
+
+def load_events(filepath: Path, applied: Optional[str] = None) -> List[dict]:
+    """按顺序返回尚未并入工作簿的全部事件（.compacting 在前），参见 JournalState.events"""
+    return load_journal(filepath).events(applied)
+
+
+def apply_events(df: pd.DataFrame, sheet_name: str, events: List[dict]) -> pd.DataFrame:
+    """把某个 Sheet 的事件合并到 df 上（不修改入参）；已存在主键的追加事件跳过"""
+    events = [e for e in events if e["sheet"] == sheet_name]
+    if not events:
+        return df
+    key = JOURNAL_KEYS.get(sheet_name)
+    df = df.copy()
+    seen = set(df[key].dropna()) if key in df.columns else set()
+    rows = []
+    for event in events:
+        record = event["record"]
+        if event["op"] == OP_APPEND:
+            if key is not None and record.get(key) is not None:
+                if record[key] in seen:
+                    continue
+                seen.add(record[key])
+            rows.append({c: record.get(c) for c in df.columns})
+        elif event["op"] == OP_UPDATE:
+            if rows:
+                df = _concat(df, rows)
+                rows = []
+            mask = df[event["key"]] == record[event["key"]]
+            for col, val in record.items():
+                if col in df.columns and col != event["key"]:
+                    df.loc[mask, col] = val
+    if rows:
+        df = _concat(df, rows)
+    return df
+
+
+def _concat(df: pd.DataFrame, rows: List[dict]) -> pd.DataFrame:
+    new = pd.DataFrame(rows, columns=df.columns)
+    if df.empty:
+        return new.reset_index(drop=True)
+    return pd.concat([df, new], ignore_index=True)
+
+
+def begin_compaction(filepath: Path, applied: Optional[str] = None) -> Tuple[Optional[str], List[dict]]:
+    """
+    把当前日志并入 .compacting，返回 (compaction_id, 待并入工作簿的全部事件)。
+
+    applied 为工作簿已记录的 compaction_id：上次压缩保存工作簿后、删除 .compacting 前崩溃时，
+    遗留的 .compacting 已经并入，先丢弃它。
+    """
+    with _lock, file_lock(lock_path(filepath, "journal")):
+        journal = journal_path(filepath)
+        compacting = compacting_path(filepath)
+        if applied is not None and compacting.exists() and _read_lines(compacting)[0] == applied:
+            compacting.unlink()
+        if journal.exists():
+            if compacting.exists():
+                # 保留 .compacting 的文件头，只追加事件行
+                _, events = _read_lines(journal)
+                with open(compacting, "a", encoding="utf-8") as out:
+                    for event in events:
+                        out.write(json.dumps(event, ensure_ascii=False) + "\n")
+                    out.flush()
+                    os.fsync(out.fileno())
+                journal.unlink()
+            else:
+                os.replace(journal, compacting)
+        return _read_lines(compacting)
+
+
+def finish_compaction(filepath: Path):
+    """工作簿保存成功后删除 .compacting"""
+    with _lock, file_lock(lock_path(filepath, "journal")):
+        compacting_path(filepath).unlink(missing_ok=True)
+
+
+class _Compactor(threading.Thread):
+    """后台压缩线程：每隔 interval 秒，或事件数达到阈值时，把日志并入工作簿"""
+
+    def __init__(self, filepath: Path, interval: float):
+        super().__init__(name=f"journal-compactor-{filepath.name}", daemon=True)
+        self.filepath = filepath
+        self.interval = interval
+        self.wake = threading.Event()
+        self.appended = 0
+
+    def run(self):
+        from data_manager.excel_handler import compact_journal
+
+        while True:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            try:
+                compact_journal(self.filepath)
+            except Exception:
+                logger.exception("日志压缩失败：%s", self.filepath)
+
+
+def _ensure_compactor(filepath: Path):
+    key = filepath.resolve()
+    with _lock:
+        compactor = _compactors.get(key)
+        if compactor is None:
+            compactor = _Compactor(filepath, JOURNAL_COMPACT_INTERVAL)
+            _compactors[key] = compactor
+            compactor.start()
+        compactor.appended += 1
+        if compactor.appended >= JOURNAL_COMPACT_THRESHOLD:
+            compactor.appended = 0
+            compactor.wake.set()
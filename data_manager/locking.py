@@ -0,0 +1,75 @@
+"""跨进程文件锁：写者之间互斥，读者不加锁"""
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+from config.settings import LOCK_TIMEOUT
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+_POLL_INTERVAL = 0.01
+
+# 当前线程已持有的锁文件，同一线程重复加锁时直接进入
+_held = threading.local()
+
+
+class LockTimeoutError(TimeoutError):
+    """在 LOCK_TIMEOUT 秒内未能获得文件锁"""
+
+
+def lock_path(filepath: Path, name: str = "write") -> Path:
+    filepath = Path(filepath)
+    return filepath.with_name(f"{filepath.name}.{name}.lock")
+
+
+def _try_lock(f) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def file_lock(path: Path, timeout: Optional[float] = None) -> Iterator[None]:
+    """
+    独占锁住 path（锁文件本身不删除）。每次加锁打开新的文件描述符，
+    同一进程内的不同线程之间同样互斥；同一线程可重入。超时抛出 LockTimeoutError。
+    """
+    timeout = LOCK_TIMEOUT if timeout is None else timeout
+    path = Path(path).resolve()
+    held = _held.__dict__.setdefault("paths", set())
+    if path in held:
+        yield
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    deadline = time.monotonic() + timeout
+    with open(path, "a+b") as f:
+        while not _try_lock(f):
+            if time.monotonic() >= deadline:
+                raise LockTimeoutError(f"等待文件锁超时: {path}")
+            time.sleep(_POLL_INTERVAL)
+        held.add(path)
+        try:
+            yield
+        finally:
+            held.discard(path)
+            _unlock(f)
@@ -0,0 +1,301 @@
+"""SQLite 存储后端：与 excel_handler 相同的读写接口，按行读写、按 plan_id 索引；写事务提交后同样异步备份"""
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+import pandas as pd
+
+from config.constants import (
+    SHEET_LOAN_PLANS, SHEET_RATE_ADJUSTMENTS, SHEET_REPAYMENT_SCHEDULE,
+    SHEET_PREPAYMENTS, SHEET_CONFIG,
+)
+from config.settings import SQLITE_FILE, LOCK_TIMEOUT
+from data_manager import backup
+from data_manager.excel_handler import SHEET_COLUMNS, _clear_stored_schedules, _default_config_rows, _ensure_columns
+
+# Sheet 名 -> 表名
+SHEET_TABLES = {
+    SHEET_LOAN_PLANS: "loan_plans",
+    SHEET_RATE_ADJUSTMENTS: "rate_adjustments",
+    SHEET_REPAYMENT_SCHEDULE: "repayment_schedule",
+    SHEET_PREPAYMENTS: "prepayments",
+    SHEET_CONFIG: "config",
+}
+
+# 主键类列按文本保存；其余列不声明类型（无亲和性），按写入时的 Python 类型原样保存，与 Excel 单元格行为一致
+_TEXT_COLUMNS = {"plan_id", "adjustment_id", "prepayment_id", "key"}
+
+_INDEXES = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_loan_plans_plan_id ON loan_plans (plan_id)",
+    "CREATE INDEX IF NOT EXISTS idx_rate_adjustments_plan_id ON rate_adjustments (plan_id)",
+    "CREATE INDEX IF NOT EXISTS idx_prepayments_plan_id ON prepayments (plan_id)",
+    "CREATE INDEX IF NOT EXISTS idx_prepayments_prepayment_id ON prepayments (prepayment_id)",
+    "CREATE INDEX IF NOT EXISTS idx_repayment_schedule_plan_period ON repayment_schedule (plan_id, period)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_config_key ON config (key)",
+]
+
+# 各线程各自的连接，按数据库路径区分
+_local = threading.local()
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _sql_value(value):
+    """Python / numpy / pandas 值 -> sqlite3 可绑定的值"""
+    if value is None:
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if not isinstance(value, str) and pd.isna(value):
+        return None
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def _connect(filepath: Path) -> sqlite3.Connection:
+    key = Path(filepath).resolve()
+    conns = _local.__dict__.setdefault("connections", {})
+    conn = conns.get(key)
+    if conn is None:
+        Path(filepath).parent.mkdir(parents=True, exist_ok=True)
+        # 其他连接持有写锁时最多等待 LOCK_TIMEOUT 秒，而不是立即报 database is locked
+        conn = sqlite3.connect(key, isolation_level=None, timeout=LOCK_TIMEOUT)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conns[key] = conn
+    return conn
+
+
+def close(filepath: Optional[Path] = None):
+    """关闭当前线程的连接；filepath 为空时全部关闭"""
+    conns = _local.__dict__.get("connections", {})
+    keys = list(conns) if filepath is None else [Path(filepath).resolve()]
+    done = _local.__dict__.get("initialized", set())
+    for key in keys:
+        done.discard(key)
+        conn = conns.pop(key, None)
+        if conn is not None:
+            conn.close()
+
+
+def init_db(filepath: Path = SQLITE_FILE):
+    """初始化数据库：建表、建索引，配置表为空时写入默认配置"""
+    conn = _connect(filepath)
+    with transaction(filepath):
+        for sheet_name, table in SHEET_TABLES.items():
+            columns = ", ".join(
+                _quote(c) + (" TEXT" if c in _TEXT_COLUMNS else "") for c in SHEET_COLUMNS[sheet_name]
+            )
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns})")
+        for ddl in _INDEXES:
+            conn.execute(ddl)
+        if conn.execute("SELECT COUNT(*) FROM config").fetchone()[0] == 0:
+            _insert(conn, SHEET_CONFIG, _default_config_rows())
+
+
+@contextmanager
+def transaction(filepath: Path = SQLITE_FILE) -> Iterator[None]:
+    """写事务（BEGIN IMMEDIATE），正常退出提交、异常回滚；嵌套事务并入最外层"""
+    conn = _connect(filepath)
+    if conn.in_transaction:
+        yield
+        return
+    backup.ensure_baseline(filepath)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    backup.request_backup(filepath)
+
+
+@contextmanager
+def read_snapshot(filepath: Path = SQLITE_FILE) -> Iterator[None]:
+    """读快照（延迟型读事务）：WAL 模式下块内的多次读取看到同一版本，且不阻塞写者"""
+    _ensure_db(filepath)
+    conn = _connect(filepath)
+    if conn.in_transaction:
+        yield
+        return
+    conn.execute("BEGIN")
+    try:
+        yield
+    finally:
+        conn.execute("COMMIT")
+
+
+def _query(sheet_name: str, filepath: Path, where: str = "", params: tuple = ()) -> pd.DataFrame:
+    _ensure_db(filepath)
+    columns = SHEET_COLUMNS[sheet_name]
+    sql = (
+        f"SELECT {', '.join(_quote(c) for c in columns)} FROM {SHEET_TABLES[sheet_name]}"
+        f"{' WHERE ' + where if where else ''} ORDER BY rowid"
+    )
+    rows = _connect(filepath).execute(sql, params).fetchall()
+    if not rows:
+        return pd.DataFrame(columns=columns)
+    return pd.DataFrame.from_records(rows, columns=columns)
+
+
+def _ensure_db(filepath: Path):
+    """每个线程对每个数据库只建一次表"""
+    done = _local.__dict__.setdefault("initialized", set())
+    key = Path(filepath).resolve()
+    if key not in done:
+        init_db(filepath)
+        done.add(key)
+
+
+def _insert(conn: sqlite3.Connection, sheet_name: str, records: List[dict]):
+    columns = SHEET_COLUMNS[sheet_name]
+    sql = (
+        f"INSERT INTO {SHEET_TABLES[sheet_name]} ({', '.join(_quote(c) for c in columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})"
+    )
+    conn.executemany(sql, [tuple(_sql_value(r.get(c)) for c in columns) for r in records])
+
+
+def _update(conn: sqlite3.Connection, sheet_name: str, key: str, key_value, updates: dict) -> int:
+    updates = {c: v for c, v in updates.items() if c in SHEET_COLUMNS[sheet_name]}
+    if not updates:
+        return 0
+    sets = ", ".join(f"{_quote(c)} = ?" for c in updates)
+    cur = conn.execute(
+        f"UPDATE {SHEET_TABLES[sheet_name]} SET {sets} WHERE {_quote(key)} = ?",
+        tuple(_sql_value(v) for v in updates.values()) + (key_value,),
+    )
+    return cur.rowcount
+
+
+# ---- 整表读写（与 excel_handler 相同） ----
+
+def read_sheet(sheet_name: str, filepath: Path = SQLITE_FILE) -> pd.DataFrame:
+    if sheet_name not in SHEET_TABLES:
+        return pd.DataFrame()
+    return _query(sheet_name, filepath)
+
+
+def write_sheet(df: pd.DataFrame, sheet_name: str, filepath: Path = SQLITE_FILE):
+    """整表覆盖"""
+    _ensure_db(filepath)
+    conn = _connect(filepath)
+    df = _ensure_columns(df.copy(), SHEET_COLUMNS[sheet_name])
+    with transaction(filepath):
+        conn.execute(f"DELETE FROM {SHEET_TABLES[sheet_name]}")
+        _insert(conn, sheet_name, df.to_dict("records"))
+
+
+# ---- 贷款方案 CRUD ----
+
+def get_all_plans(filepath: Path = SQLITE_FILE) -> pd.DataFrame:
+    return _query(SHEET_LOAN_PLANS, filepath)
+
+
+def get_plan_by_id(plan_id: str, filepath: Path = SQLITE_FILE) -> Optional[pd.Series]:
+    df = _query(SHEET_LOAN_PLANS, filepath, "plan_id = ?", (plan_id,))
+    if df.empty:
+        return None
+    return df.iloc[0].copy()
+
+
+def save_plan(plan_dict: dict, filepath: Path = SQLITE_FILE):
+    _ensure_db(filepath)
+    conn = _connect(filepath)
+    with transaction(filepath):
+        if not _update(conn, SHEET_LOAN_PLANS, "plan_id", plan_dict["plan_id"], plan_dict):
+            _insert(conn, SHEET_LOAN_PLANS, [plan_dict])
+
+
+def delete_plan(plan_id: str, filepath: Path = SQLITE_FILE):
+    _ensure_db(filepath)
+    conn = _connect(filepath)
+    with transaction(filepath):
+        for sheet in [SHEET_LOAN_PLANS, SHEET_RATE_ADJUSTMENTS, SHEET_PREPAYMENTS]:
+            conn.execute(f"DELETE FROM {SHEET_TABLES[sheet]} WHERE plan_id = ?", (plan_id,))
+    _clear_stored_schedules(plan_id)
+
+
+# ---- 利率调整 ----
+
+def get_rate_adjustments(plan_id: str, filepath: Path = SQLITE_FILE) -> pd.DataFrame:
+    return _query(SHEET_RATE_ADJUSTMENTS, filepath, "plan_id = ?", (plan_id,))
+
+
+def save_rate_adjustment(record: dict, filepath: Path = SQLITE_FILE):
+    _ensure_db(filepath)
+    with transaction(filepath):
+        _insert(_connect(filepath), SHEET_RATE_ADJUSTMENTS, [record])
+
+
+# ---- 提前还款 ----
+
+def get_prepayments(plan_id: str, filepath: Path = SQLITE_FILE) -> pd.DataFrame:
+    return _query(SHEET_PREPAYMENTS, filepath, "plan_id = ?", (plan_id,))
+
+
+def save_prepayment(record: dict, filepath: Path = SQLITE_FILE):
+    _ensure_db(filepath)
+    with transaction(filepath):
+        _insert(_connect(filepath), SHEET_PREPAYMENTS, [record])
+
+
+def update_prepayment(prepayment_id: str, updates: dict, filepath: Path = SQLITE_FILE) -> bool:
+    _ensure_db(filepath)
+    with transaction(filepath):
+        return _update(_connect(filepath), SHEET_PREPAYMENTS, "prepayment_id", prepayment_id, updates) > 0
+
+
+# ---- 系统配置 ----
+
+def get_config(key: str, filepath: Path = SQLITE_FILE) -> Optional[str]:
+    df = _query(SHEET_CONFIG, filepath, "key = ?", (key,))
+    if df.empty:
+        return None
+    return str(df.iloc[0]["value"])
+
+
+def get_all_config(filepath: Path = SQLITE_FILE) -> pd.DataFrame:
+    return _query(SHEET_CONFIG, filepath)
+
+
+def set_config(key: str, value: str, description: str = "", filepath: Path = SQLITE_FILE):
+    _ensure_db(filepath)
+    conn = _connect(filepath)
+    now = datetime.now().isoformat()
+    updates = {"value": str(value), "updated_at": now}
+    if description:
+        updates["description"] = description
+    with transaction(filepath):
+        if not _update(conn, SHEET_CONFIG, "key", key, updates):
+            _insert(conn, SHEET_CONFIG, [{"key": key, "description": description, **updates}])
+
+
+# ---- Excel 导入 / 导出 ----
+
+def import_excel(excel_path: Path, filepath: Path = SQLITE_FILE):
+    """用 Excel 工作簿的全部 Sheet 覆盖数据库内容"""
+    from data_manager import excel_handler
+
+    with transaction(filepath):
+        for sheet_name in SHEET_TABLES:
+            write_sheet(excel_handler.read_sheet(sheet_name, Path(excel_path)), sheet_name, filepath)
+
+
+def export_excel(excel_path: Path, filepath: Path = SQLITE_FILE):
+    """把数据库全部表导出为 Excel 工作簿（覆盖已有文件）"""
+    with pd.ExcelWriter(excel_path, engine="openpyxl") as writer:
+        for sheet_name in SHEET_TABLES:
+            read_sheet(sheet_name, filepath).to_excel(writer, sheet_name=sheet_name, index=False)
+
+
+def restore_backup(snapshot_id: Optional[str] = None, filepath: Path = SQLITE_FILE) -> dict:
+    """用备份快照（默认最新）恢复数据库，参见 data_manager.backup；快照不存在时抛出 KeyError"""
+    return backup.restore_snapshot(Path(filepath), snapshot_id)
@@ -5,7 +5,7 @@ import pandas as pd
 from config.constants import LoanType
 from config.settings import COLORS
 from data_manager.excel_handler import get_all_plans, get_prepayments
-from core.schedule_generator import get_plan_schedule, generate_single_component_schedule
+from core.schedule_generator import get_plan_schedules
 from components.charts import (
     create_principal_interest_pie, create_monthly_payment_line,
     create_stacked_area, create_remaining_principal_line, create_cumulative_chart,
@@ -32,8 +32,9 @@ selected_idx = plan_names.index(selected_name)
 plan_id = plan_ids[selected_idx]
 plan = active_plans[active_plans["plan_id"] == plan_id].iloc[0]
 
-# 获取综合还款计划
-combined_schedule = get_plan_schedule(plan_id)
+# 一次重放得到综合计划及组合贷各分量
+plan_schedules = get_plan_schedules(plan_id)
+combined_schedule = plan_schedules.to_frame()
 
 if combined_schedule.empty:
     st.warning("该方案暂无还款计划数据。")
@@ -60,22 +61,9 @@ schedules = {}
 schedule_titles = {}
 
 if is_combined:
-    # 组合贷：分别生成商贷、公积金、综合三个schedule
-    from datetime import datetime
-    start_date = pd.to_datetime(plan["start_date"]).date()
-    repayment_day = int(plan["repayment_day"])
-    term_months = int(plan["term_months"])
-    repayment_method = plan["repayment_method"]
-
-    # 分别生成带提前还款事件的商贷和公积金schedule
-    commercial_schedule = generate_single_component_schedule(
-        plan, prepayments, "commercial",
-        start_date, repayment_day, repayment_method, term_months
-    )
-    provident_schedule = generate_single_component_schedule(
-        plan, prepayments, "provident",
-        start_date, repayment_day, repayment_method, term_months
-    )
+    # 组合贷：综合、商贷、公积金三个schedule来自同一次重放
+    commercial_schedule = plan_schedules.to_frame("commercial")
+    provident_schedule = plan_schedules.to_frame("provident")
 
     schedules["combined"] = combined_schedule
     schedule_titles["combined"] = "综合汇总"
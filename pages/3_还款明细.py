@@ -5,8 +5,10 @@ import pandas as pd
 from data_manager.excel_handler import get_all_plans, get_prepayments
 from core.schedule_generator import get_plan_schedule
 from components.tables import render_repayment_table
-from components.charts import create_stacked_area, create_remaining_principal_line, create_monthly_payment_line
-from core.calculator import calc_remaining_irr
+from components.charts import (
+    create_stacked_area, create_remaining_principal_line, create_monthly_payment_line, create_remaining_irr_line,
+)
+from core.calculator import calc_remaining_irr, calc_remaining_irr_curve
 from utils.formatters import fmt_amount, fmt_percent, fmt_rate
 
 st.set_page_config(page_title="还款明细", page_icon="📄", layout="wide")
@@ -114,6 +116,9 @@ with col2:
     fig_remaining = create_remaining_principal_line(schedule, prepayment_periods)
     st.plotly_chart(fig_remaining, width='stretch')
 
+fig_irr = create_remaining_irr_line(calc_remaining_irr_curve(schedule), prepayment_periods)
+st.plotly_chart(fig_irr, width='stretch')
+
 st.divider()
 
 # 还款计划表
@@ -1,19 +1,27 @@
 """提前还款模拟"""
 import streamlit as st
+import numpy as np
 import pandas as pd
 from datetime import date
 
 from data_manager.excel_handler import (
     get_all_plans, save_prepayment, get_prepayments, update_prepayment, get_rate_adjustments,
 )
-from core.schedule_generator import get_plan_schedule, generate_single_component_schedule, generate_plan_schedule_from_events
+from core.schedule_generator import get_plan_schedules, generate_plan_schedules, resolve_plan_periods
 from data_manager.data_validator import validate_prepayment
-from core.prepayment import apply_prepayment, apply_combined_prepayment, calc_shorten_term, calc_reduce_payment, calc_interest_saved
+from core.prepayment import (
+    apply_prepayment, apply_combined_prepayment, calc_shorten_term, calc_reduce_payment, calc_interest_saved,
+    prepayment_grid,
+)
+from core.planner import plan_prepayments
 from components.forms import render_prepayment_form
-from components.charts import create_monthly_payment_line, create_remaining_principal_line, create_multi_schedule_line
+from components.charts import (
+    create_monthly_payment_line, create_remaining_principal_line, create_multi_schedule_line,
+    create_savings_heatmap,
+)
 from utils.id_generator import generate_prepayment_id
 from utils.formatters import fmt_amount, fmt_months
-from config.constants import LoanType
+from config.constants import LoanType, PlanObjective
 
 st.set_page_config(page_title="提前还款模拟", page_icon="💰", layout="wide")
 st.title("💰 提前还款模拟")
@@ -71,23 +79,17 @@ is_combined = plan["loan_type"] == LoanType.COMBINED.value
 
 prepayments = get_prepayments(plan_id)
 
+# 一次重放得到综合计划及组合贷各分量
+plan_schedules = get_plan_schedules(plan_id)
+
 # 如果是组合贷，需要分别计算商贷和公积金的剩余本金
 remaining_commercial = None
 remaining_provident = None
 if is_combined:
     start_date_plan = pd.to_datetime(plan["start_date"]).date() if isinstance(plan["start_date"], str) else plan["start_date"]
-    repayment_day = int(plan["repayment_day"])
-    term_months = int(plan["term_months"])
-    repayment_method = plan["repayment_method"]
 
-    sch_c = generate_single_component_schedule(
-        plan, prepayments, "commercial",
-        start_date_plan, repayment_day, repayment_method, term_months
-    )
-    sch_p = generate_single_component_schedule(
-        plan, prepayments, "provident",
-        start_date_plan, repayment_day, repayment_method, term_months
-    )
+    sch_c = plan_schedules.to_frame("commercial")
+    sch_p = plan_schedules.to_frame("provident")
 
     def get_remaining_at_period(sch, period):
         if period == 1:
@@ -97,7 +99,7 @@ if is_combined:
             return float(prev.iloc[0]["remaining_principal"])
         return float(sch.iloc[-1]["remaining_principal"])
 
-schedule = get_plan_schedule(plan_id)
+schedule = plan_schedules.to_frame()
 if schedule.empty:
     st.warning("暂无还款计划。")
     st.stop()
@@ -242,28 +244,21 @@ if not prepayments.empty:
         with st.spinner("正在更新并重新计算还款计划..."):
             base_prepayments = prepayments_display[prepayments_display["prepayment_id"] != selected_id].copy()
             rate_adjustments = get_rate_adjustments(plan_id)
-            base_schedule = generate_plan_schedule_from_events(plan, base_prepayments, rate_adjustments)
+            base_schedules = generate_plan_schedules(plan, base_prepayments, rate_adjustments)
+            base_schedule = base_schedules.to_frame()
             if base_schedule.empty:
                 st.error("无法重新生成还款计划。")
                 st.stop()
-            base_schedule["due_date_dt"] = pd.to_datetime(base_schedule["due_date"])
-            eff_rows = base_schedule[base_schedule["due_date_dt"] >= pd.Timestamp(edit_date)]
-            if eff_rows.empty:
+            prepayment_period = int(resolve_plan_periods(plan, edit_date, periods=len(base_schedule)))
+            if prepayment_period == 0:
                 st.error("提前还款日期超出还款计划范围。")
                 st.stop()
-            prepayment_period = int(eff_rows.iloc[0]["period"])
             prepay_row = base_schedule[base_schedule["period"] == prepayment_period].iloc[0]
             remaining_at_period = float(prepay_row["remaining_principal"]) + float(prepay_row["principal"])
 
             if is_combined:
-                sch_c_base = generate_single_component_schedule(
-                    plan, base_prepayments, "commercial",
-                    start_date_plan, repayment_day, repayment_method, term_months
-                )
-                sch_p_base = generate_single_component_schedule(
-                    plan, base_prepayments, "provident",
-                    start_date_plan, repayment_day, repayment_method, term_months
-                )
+                sch_c_base = base_schedules.to_frame("commercial")
+                sch_p_base = base_schedules.to_frame("provident")
                 rem_c = get_remaining_at_period(sch_c_base, prepayment_period)
                 rem_p = get_remaining_at_period(sch_p_base, prepayment_period)
                 if edit_type == "commercial":
@@ -282,7 +277,7 @@ if not prepayments.empty:
                     st.error(msg)
                     st.stop()
                 _, prepay_info = apply_combined_prepayment(
-                    plan_id, plan, base_schedule.drop(columns=["due_date_dt"]),
+                    plan_id, plan, base_schedule,
                     prepayment_period, edit_type, edit_amount_c or 0.0, edit_amount_p or 0.0,
                     edit_method, start_date_plan, int(plan["repayment_day"]),
                     sch_c_current=sch_c_base, sch_p_current=sch_p_base,
@@ -301,7 +296,7 @@ if not prepayments.empty:
                     st.stop()
                 start_date = pd.to_datetime(plan["start_date"]).date() if isinstance(plan["start_date"], str) else plan["start_date"]
                 _, prepay_info = apply_prepayment(
-                    plan_id, base_schedule.drop(columns=["due_date_dt"]),
+                    plan_id, base_schedule,
                     prepayment_period, edit_amount, edit_method,
                     float(prepay_row["applied_rate"]), plan["repayment_method"],
                     start_date, int(plan["repayment_day"]),
@@ -320,6 +315,88 @@ if not prepayments.empty:
             else:
                 st.error("更新失败，未找到对应记录。")
 
+# 提前还款效果全景：所有未来期数 × 金额 × 两种方式一次算出
+if not is_combined:
+    with st.expander("📊 提前还款节省全景（热力图）"):
+        grid_max = st.number_input(
+            "最大提前还款金额(元)",
+            min_value=10000.0,
+            value=float(max(min(remaining_principal * 0.5, 1000000.0), 10000.0)),
+            step=10000.0,
+            key="prepay_grid_max",
+        )
+        grid_method = st.radio(
+            "还款方式",
+            options=["shorten_term", "reduce_payment"],
+            format_func=lambda x: "缩短年限（月供不变）" if x == "shorten_term" else "减少月供（期限不变）",
+            horizontal=True,
+            key="prepay_grid_method",
+        )
+        grid = prepayment_grid(
+            schedule, np.linspace(grid_max / 100, grid_max, 100),
+            plan["repayment_method"], from_period=current_period,
+        )
+        theme_base = st.get_option("theme.base")
+        template = "loan_dashboard_dark" if theme_base == "dark" else "loan_dashboard_light"
+        st.plotly_chart(
+            create_savings_heatmap(grid.saved_frame(grid_method), template=template),
+            use_container_width=True,
+        )
+
+# 现金预算下的提前还款规划
+with st.expander("🧭 提前还款规划（按现金预算自动生成）"):
+    with st.form("prepayment_planner_form"):
+        p1, p2, p3 = st.columns(3)
+        planner_surplus = p1.number_input("每月结余(元)", min_value=0.0, value=3000.0, step=500.0)
+        planner_bonus = p2.number_input("每年奖金(元)", min_value=0.0, value=0.0, step=10000.0)
+        planner_bonus_month = p3.number_input("奖金到账月份", min_value=1, max_value=12, value=12, step=1)
+        p4, p5, p6 = st.columns(3)
+        planner_cash = p4.number_input("当前可用现金(元)", min_value=0.0, value=0.0, step=10000.0)
+        planner_floor = p5.number_input("最低保留现金(元)", min_value=0.0, value=0.0, step=10000.0)
+        planner_min = p6.number_input("单次最低还款额(元)", min_value=1000.0, value=10000.0, step=1000.0)
+        planner_objective = st.radio(
+            "规划目标",
+            options=[o.value for o in PlanObjective],
+            format_func=lambda x: PlanObjective(x).label,
+            horizontal=True,
+        )
+        submitted_plan = st.form_submit_button("生成规划", use_container_width=True)
+
+    if submitted_plan:
+        with st.spinner("正在规划..."):
+            start_date = pd.to_datetime(plan["start_date"]).date() if isinstance(plan["start_date"], str) else plan["start_date"]
+            proposal = plan_prepayments(
+                plan, plan_schedules, start_date, int(plan["repayment_day"]), current_period,
+                monthly_surplus=planner_surplus, annual_bonus=planner_bonus,
+                bonus_month=int(planner_bonus_month), initial_cash=planner_cash,
+                liquidity_floor=planner_floor, min_amount=planner_min,
+                objective=planner_objective,
+            )
+        if not proposal.events:
+            st.info("在当前现金预算下没有可执行的提前还款。")
+        else:
+            proposed = proposal.schedules.merged
+            q1, q2, q3 = st.columns(3)
+            q1.metric("建议次数", f"{len(proposal.events)} 次")
+            q2.metric("累计提前还款", fmt_amount(sum(e["amount"] for e in proposal.events)))
+            q3.metric("节省利息", fmt_amount(schedule["interest"].sum() - proposed.total("interest")))
+            events_df = proposal.to_frame()
+            display_cols = ["prepayment_date", "prepayment_period", "amount", "method", "interest_saved"]
+            if is_combined:
+                display_cols += ["prepayment_type", "amount_commercial", "amount_provident"]
+            st.dataframe(events_df[display_cols], use_container_width=True, hide_index=True)
+
+            theme_base = st.get_option("theme.base")
+            template = "loan_dashboard_dark" if theme_base == "dark" else "loan_dashboard_light"
+            fig_plan = create_multi_schedule_line(
+                {"原计划": schedule, "按规划提前还款": proposal.schedules.to_frame()},
+                y_col="remaining_principal",
+                title="剩余本金对比（原计划 vs 按规划提前还款）",
+                y_label="剩余本金(元)",
+                template=template,
+            )
+            st.plotly_chart(fig_plan, use_container_width=True)
+
 # 提前还款表单
 form_data = render_prepayment_form(
     remaining_principal,
@@ -347,13 +424,10 @@ if form_data:
             st.stop()
 
         # 根据用户选择的日期找到生效期数
-        schedule["due_date_dt"] = pd.to_datetime(schedule["due_date"])
-        eff_rows = schedule[schedule["due_date_dt"] >= pd.Timestamp(prepayment_date)]
-        if eff_rows.empty:
+        prepayment_period = int(resolve_plan_periods(plan, prepayment_date, periods=len(schedule)))
+        if prepayment_period == 0:
             st.error("提前还款日期超出还款计划范围。")
             st.stop()
-
-        prepayment_period = int(eff_rows.iloc[0]["period"])
         st.session_state.prepayment_period = prepayment_period
         st.session_state.amount = amount
         st.session_state.method = method
@@ -1,33 +1,45 @@
 """方案对比"""
 import streamlit as st
+import numpy as np
 import pandas as pd
 from datetime import date
 
 from data_manager.excel_handler import get_all_plans
 from core.schedule_generator import get_plan_schedule
-from core.comparison import compare_plans, compare_repayment_methods
-from core.inflation import adjust_for_inflation, calc_real_cost
+from core.comparison import (
+    compare_plans, compare_repayment_methods, candidate_grid, evaluate_candidates,
+    rank_plans, pareto_front, METRIC_COLUMNS,
+)
+from core.inflation import adjust_for_inflation, calc_real_cost, calc_real_cost_scenarios, sample_inflation_paths
+from core.calculator import calc_irr
 from components.charts import (
     create_comparison_bar, create_multi_schedule_line,
-    create_separate_principal_interest_lines,
+    create_separate_principal_interest_lines, create_real_cost_bands, create_pareto_scatter,
 )
 from components.tables import render_comparison_table
 from utils.formatters import fmt_amount
+from config.settings import DEFAULT_COMMERCIAL_RATE, DEFAULT_PROVIDENT_RATE, DEFAULT_PROVIDENT_LIMIT
 
 st.set_page_config(page_title="方案对比", page_icon="⚖️", layout="wide")
 st.title("⚖️ 方案对比")
 
+
+@st.cache_data(show_spinner=False)
+def _inflation_paths(n_paths: int, months: int, mean_rate: float, volatility: float):
+    return sample_inflation_paths(n_paths, months, mean_rate, volatility, seed=0)
+
+
 plans = get_all_plans()
 if plans.empty or len(plans) < 1:
     st.info("请先创建至少一个贷款方案。")
     st.stop()
 
-tab_plans, tab_methods = st.tabs(["方案横向对比", "等额本息 vs 等额本金"])
+tab_plans, tab_methods, tab_search = st.tabs(["方案横向对比", "等额本息 vs 等额本金", "贷款结构优选"])
 
 with tab_plans:
     plan_names = plans["plan_name"].tolist()
     selected = st.multiselect(
-        "选择对比方案（2-4个）", plan_names,
+        "选择对比方案（至少2个）", plan_names,
         default=plan_names[:min(2, len(plan_names))],
     )
 
@@ -109,6 +121,33 @@ with tab_plans:
                         c2.metric("实际购买力", fmt_amount(real["real_total_payment_pv"]))
                         c3.metric("通胀侵蚀", fmt_amount(real["inflation_erosion"]))
 
+            # 通胀情景：路径只随参数变化重新抽样，各方案在所有路径上一次折现
+            with st.expander("通胀情景分析（随机通胀路径）"):
+                s1, s2, s3 = st.columns(3)
+                sc_mean = s1.number_input("平均年通胀率(%)", value=inflation_rate, step=0.1, format="%.1f")
+                sc_vol = s2.number_input("通胀波动(百分点)", min_value=0.0, value=1.0, step=0.1, format="%.1f")
+                sc_paths = s3.number_input("路径数", min_value=100, max_value=20000, value=2000, step=500)
+                named = [p for p in plan_list if p["plan_id"] in schedules]
+                months = max(len(schedules[p["plan_id"]]) for p in named)
+                paths = _inflation_paths(int(sc_paths), months, sc_mean, sc_vol)
+                scenarios = calc_real_cost_scenarios(
+                    [schedules[p["plan_id"]]["monthly_payment"].to_numpy() for p in named],
+                    [calc_irr(p["total_amount"], schedules[p["plan_id"]]) for p in named],
+                    paths,
+                    names=[p["plan_name"] for p in named],
+                )
+                bands = scenarios.bands()
+                st.plotly_chart(create_real_cost_bands(bands, template=template), width='stretch')
+                st.dataframe(bands.rename(columns={
+                    "nominal_total_payment": "名义总还款",
+                    "real_total_payment_p5": "实际总还款 P5",
+                    "real_total_payment_p50": "实际总还款 P50",
+                    "real_total_payment_p95": "实际总还款 P95",
+                    "real_interest_rate_p5": "实际利率% P5",
+                    "real_interest_rate_p50": "实际利率% P50",
+                    "real_interest_rate_p95": "实际利率% P95",
+                }), width='stretch')
+
 with tab_methods:
     st.subheader("等额本息 vs 等额本金 快速对比")
 
@@ -161,3 +200,59 @@ with tab_methods:
 
         fig2 = create_multi_schedule_line(named, "remaining_principal", "剩余本金对比", "剩余本金(元)", template=template)
         st.plotly_chart(fig2, width='stretch')
+
+with tab_search:
+    st.subheader("贷款结构优选")
+    st.caption("枚举公积金额度 × 期限 × 还款方式的全部组合，一次批量计算指标，并按指标排序或做 Pareto 筛选。")
+
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        search_amount = st.number_input("贷款总额(元)", value=1500000.0, step=10000.0, key="search_amt")
+    with c2:
+        search_c_rate = st.number_input("商贷利率(%)", value=DEFAULT_COMMERCIAL_RATE, step=0.01, format="%.2f", key="search_c_rate")
+    with c3:
+        search_p_rate = st.number_input("公积金利率(%)", value=DEFAULT_PROVIDENT_RATE, step=0.01, format="%.2f", key="search_p_rate")
+
+    c4, c5, c6 = st.columns(3)
+    with c4:
+        search_p_max = st.number_input("公积金上限(元)", value=DEFAULT_PROVIDENT_LIMIT * 10000, step=10000.0, key="search_p_max")
+    with c5:
+        search_p_step = st.number_input("公积金额度步长(元)", min_value=1000.0, value=50000.0, step=10000.0, key="search_p_step")
+    with c6:
+        search_years = st.slider("期限范围(年)", 5, 30, (10, 30), key="search_years")
+
+    candidates = candidate_grid(
+        search_amount,
+        np.arange(0.0, min(search_p_max, search_amount) + 1, search_p_step),
+        np.arange(search_years[0], search_years[1] + 1) * 12,
+    )
+    results = evaluate_candidates(candidates, search_c_rate, search_p_rate)
+    st.write(f"共 {len(results)} 个候选结构")
+
+    s1, s2, s3 = st.columns(3)
+    with s1:
+        rank_metric = st.selectbox("排序指标", METRIC_COLUMNS, index=METRIC_COLUMNS.index("总利息"), key="rank_metric")
+    with s2:
+        rank_order = st.radio("排序", ["最小", "最大"], horizontal=True, key="rank_order")
+    with s3:
+        rank_k = st.number_input("显示前 k 个", min_value=1, max_value=100, value=10, key="rank_k")
+    st.dataframe(
+        rank_plans(results, rank_metric, int(rank_k), ascending=rank_order == "最小"),
+        width='stretch', hide_index=True,
+    )
+
+    st.markdown("#### Pareto 前沿")
+    p1, p2 = st.columns(2)
+    with p1:
+        pareto_x = st.selectbox("指标一（越小越好）", METRIC_COLUMNS, index=METRIC_COLUMNS.index("最高月供"), key="pareto_x")
+    with p2:
+        pareto_y = st.selectbox("指标二（越小越好）", METRIC_COLUMNS, index=METRIC_COLUMNS.index("总利息"), key="pareto_y")
+    if pareto_x == pareto_y:
+        st.warning("请选择两个不同的指标。")
+    else:
+        theme_base = st.get_option("theme.base")
+        template = "loan_dashboard_dark" if theme_base == "dark" else "loan_dashboard_light"
+        front = pareto_front(results, {pareto_x: "min", pareto_y: "min"})
+        st.plotly_chart(create_pareto_scatter(results, front, pareto_x, pareto_y, template=template), width='stretch')
+        st.dataframe(front, width='stretch', hide_index=True)
+
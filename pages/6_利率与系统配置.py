@@ -1,14 +1,18 @@
 """利率与系统配置"""
 import streamlit as st
+import numpy as np
 import pandas as pd
+import plotly.express as px
 from datetime import date
 
 from data_manager.excel_handler import (
     get_all_plans, get_rate_adjustments,
-    save_rate_adjustment, get_config, set_config,
+    save_rate_adjustment, get_config, set_config, transaction,
     get_all_config, init_excel,
 )
-from core.schedule_generator import get_plan_schedule
+from core.schedule_generator import get_plan_schedule, get_plan_schedules, resolve_plan_periods
+from core.lpr_simulation import simulate_schedule_under_lpr, RANDOM_WALK, MEAN_REVERTING
+from components.charts import create_fan_chart
 from data_manager.data_validator import validate_rate_adjustment
 from core.rate_adjustment import apply_rate_adjustment
 from config.constants import RateType, LoanType
@@ -20,7 +24,89 @@ st.set_page_config(page_title="利率与系统配置", page_icon="📈", layout=
 st.title("📈 利率与系统配置")
 init_excel()
 
-tab_rate, tab_settings = st.tabs(["利率管理", "系统配置"])
+tab_rate, tab_sim, tab_settings = st.tabs(["利率管理", "利率情景模拟", "系统配置"])
+
+# 利率管理页对组合贷会 st.stop()，情景模拟需先渲染
+with tab_sim:
+    st.subheader("LPR 利率情景模拟")
+    sim_plans = get_all_plans()
+    sim_plans = sim_plans[sim_plans["status"] == "active"] if not sim_plans.empty and "status" in sim_plans.columns else sim_plans
+    if sim_plans.empty:
+        st.info("暂无活跃的贷款方案。")
+    else:
+        sim_names = sim_plans["plan_name"].tolist()
+        sim_name = st.selectbox("选择方案", sim_names, key="lpr_sim_plan")
+        sim_plan = sim_plans.iloc[sim_names.index(sim_name)]
+        sim_lpr = float(get_config("lpr_5y") or DEFAULT_LPR_5Y)
+
+        with st.form("lpr_sim_form"):
+            s1, s2, s3 = st.columns(3)
+            sim_model = s1.selectbox(
+                "利率模型",
+                options=[RANDOM_WALK, MEAN_REVERTING],
+                format_func=lambda x: "随机游走" if x == RANDOM_WALK else "均值回归",
+            )
+            sim_vol = s2.number_input("每年波动(百分点)", min_value=0.0, value=0.25, step=0.05, format="%.2f")
+            sim_paths = s3.number_input("路径数", min_value=100, max_value=100000, value=10000, step=1000)
+            s4, s5, s6 = st.columns(3)
+            sim_long_run = s4.number_input("长期 LPR (%)（均值回归）", value=sim_lpr, step=0.05, format="%.2f")
+            sim_drift = s5.number_input("每年漂移(百分点)（随机游走）", value=0.0, step=0.05, format="%.2f")
+            sim_repricing = s6.date_input("重定价日", value=date(date.today().year, 1, 1))
+            sim_keep_payment = st.checkbox("重定价时月供不变、调整期限（仅等额本息）")
+            submitted_sim = st.form_submit_button("开始模拟", width='stretch')
+
+        if submitted_sim:
+            plan_schedules = get_plan_schedules(sim_plan["plan_id"])
+            merged = plan_schedules.to_frame()
+            unpaid = merged[~merged["is_paid"]]
+            if unpaid.empty:
+                st.success("该方案已全部还清！")
+            else:
+                current_period = int(unpaid.iloc[0]["period"])
+                # 组合贷只有商贷随 LPR 浮动，公积金部分按现有计划叠加
+                floating = plan_schedules.commercial if plan_schedules.is_combined else plan_schedules.merged
+                with st.spinner("正在模拟..."):
+                    sim = simulate_schedule_under_lpr(
+                        floating, sim_plan["repayment_method"], sim_lpr,
+                        n_paths=int(sim_paths), from_period=current_period,
+                        repricing_month=sim_repricing.month, repricing_day=sim_repricing.day,
+                        model=sim_model, volatility=sim_vol, drift=sim_drift,
+                        long_run_lpr=sim_long_run, keep_payment=sim_keep_payment,
+                    )
+                payment_pct = sim.percentiles("payments")
+                remaining_pct = sim.percentiles("remaining")
+                total_interest = sim.total_interest
+                if plan_schedules.is_combined:
+                    fixed = plan_schedules.provident.to_frame().set_index("period")
+                    payment_pct = payment_pct.add(fixed["monthly_payment"], axis=0).fillna(payment_pct)
+                    remaining_pct = remaining_pct.add(fixed["remaining_principal"], axis=0).fillna(remaining_pct)
+                    total_interest = total_interest + plan_schedules.provident.total("interest", current_period)
+
+                theme_base = st.get_option("theme.base")
+                template = "loan_dashboard_dark" if theme_base == "dark" else "loan_dashboard_light"
+                x_labels = [f"第{p}期 {str(d)[:7]}" for p, d in zip(sim.periods, sim.due_dates)]
+                payoff = pd.Series(sim.payoff_dates().astype("datetime64[M]").astype(str))
+
+                m1, m2, m3 = st.columns(3)
+                m1.metric("剩余利息（中位数）", fmt_amount(float(np.median(total_interest))))
+                m2.metric("剩余利息 P5–P95", f"{np.percentile(total_interest, 5):,.0f} – {np.percentile(total_interest, 95):,.0f}")
+                m3.metric("还清时间（中位数）", payoff.sort_values().iloc[len(payoff) // 2])
+
+                st.plotly_chart(create_fan_chart(
+                    sim.percentiles("rates"), title="执行利率分布", y_label="年利率(%)",
+                    x_labels=x_labels, template=template,
+                ), width='stretch')
+                st.plotly_chart(create_fan_chart(
+                    payment_pct, title="月供分布", y_label="月供金额(元)",
+                    x_labels=x_labels, template=template,
+                ), width='stretch')
+                st.plotly_chart(create_fan_chart(
+                    remaining_pct, title="剩余本金分布", y_label="剩余本金(元)",
+                    x_labels=x_labels, template=template,
+                ), width='stretch')
+                c1, c2 = st.columns(2)
+                c1.plotly_chart(px.histogram(x=total_interest, nbins=50, labels={"x": "剩余利息(元)"}, template=template), width='stretch')
+                c2.dataframe(payoff.value_counts().sort_index().rename("路径数").rename_axis("还清月份"), width='stretch')
 
 with tab_rate:
     st.subheader("当前 LPR 利率配置")
@@ -40,8 +126,9 @@ with tab_rate:
         )
 
     if st.button("更新基准利率"):
-        set_config("lpr_5y", str(new_lpr), "5年期以上LPR")
-        set_config("provident_rate", str(new_prov_rate), "公积金贷款利率")
+        with transaction():
+            set_config("lpr_5y", str(new_lpr), "5年期以上LPR")
+            set_config("provident_rate", str(new_prov_rate), "公积金贷款利率")
         st.success("基准利率已更新！")
 
     st.divider()
@@ -104,16 +191,13 @@ with tab_rate:
             st.error(msg)
             st.stop()
 
-        schedule["due_date_dt"] = pd.to_datetime(schedule["due_date"])
-        eff_rows = schedule[schedule["due_date_dt"] >= pd.Timestamp(effective_date)]
-        if eff_rows.empty:
+        effective_period = int(resolve_plan_periods(plan, effective_date, periods=len(schedule)))
+        if effective_period == 0:
             st.error("生效日期超出还款计划范围。")
             st.stop()
 
-        effective_period = int(eff_rows.iloc[0]["period"])
-
         new_schedule, summary = apply_rate_adjustment(
-            plan_id, schedule.drop(columns=["due_date_dt"]),
+            plan_id, schedule,
             effective_period, new_rate,
             plan["repayment_method"], start_date, int(plan["repayment_day"]),
         )
@@ -218,10 +302,11 @@ with tab_settings:
         submitted = st.form_submit_button("保存配置", width='stretch', type="primary")
 
         if submitted:
-            set_config("lpr_5y", str(new_lpr), "5年期以上LPR")
-            set_config("provident_rate", str(new_prov_rate), "公积金贷款利率")
-            set_config("inflation_rate", str(new_inflation), "年通胀率")
-            set_config("provident_limit", str(new_prov_limit), "公积金贷款上限(万元)")
+            with transaction():
+                set_config("lpr_5y", str(new_lpr), "5年期以上LPR")
+                set_config("provident_rate", str(new_prov_rate), "公积金贷款利率")
+                set_config("inflation_rate", str(new_inflation), "年通胀率")
+                set_config("provident_limit", str(new_prov_limit), "公积金贷款上限(万元)")
             st.success("配置已保存！新建贷款方案时将使用新的默认值。")
             st.rerun()
 
@@ -2,7 +2,39 @@ import sys
 import pytest
 from pathlib import Path
 
+import pandas as pd
+
 # 确保项目根目录在 sys.path
 project_root = Path(__file__).parent.parent
 if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
+
+from config.constants import RepaymentMethod, PrepaymentMethod
+
+
+@pytest.fixture
+def make_plan():
+    """方案行工厂：100 万、30 年等额本息，组合贷按 60/40 拆分"""
+    def factory(loan_type="commercial", start_date="2020-01-15"):
+        return pd.Series({
+            "plan_id": "P1", "plan_name": "测试", "loan_type": loan_type,
+            "total_amount": 1_000_000, "commercial_amount": 600_000 if loan_type == "combined" else 1_000_000,
+            "provident_amount": 400_000 if loan_type == "combined" else 0,
+            "term_months": 360, "repayment_method": RepaymentMethod.EQUAL_INSTALLMENT.value,
+            "commercial_rate": 3.45, "provident_rate": 2.85,
+            "start_date": start_date, "repayment_day": 15, "status": "active", "notes": "",
+        })
+    return factory
+
+
+@pytest.fixture
+def make_prepayments():
+    """n 笔提前还款记录工厂：自第 12 期起每 6 期一笔 1 万，缩短月供"""
+    def factory(n):
+        return pd.DataFrame([{
+            "prepayment_id": f"pp{i}", "plan_id": "P1", "prepayment_date": None,
+            "prepayment_period": 12 + 6 * i, "amount": 10_000,
+            "method": PrepaymentMethod.REDUCE_PAYMENT.value,
+            "prepayment_type": "both", "amount_commercial": 6_000, "amount_provident": 4_000,
+        } for i in range(n)])
+    return factory
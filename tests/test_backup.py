@@ -0,0 +1,131 @@
+"""备份子系统测试"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import threading
+import time
+from datetime import datetime, timedelta
+import pytest
+
+from data_manager import backup
+from data_manager.excel_handler import (
+    init_excel, save_plan, get_all_plans, save_prepayment, get_prepayments, restore_backup,
+)
+from data_manager.locking import file_lock, lock_path
+from config import settings
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    filepath = tmp_path / "data.xlsx"
+    filepath.write_bytes(b"version-1")
+    return filepath
+
+
+def _objects(filepath):
+    return list(backup.backup_dir(filepath).glob("objects/*/*.gz"))
+
+
+class TestSnapshot:
+    def test_deduplicates_identical_content(self, data_file):
+        assert backup.snapshot(data_file) is not None
+        assert backup.snapshot(data_file) is None
+        data_file.write_bytes(b"version-2")
+        backup.snapshot(data_file)
+        data_file.write_bytes(b"version-1")
+        backup.snapshot(data_file)
+        assert len(backup.list_snapshots(data_file)) == 3
+        assert len(_objects(data_file)) == 2
+
+    def test_retention_by_count_and_age(self, data_file, monkeypatch):
+        monkeypatch.setattr(backup, "BACKUP_KEEP_COUNT", 3)
+        start = datetime(2025, 1, 1)
+        for i in range(5):
+            data_file.write_bytes(f"v{i}".encode())
+            backup.snapshot(data_file, now=start + timedelta(days=i))
+        assert [s["created_at"][:10] for s in backup.list_snapshots(data_file)] == [
+            "2025-01-03", "2025-01-04", "2025-01-05",
+        ]
+        assert len(_objects(data_file)) == 3
+        data_file.write_bytes(b"late")
+        backup.snapshot(data_file, now=start + timedelta(days=4 + settings.BACKUP_MAX_AGE_DAYS))
+        snapshots = backup.list_snapshots(data_file)
+        assert len(snapshots) == 2
+        assert len(_objects(data_file)) == 2
+
+    def test_restore(self, data_file):
+        first = backup.snapshot(data_file)
+        data_file.write_bytes(b"version-2")
+        restored = backup.restore_snapshot(data_file, first["snapshot_id"])
+        assert restored["digest"] == first["digest"]
+        assert data_file.read_bytes() == b"version-1"
+        # 恢复前的内容也被保存了
+        backup.restore_snapshot(data_file, backup.list_snapshots(data_file)[-1]["snapshot_id"])
+        assert data_file.read_bytes() == b"version-2"
+        with pytest.raises(KeyError):
+            backup.restore_snapshot(data_file, "missing")
+
+    def test_restore_waits_for_writers(self, data_file):
+        first = backup.snapshot(data_file)
+        data_file.write_bytes(b"version-2")
+        t = threading.Thread(target=backup.restore_snapshot, args=(data_file, first["snapshot_id"]))
+        with file_lock(lock_path(data_file)):
+            t.start()
+            time.sleep(0.2)
+            assert data_file.read_bytes() == b"version-2"
+        t.join()
+        assert data_file.read_bytes() == b"version-1"
+
+    def test_snapshot_waits_for_backup_dir_lock(self, data_file):
+        t = threading.Thread(target=backup.snapshot, args=(data_file,))
+        with file_lock(backup.backup_dir(data_file) / ".lock"):
+            t.start()
+            time.sleep(0.2)
+            assert backup.list_snapshots(data_file) == []
+        t.join()
+        assert len(backup.list_snapshots(data_file)) == 1
+
+    def test_restore_backup_folds_journal_first(self, tmp_path):
+        filepath = tmp_path / "book.xlsx"
+        init_excel(filepath)
+        backup.snapshot(filepath)
+        save_prepayment({"prepayment_id": "pp0", "plan_id": "A", "amount": 1.0}, filepath)
+        restore_backup(filepath=filepath)
+        assert get_prepayments("A", filepath).empty
+        # 恢复前的快照含日志中的事件，可以撤销这次恢复
+        restore_backup(filepath=filepath)
+        assert get_prepayments("A", filepath)["prepayment_id"].tolist() == ["pp0"]
+
+
+class TestAsyncBackup:
+    def test_burst_coalesced_into_one_snapshot(self, data_file, monkeypatch):
+        monkeypatch.setattr(backup, "BACKUP_COALESCE_SECONDS", 0.2)
+        for i in range(5):
+            data_file.write_bytes(f"burst-{i}".encode())
+            backup.request_backup(data_file)
+        assert backup.list_snapshots(data_file) == []
+        deadline = time.monotonic() + 5
+        while not backup.list_snapshots(data_file) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        snapshots = backup.list_snapshots(data_file)
+        assert len(snapshots) == 1
+        assert snapshots[0]["size"] == len(b"burst-4")
+
+    def test_sqlite_backup_and_restore(self, tmp_path):
+        from data_manager import sqlite_handler
+        db = tmp_path / "data.db"
+        save_plan({"plan_id": "A", "plan_name": "A"}, db)
+        backup.flush_backups()
+        snapshots = backup.list_snapshots(db)
+        assert snapshots
+        # 在线备份得到的副本内容稳定，未修改时不会重复拍快照
+        assert backup.snapshot(db) is None
+        save_plan({"plan_id": "B", "plan_name": "B"}, db)
+        restore_backup(snapshots[-1]["snapshot_id"], db)
+        assert get_all_plans(db)["plan_id"].tolist() == ["A"]
+        sqlite_handler.close(db)
+        assert get_all_plans(db)["plan_id"].tolist() == ["A"]
+        # 恢复前的内容也被保存了
+        restore_backup(filepath=db)
+        assert get_all_plans(db)["plan_id"].tolist() == ["A", "B"]
@@ -0,0 +1,61 @@
+"""批量还款计划测试"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from datetime import date
+import numpy as np
+import pytest
+from core.batch import generate_schedules_batch
+from core.calculator import generate_schedule
+from config.constants import RepaymentMethod
+
+
+class TestBatchSchedule:
+    def test_matches_single_schedule(self):
+        principals = [1_000_000, 500_000, 300_000, 120_000]
+        rates = [3.45, 2.85, 4.9, 0]
+        terms = [360, 240, 13, 12]
+        methods = [
+            RepaymentMethod.EQUAL_INSTALLMENT.value,
+            RepaymentMethod.EQUAL_PRINCIPAL.value,
+            RepaymentMethod.EQUAL_INSTALLMENT.value,
+            RepaymentMethod.EQUAL_PRINCIPAL.value,
+        ]
+        starts = [date(2024, 1, 31), date(2023, 6, 1), date(2024, 2, 15), date(2022, 12, 1)]
+        days = [31, 1, 15, 28]
+        batch = generate_schedules_batch(principals, rates, terms, methods, starts, days)
+
+        assert batch["monthly_payment"].shape == (4, 360)
+        for i in range(4):
+            sch = generate_schedule("t", principals[i], rates[i], terms[i], methods[i], starts[i], days[i])
+            n = terms[i]
+            for col in ["monthly_payment", "principal", "interest", "remaining_principal",
+                        "cumulative_principal", "cumulative_interest"]:
+                np.testing.assert_allclose(batch[col][i, :n], sch[col].values, atol=1e-6)
+            assert np.datetime_as_string(batch.due_date[i, :n], unit="D").tolist() == sch["due_date"].tolist()
+
+    def test_padding_beyond_term(self):
+        batch = generate_schedules_batch(
+            [100_000, 100_000], 3.0, [12, 24], RepaymentMethod.EQUAL_INSTALLMENT.value,
+        )
+        assert not batch.mask[0, 12:].any()
+        assert (batch["monthly_payment"][0, 12:] == 0).all()
+        np.testing.assert_allclose(batch["cumulative_principal"][0, 12:], 100_000)
+        assert batch.due_date is None
+
+    def test_long_frame(self):
+        batch = generate_schedules_batch(
+            [100_000, 200_000], 3.0, [6, 3], RepaymentMethod.EQUAL_PRINCIPAL.value,
+            date(2024, 1, 1), columns=["monthly_payment", "interest"],
+        )
+        df = batch.to_frame()
+        assert len(df) == 9
+        assert list(df.columns) == ["loan_index", "period", "due_date", "monthly_payment", "interest"]
+        assert df.groupby("loan_index")["period"].max().tolist() == [6, 3]
+
+    def test_invalid_arguments(self):
+        with pytest.raises(ValueError, match="期数"):
+            generate_schedules_batch(np.array([1e5]), 3.0, np.array([0]), [RepaymentMethod.EQUAL_INSTALLMENT.value])
+        with pytest.raises(ValueError, match="未知"):
+            generate_schedules_batch([1e5], 3.0, 12, RepaymentMethod.EQUAL_INSTALLMENT.value, columns=["payment"])
@@ -4,15 +4,23 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from datetime import date
+import numpy as np
 import pytest
 from core.calculator import (
+    annuity_factor,
     calc_equal_installment,
     calc_equal_principal_first_month,
     generate_schedule,
     generate_combined_schedule,
     calc_irr,
+    calc_irr_batch,
+    calc_remaining_irr,
+    calc_remaining_irr_curve,
+    _cached_monthly_irr,
 )
-from config.constants import RepaymentMethod
+from core.prepayment import apply_prepayment
+from scipy import optimize
+from config.constants import RepaymentMethod, PrepaymentMethod
 
 
 class TestEqualInstallment:
@@ -58,6 +66,27 @@ class TestEqualPrincipal:
         _, ep_interest = calc_equal_principal_first_month(1_000_000, 3.45, 360)
         assert ep_interest < ei_interest
 
+    def test_closed_form_total_interest(self):
+        _, total_interest = calc_equal_principal_first_month(1_000_000, 3.45, 360)
+        r = 3.45 / 100 / 12
+        expected = sum((1_000_000 - i * 1_000_000 / 360) * r for i in range(360))
+        assert abs(total_interest - expected) < 1e-6
+
+
+class TestAnnuityFactor:
+    def test_matches_formula(self):
+        r = 3.45 / 100 / 12
+        assert abs(annuity_factor(3.45, 360) - r * (1 + r) ** 360 / ((1 + r) ** 360 - 1)) < 1e-15
+        assert annuity_factor(0, 12) == 1 / 12
+
+    def test_array_lookup(self):
+        rates = np.array([[3.45, 2.85], [3.45, 0.0]])
+        terms = np.array([[360, 240], [360, 12]])
+        factors = annuity_factor(rates, terms)
+        assert factors.shape == (2, 2)
+        for idx in np.ndindex(2, 2):
+            assert factors[idx] == annuity_factor(float(rates[idx]), int(terms[idx]))
+
 
 class TestScheduleGeneration:
     """还款计划生成测试"""
@@ -127,3 +156,143 @@ class TestIRR:
         irr = calc_irr(1_000_000, sch)
         # IRR 应在名义利率附近
         assert 4.5 < irr < 5.5
+
+    def test_irr_matches_brentq_reference(self):
+        sch = generate_schedule(
+            "test", 1_000_000, 3.45, 360,
+            RepaymentMethod.EQUAL_PRINCIPAL.value,
+            date(2024, 1, 1),
+        )
+        cash_flows = [-1_000_000] + sch["monthly_payment"].tolist()
+        monthly = optimize.brentq(
+            lambda r: sum(cf / (1 + r) ** i for i, cf in enumerate(cash_flows)), -0.5, 1.0,
+        )
+        assert calc_irr(1_000_000, sch) == round(((1 + monthly) ** 12 - 1) * 100, 4)
+
+    def test_irr_memoized_by_cash_flows(self):
+        sch = generate_schedule(
+            "test", 800_000, 4.1, 240,
+            RepaymentMethod.EQUAL_INSTALLMENT.value,
+            date(2024, 1, 1),
+        )
+        _cached_monthly_irr.cache_clear()
+        first = calc_irr(800_000, sch)
+        assert calc_irr(800_000, sch.copy()) == first
+        assert _cached_monthly_irr.cache_info().hits == 1
+
+    def test_no_solution_returns_zero(self):
+        sch = generate_schedule(
+            "test", 100_000, 4.1, 12,
+            RepaymentMethod.EQUAL_INSTALLMENT.value,
+            date(2024, 1, 1),
+        )
+        assert calc_irr(100, sch) == 0.0
+        assert calc_irr(100_000, sch.iloc[:0]) == 0.0
+
+    def test_remaining_irr_curve_matches_per_period(self):
+        sch = generate_schedule(
+            "test", 600_000, 3.45, 120,
+            RepaymentMethod.EQUAL_PRINCIPAL.value,
+            date(2024, 1, 1),
+        )
+        curve = calc_remaining_irr_curve(sch)
+        assert curve["period"].tolist() == sch["period"].tolist()
+        for t in (0, 30, 119):
+            opening = sch.iloc[t]["remaining_principal"] + sch.iloc[t]["principal"]
+            assert curve.iloc[t]["remaining_irr"] == pytest.approx(
+                calc_remaining_irr(opening, sch.iloc[t:]), abs=1e-4,
+            )
+
+    def test_remaining_irr_curve_with_prepayment(self):
+        start = date(2024, 1, 15)
+        sch = generate_schedule("test", 1_000_000, 3.45, 360, RepaymentMethod.EQUAL_INSTALLMENT.value, start)
+        sch, _ = apply_prepayment(
+            "test", sch, 25, 200_000, PrepaymentMethod.REDUCE_PAYMENT.value,
+            3.45, RepaymentMethod.EQUAL_INSTALLMENT.value, start, 15,
+        )
+        curve = calc_remaining_irr_curve(sch)
+        for t in (0, 12, 23, 24, 25, 200, len(sch) - 1):
+            opening = sch.iloc[t]["remaining_principal"] + sch.iloc[t]["principal"]
+            assert curve.iloc[t]["remaining_irr"] == pytest.approx(
+                calc_remaining_irr(opening, sch.iloc[t:]), abs=1e-4,
+            )
+        # 提前还款之前的期次，后缀不含提前还款的那笔钱，剩余年化率低于执行利率
+        assert curve.iloc[0]["remaining_irr"] < curve.iloc[30]["remaining_irr"]
+
+    def test_batch_matches_scalar(self):
+        schedules = [
+            generate_schedule("t", p, rate, term, method, date(2024, 1, 1))
+            for p, rate, term, method in [
+                (1_000_000, 3.45, 360, RepaymentMethod.EQUAL_INSTALLMENT.value),
+                (500_000, 2.85, 240, RepaymentMethod.EQUAL_PRINCIPAL.value),
+                (300_000, 0.0, 120, RepaymentMethod.EQUAL_INSTALLMENT.value),
+            ]
+        ]
+        payments = np.zeros((3, 360))
+        for i, sch in enumerate(schedules):
+            payments[i, :len(sch)] = sch["monthly_payment"]
+        result = calc_irr_batch([1_000_000, 500_000, 300_000], payments)
+        expected = [calc_irr(p, sch) for p, sch in zip([1_000_000, 500_000, 300_000], schedules)]
+        np.testing.assert_allclose(result, expected, atol=1e-4)
+
+
+class TestVectorizedSchedule:
+    """向量化还款计划核心测试"""
+
+    @staticmethod
+    def _reference_schedule(principal, annual_rate, term_months, repayment_method):
+        """逐期循环的参考实现"""
+        r = annual_rate / 100 / 12
+        remaining = principal
+        if repayment_method == RepaymentMethod.EQUAL_INSTALLMENT.value:
+            monthly = principal * r * (1 + r) ** term_months / ((1 + r) ** term_months - 1)
+        base = principal / term_months
+        rows = []
+        for i in range(term_months):
+            interest = remaining * r
+            if repayment_method == RepaymentMethod.EQUAL_INSTALLMENT.value:
+                prin = monthly - interest
+                payment = monthly
+            else:
+                prin = base
+                payment = prin + interest
+            if i == term_months - 1:
+                prin = remaining
+                interest = payment - prin if repayment_method == RepaymentMethod.EQUAL_INSTALLMENT.value else remaining * r
+                payment = prin + interest
+            remaining -= prin
+            if remaining < 0.005:
+                remaining = 0.0
+            rows.append((payment, prin, interest, remaining))
+        return rows
+
+    @pytest.mark.parametrize("method", [
+        RepaymentMethod.EQUAL_INSTALLMENT.value,
+        RepaymentMethod.EQUAL_PRINCIPAL.value,
+    ])
+    def test_matches_reference_loop(self, method):
+        sch = generate_schedule("test", 800000, 4.1, 240, method, date(2024, 1, 1))
+        expected = self._reference_schedule(800000, 4.1, 240, method)
+        for (_, row), (payment, prin, interest, remaining) in zip(sch.iterrows(), expected):
+            assert row["monthly_payment"] == pytest.approx(payment, abs=1e-6)
+            assert row["principal"] == pytest.approx(prin, abs=1e-6)
+            assert row["interest"] == pytest.approx(interest, abs=1e-6)
+            assert row["remaining_principal"] == pytest.approx(remaining, abs=1e-6)
+
+    def test_due_dates_clamped_to_month_end(self):
+        sch = generate_schedule(
+            "test", 100000, 3.0, 3,
+            RepaymentMethod.EQUAL_INSTALLMENT.value,
+            date(2024, 1, 31), 31,
+        )
+        assert sch["due_date"].tolist() == ["2024-02-29", "2024-03-31", "2024-04-30"]
+
+    def test_fixed_base_principal(self):
+        """等额本金指定每期本金时，最后一期吸收尾差"""
+        sch = generate_schedule(
+            "test", 10500, 3.0, 3,
+            RepaymentMethod.EQUAL_PRINCIPAL.value,
+            date(2024, 1, 1), base_principal=4000,
+        )
+        assert sch["principal"].tolist() == [4000, 4000, 2500]
+        assert sch.iloc[-1]["remaining_principal"] == 0.0
@@ -0,0 +1,90 @@
+"""方案对比测试"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from datetime import date
+import numpy as np
+import pandas as pd
+import pytest
+from core.calculator import generate_schedule, generate_combined_schedule, calc_irr
+from core.comparison import (
+    compare_plans,
+    candidate_grid,
+    evaluate_candidates,
+    rank_plans,
+    pareto_front,
+    METRIC_COLUMNS,
+)
+from config.constants import RepaymentMethod
+
+
+class TestComparePlans:
+    def test_metrics_match_schedule(self):
+        plans = [
+            {"plan_id": "a", "plan_name": "A", "loan_type": "commercial", "total_amount": 1_000_000,
+             "term_months": 360, "repayment_method": RepaymentMethod.EQUAL_INSTALLMENT.value},
+            {"plan_id": "b", "plan_name": "B", "loan_type": "commercial", "total_amount": 600_000,
+             "term_months": 240, "repayment_method": RepaymentMethod.EQUAL_PRINCIPAL.value},
+        ]
+        schedules = {
+            p["plan_id"]: generate_schedule(
+                p["plan_id"], p["total_amount"], 3.45, p["term_months"], p["repayment_method"], date(2024, 1, 1),
+            )
+            for p in plans
+        }
+        comp = compare_plans(plans, schedules)
+        assert comp["方案名称"].tolist() == ["A", "B"]
+        for row, p in zip(comp.to_dict("records"), plans):
+            sch = schedules[p["plan_id"]]
+            assert row["首月月供"] == round(float(sch.iloc[0]["monthly_payment"]), 2)
+            assert row["末月月供"] == round(float(sch.iloc[-1]["monthly_payment"]), 2)
+            assert row["总利息"] == round(float(sch["interest"].sum()), 2)
+            assert row["真实年化率(%)"] == pytest.approx(calc_irr(p["total_amount"], sch), abs=1e-4)
+
+    def test_skips_empty_schedules(self):
+        plans = [{"plan_id": "x", "plan_name": "X", "loan_type": "commercial", "total_amount": 1,
+                  "term_months": 1, "repayment_method": RepaymentMethod.EQUAL_INSTALLMENT.value}]
+        assert compare_plans(plans, {"x": pd.DataFrame()}).empty
+
+
+class TestCandidateSearch:
+    @pytest.fixture
+    def results(self):
+        candidates = candidate_grid(1_500_000, np.arange(0, 1_200_001, 200_000), [120, 240, 360])
+        return evaluate_candidates(candidates, 3.45, 2.85)
+
+    def test_grid_shape(self, results):
+        assert len(results) == 7 * 3 * 2
+        assert (results["商贷金额"] + results["公积金金额"] == 1_500_000).all()
+        assert set(METRIC_COLUMNS) <= set(results.columns)
+
+    def test_matches_combined_schedule(self, results):
+        for i in (0, 17, 41):
+            row = results.iloc[i]
+            sch = generate_combined_schedule(
+                "t", row["商贷金额"], row["公积金金额"], 3.45, 2.85,
+                int(row["贷款期限(月)"]), row["还款方式"], date(2024, 1, 1),
+            )
+            assert row["总还款额"] == pytest.approx(sch["monthly_payment"].sum(), abs=1)
+            assert row["总利息"] == pytest.approx(sch["interest"].sum(), abs=1)
+            assert row["最高月供"] == pytest.approx(sch["monthly_payment"].max(), abs=0.01)
+
+    def test_rank_plans(self, results):
+        top = rank_plans(results, "总利息", k=5)
+        assert len(top) == 5
+        assert top["总利息"].tolist() == sorted(results["总利息"])[:5]
+        assert rank_plans(results, "总利息", k=1, ascending=False)["总利息"].iloc[0] == results["总利息"].max()
+
+    def test_pareto_front_non_dominated(self, results):
+        front = pareto_front(results, {"最高月供": "min", "总利息": "min"})
+        assert 0 < len(front) < len(results)
+        values = results[["最高月供", "总利息"]].to_numpy()
+        for a, b in front[["最高月供", "总利息"]].to_numpy():
+            dominated = (values[:, 0] <= a) & (values[:, 1] <= b) & ((values[:, 0] < a) | (values[:, 1] < b))
+            assert not dominated.any()
+        # 不在前沿上的方案都被某个前沿方案支配
+        rest = results.drop(front.index)[["最高月供", "总利息"]].to_numpy()
+        fv = front[["最高月供", "总利息"]].to_numpy()
+        for a, b in rest:
+            assert ((fv[:, 0] <= a) & (fv[:, 1] <= b)).any()
@@ -0,0 +1,163 @@
+"""数据存储并发读写测试：跨进程写锁、乐观版本检查、读快照"""
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from data_manager import excel_handler, journal, locking
+from data_manager.excel_handler import (
+    init_excel, save_plan, get_all_plans, get_config, set_config, write_sheet, save_prepayment,
+    read_sheet, read_snapshot, transaction, compact_journal, ConcurrentModificationError,
+)
+from data_manager.locking import file_lock, lock_path, LockTimeoutError
+from config.constants import SHEET_LOAN_PLANS
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+_WRITER = """
+import sys
+from pathlib import Path
+sys.path.insert(0, sys.argv[1])
+from data_manager.excel_handler import save_plan
+for i in range(3):
+    save_plan({"plan_id": f"{sys.argv[3]}-{i}", "plan_name": sys.argv[3]}, Path(sys.argv[2]))
+"""
+
+
+@pytest.fixture
+def temp_excel(tmp_path):
+    filepath = tmp_path / "test_data.xlsx"
+    init_excel(filepath)
+    return filepath
+
+
+def _in_thread(func):
+    t = threading.Thread(target=func)
+    t.start()
+    t.join()
+
+
+class TestFileLock:
+    def test_mutual_exclusion(self, tmp_path):
+        path = lock_path(tmp_path / "data.xlsx")
+        errors = []
+
+        def contend():
+            try:
+                with file_lock(path, timeout=0.05):
+                    pass
+            except LockTimeoutError as e:
+                errors.append(e)
+
+        with file_lock(path):
+            _in_thread(contend)
+        assert len(errors) == 1
+        # 释放后可以再次获得
+        _in_thread(contend)
+        assert len(errors) == 1
+
+
+class TestConcurrentWrites:
+    def test_processes_do_not_lose_updates(self, temp_excel):
+        procs = [
+            subprocess.Popen([sys.executable, "-c", _WRITER, str(PROJECT_ROOT), str(temp_excel), f"w{n}"])
+            for n in range(4)
+        ]
+        assert all(p.wait(timeout=120) == 0 for p in procs)
+        ids = set(get_all_plans(temp_excel)["plan_id"])
+        assert ids == {f"w{n}-{i}" for n in range(4) for i in range(3)}
+
+    def test_threads_do_not_lose_updates(self, temp_excel):
+        threads = [
+            threading.Thread(target=set_config, args=(f"key{n}", f"v{n}"), kwargs={"filepath": temp_excel})
+            for n in range(6)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert [get_config(f"key{n}", temp_excel) for n in range(6)] == [f"v{n}" for n in range(6)]
+
+    def test_conflict_detected_on_commit(self, temp_excel):
+        with pytest.raises(ConcurrentModificationError):
+            with transaction(temp_excel):
+                df = read_sheet(SHEET_LOAN_PLANS, temp_excel)
+                _in_thread(lambda: save_plan({"plan_id": "other", "plan_name": "B"}, temp_excel))
+                df.loc[len(df)] = {"plan_id": "mine", "plan_name": "A"}
+                write_sheet(df, SHEET_LOAN_PLANS, temp_excel)
+        # 冲突的事务整体放弃，另一会话的写入保留
+        assert get_all_plans(temp_excel)["plan_id"].tolist() == ["other"]
+
+    def test_read_after_other_commit_does_not_conflict(self, temp_excel):
+        with transaction(temp_excel):
+            _in_thread(lambda: save_plan({"plan_id": "other", "plan_name": "B"}, temp_excel))
+            write_sheet(get_all_plans(temp_excel).iloc[0:0], SHEET_LOAN_PLANS, temp_excel)
+        assert get_all_plans(temp_excel).empty
+
+    def test_locked_retry_and_compaction_do_not_deadlock(self, temp_excel, monkeypatch):
+        # 直接走最后一次（持写锁）的读-改-写，在读取时让后台压缩并发开始
+        monkeypatch.setattr(excel_handler, "WRITE_RETRIES", 1)
+        monkeypatch.setattr(locking, "LOCK_TIMEOUT", 2.0)
+        save_prepayment({"prepayment_id": "pp0", "plan_id": "A", "amount": 1.0}, temp_excel)
+        entered, errors = threading.Event(), []
+        original = excel_handler.read_sheet
+
+        def slow_read(*args, **kwargs):
+            entered.set()
+            time.sleep(0.2)
+            return original(*args, **kwargs)
+
+        def run(func):
+            try:
+                func()
+            except Exception as e:
+                errors.append(e)
+
+        monkeypatch.setattr(excel_handler, "read_sheet", slow_read)
+        writer = threading.Thread(target=run, args=(lambda: set_config("k", "v", filepath=temp_excel),))
+        compactor = threading.Thread(target=run, args=(lambda: compact_journal(temp_excel),))
+        start = time.monotonic()
+        writer.start()
+        entered.wait()
+        compactor.start()
+        writer.join()
+        compactor.join()
+        monkeypatch.setattr(excel_handler, "read_sheet", original)
+
+        assert errors == []
+        assert time.monotonic() - start < 1.5
+        assert get_config("k", temp_excel) == "v"
+        assert not journal.journal_path(temp_excel).exists()
+
+
+class TestReadSnapshot:
+    def test_reads_are_pinned(self, temp_excel):
+        save_plan({"plan_id": "A", "plan_name": "A"}, temp_excel)
+        with read_snapshot(temp_excel):
+            before = get_all_plans(temp_excel)["plan_id"].tolist()
+            _in_thread(lambda: save_plan({"plan_id": "B", "plan_name": "B"}, temp_excel))
+            _in_thread(lambda: set_config("lpr_5y", "3.0", filepath=temp_excel))
+            assert get_all_plans(temp_excel)["plan_id"].tolist() == before == ["A"]
+            assert get_config("lpr_5y", temp_excel) != "3.0"
+        assert get_all_plans(temp_excel)["plan_id"].tolist() == ["A", "B"]
+        assert get_config("lpr_5y", temp_excel) == "3.0"
+
+    def test_snapshot_does_not_block_writers(self, temp_excel):
+        with read_snapshot(temp_excel):
+            get_all_plans(temp_excel)
+            done = []
+            _in_thread(lambda: done.append(save_plan({"plan_id": "A", "plan_name": "A"}, temp_excel)))
+            assert done == [None]
+
+    def test_sqlite_snapshot(self, tmp_path):
+        db = tmp_path / "data.db"
+        save_plan({"plan_id": "A", "plan_name": "A"}, db)
+        with read_snapshot(db):
+            assert get_all_plans(db)["plan_id"].tolist() == ["A"]
+            _in_thread(lambda: save_plan({"plan_id": "B", "plan_name": "B"}, db))
+            assert get_all_plans(db)["plan_id"].tolist() == ["A"]
+        assert get_all_plans(db)["plan_id"].tolist() == ["A", "B"]
@@ -0,0 +1,43 @@
+"""日期工具测试"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from datetime import date
+import numpy as np
+import pytest
+from utils.date_utils import get_due_date, format_dates, get_due_dates, periods_on_or_after
+
+
+class TestDueDates:
+    @pytest.mark.parametrize("start,day", [
+        (date(2024, 1, 31), 31),
+        (date(2023, 11, 15), 28),
+        (date(2024, 6, 1), 1),
+    ])
+    def test_matches_scalar_due_date(self, start, day):
+        due = get_due_dates(start, 36, day)
+        assert due.dtype == np.dtype("datetime64[D]")
+        expected = [np.datetime64(get_due_date(start, i + 1, day)) for i in range(36)]
+        assert due.tolist() == [d.astype(object) for d in expected]
+
+    def test_cached_and_read_only(self):
+        a = get_due_dates(date(2024, 1, 5), 12, 10)
+        b = get_due_dates(date(2024, 1, 20), 12, 10)
+        assert a is b
+        assert not a.flags.writeable
+
+    def test_format_dates(self):
+        assert format_dates(get_due_dates(date(2024, 1, 5), 2, 10)).tolist() == ["2024-02-10", "2024-03-10"]
+
+
+class TestPeriodsOnOrAfter:
+    def test_maps_dates_to_periods(self):
+        periods = periods_on_or_after(
+            date(2020, 1, 31), 12, 31,
+            [date(2020, 2, 29), date(2020, 3, 1), "2021-01-31", "2021-02-01", date(2019, 6, 1)],
+        )
+        assert periods.tolist() == [1, 2, 12, 0, 1]
+
+    def test_scalar_date(self):
+        assert int(periods_on_or_after(date(2024, 1, 1), 360, 15, date(2024, 3, 16))) == 3
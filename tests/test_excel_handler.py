@@ -5,6 +5,8 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import os
 import tempfile
+import threading
+import time
 import pytest
 import pandas as pd
 from datetime import date
@@ -13,8 +15,10 @@ from data_manager.excel_handler import (
     init_excel, read_sheet, write_sheet,
     save_plan, get_all_plans, get_plan_by_id, delete_plan,
     save_repayment_schedule, get_repayment_schedule,
-    get_config, set_config, get_all_config,
+    get_config, set_config, get_all_config, invalidate_cache, transaction,
 )
+import data_manager.excel_handler as excel_handler
+from data_manager import backup
 from config.constants import SHEET_LOAN_PLANS, SHEET_CONFIG
 
 
@@ -134,3 +138,148 @@ class TestConfig:
         assert "provident_rate" in keys
         assert "inflation_rate" in keys
         assert "provident_limit" in keys
+
+
+class TestWorkbookCache:
+    @pytest.fixture
+    def parse_count(self, monkeypatch):
+        calls = []
+        original = excel_handler.pd.read_excel
+
+        def counting(*args, **kwargs):
+            calls.append(kwargs.get("sheet_name"))
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(excel_handler.pd, "read_excel", counting)
+        return calls
+
+    def test_single_parse_for_many_reads(self, temp_excel, parse_count):
+        invalidate_cache()
+        for _ in range(5):
+            get_config("lpr_5y", temp_excel)
+            get_all_plans(temp_excel)
+        assert len(parse_count) == 1
+
+    def test_returned_frames_are_copies(self, temp_excel):
+        df = get_all_config(temp_excel)
+        df.loc[0, "value"] = -1.0
+        assert get_all_config(temp_excel).loc[0, "value"] != -1.0
+
+    def test_own_write_invalidates(self, temp_excel, parse_count):
+        get_config("lpr_5y", temp_excel)
+        set_config("lpr_5y", "3.10", "", temp_excel)
+        assert float(get_config("lpr_5y", temp_excel)) == 3.1
+        get_config("lpr_5y", temp_excel)
+        assert len(parse_count) == 2
+
+    def test_external_change_detected(self, temp_excel):
+        get_config("lpr_5y", temp_excel)
+        df = pd.read_excel(temp_excel, sheet_name=None, engine="openpyxl")
+        df[SHEET_CONFIG].loc[df[SHEET_CONFIG]["key"] == "lpr_5y", "value"] = 9.99
+        with pd.ExcelWriter(temp_excel, engine="openpyxl") as writer:
+            for name, sheet in df.items():
+                sheet.to_excel(writer, sheet_name=name, index=False)
+        assert float(get_config("lpr_5y", temp_excel)) == 9.99
+
+    def test_touch_without_content_change_skips_parse(self, temp_excel, parse_count):
+        get_config("lpr_5y", temp_excel)
+        st = temp_excel.stat()
+        os.utime(temp_excel, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        get_config("lpr_5y", temp_excel)
+        assert len(parse_count) == 1
+
+    def test_parse_outside_cache_lock(self, tmp_path, monkeypatch):
+        # 一个工作簿解析期间，其他已缓存的工作簿照常命中，并发读同一工作簿只解析一次
+        cached, slow = tmp_path / "a.xlsx", tmp_path / "b.xlsx"
+        init_excel(cached)
+        init_excel(slow)
+        invalidate_cache()
+        get_config("lpr_5y", cached)
+        entered, release, calls = threading.Event(), threading.Event(), []
+        original = excel_handler.pd.read_excel
+
+        def blocking(*args, **kwargs):
+            calls.append(1)
+            entered.set()
+            release.wait(5)
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(excel_handler.pd, "read_excel", blocking)
+        readers = [threading.Thread(target=get_all_plans, args=(slow,)) for _ in range(3)]
+        for t in readers:
+            t.start()
+        assert entered.wait(5)
+        try:
+            start = time.monotonic()
+            assert get_config("lpr_5y", cached) is not None
+            assert time.monotonic() - start < 1.0
+        finally:
+            release.set()
+            for t in readers:
+                t.join()
+        assert len(calls) == 1
+
+
+class TestTransaction:
+    def test_commits_once_with_single_backup(self, temp_excel, monkeypatch):
+        saves = []
+        original = excel_handler._commit
+        monkeypatch.setattr(excel_handler, "_commit", lambda *a: saves.append(a) or original(*a))
+        with transaction(temp_excel):
+            set_config("lpr_5y", "3.10", "", temp_excel)
+            set_config("provident_rate", "2.60", "", temp_excel)
+            # 事务内读到未提交的写入
+            assert float(get_config("lpr_5y", temp_excel)) == 3.1
+        assert len(saves) == 1
+        assert float(get_config("provident_rate", temp_excel)) == 2.6
+        # 提交前的基线快照 + 提交后的一次快照
+        backup.flush_backups()
+        assert len(backup.list_snapshots(temp_excel)) == 2
+        assert not list(temp_excel.parent.glob("*.tmp"))
+
+    def test_rollback_on_error(self, temp_excel):
+        before = get_config("lpr_5y", temp_excel)
+        with pytest.raises(RuntimeError):
+            with transaction(temp_excel):
+                set_config("lpr_5y", "9.99", "", temp_excel)
+                raise RuntimeError
+        assert get_config("lpr_5y", temp_excel) == before
+
+    def test_nested_joins_outer(self, temp_excel):
+        with transaction(temp_excel):
+            with transaction(temp_excel):
+                set_config("lpr_5y", "3.20", "", temp_excel)
+            assert float(pd.read_excel(temp_excel, sheet_name=SHEET_CONFIG)["value"].iloc[0]) != 3.2
+        assert float(get_config("lpr_5y", temp_excel)) == 3.2
+
+    def test_preserves_sheet_order(self, temp_excel):
+        order = pd.ExcelFile(temp_excel, engine="openpyxl").sheet_names
+        set_config("lpr_5y", "3.30", "", temp_excel)
+        assert pd.ExcelFile(temp_excel, engine="openpyxl").sheet_names == order
+
+    def test_commit_keeps_to_excel_formats(self, temp_excel, tmp_path):
+        # 提交写出的单元格与直接 to_excel 写出的一致：dtype、表头样式、日期格式
+        from openpyxl import load_workbook
+
+        df = pd.DataFrame({
+            "prepayment_id": ["p1", "p2"],
+            "prepayment_date": pd.to_datetime(["2024-03-15", "2025-01-02"]),
+            "amount": [100000.5, 2000.0],
+            "prepayment_period": [12, 24],
+        })
+        with transaction(temp_excel):
+            write_sheet(df, "extra", temp_excel)
+            set_config("lpr_5y", "3.40", "", temp_excel)
+        reference = tmp_path / "reference.xlsx"
+        with pd.ExcelWriter(reference, engine="openpyxl") as writer:
+            df.to_excel(writer, sheet_name="extra", index=False)
+
+        invalidate_cache()
+        back = read_sheet("extra", temp_excel)
+        assert back.dtypes.to_dict() == df.dtypes.to_dict()
+        pd.testing.assert_frame_equal(back, df)
+        got, want = load_workbook(temp_excel)["extra"], load_workbook(reference)["extra"]
+        for row_got, row_want in zip(got.iter_rows(), want.iter_rows()):
+            for a, b in zip(row_got, row_want):
+                assert (a.value, a.number_format, a.font.b) == (b.value, b.number_format, b.font.b)
+        assert load_workbook(temp_excel)[SHEET_CONFIG]["A1"].font.b == want["A1"].font.b
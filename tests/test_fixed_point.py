@@ -0,0 +1,88 @@
+"""整数分定点计算测试"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from datetime import date
+import numpy as np
+import pytest
+from config import settings
+from config.constants import MoneyMode, RepaymentMethod, RoundingRule
+from core.batch import generate_schedules_batch
+from core.calculator import build_schedule, generate_combined_schedule, generate_schedule
+from core.fixed_point import amortize_fen, div_round, to_fen
+
+
+class TestRounding:
+    def test_div_round_rules(self):
+        num = np.array([25, 35, 24, 26])
+        assert div_round(num, 10, RoundingRule.HALF_UP.value).tolist() == [3, 4, 2, 3]
+        assert div_round(num, 10, RoundingRule.HALF_EVEN.value).tolist() == [2, 4, 2, 3]
+        assert div_round(num, 10, RoundingRule.DOWN.value).tolist() == [2, 3, 2, 2]
+        # Python int 与数组结果一致
+        assert div_round(25, 10, RoundingRule.HALF_EVEN.value) == 2
+
+    def test_to_fen_half_up(self):
+        assert to_fen(1234.565) == 123457
+        assert to_fen(0.005) == 1
+        assert to_fen([1.004, 2.5]).tolist() == [100, 250]
+
+
+class TestFenSchedule:
+    @pytest.mark.parametrize("method", [m.value for m in RepaymentMethod])
+    def test_exact_totals(self, method):
+        payment, prin, interest, remaining = amortize_fen(100_000_000, 3.45, 360, method)
+        assert prin.dtype == np.int64
+        assert prin.sum() == 100_000_000
+        assert remaining[-1] == 0
+        assert (payment == prin + interest).all()
+
+    def test_equal_installment_last_period_absorbs_remainder(self):
+        payment, prin, _, _ = amortize_fen(
+            100_000_000, 3.45, 360, RepaymentMethod.EQUAL_INSTALLMENT.value,
+        )
+        assert len(set(payment[:-1].tolist())) == 1
+        assert payment[-1] != payment[0]
+
+    def test_close_to_float_schedule(self):
+        args = ("t", 1_000_000, 3.45, 360, RepaymentMethod.EQUAL_INSTALLMENT.value, date(2024, 1, 1))
+        fen = generate_schedule(*args, money_mode=MoneyMode.FEN.value)
+        flt = generate_schedule(*args, money_mode=MoneyMode.FLOAT.value)
+        cents = fen["interest"].to_numpy() * 100
+        np.testing.assert_allclose(cents, np.rint(cents))
+        assert abs(fen["interest"].sum() - flt["interest"].sum()) < 5
+
+    def test_settings_switch(self, monkeypatch):
+        monkeypatch.setattr(settings, "MONEY_MODE", MoneyMode.FEN.value)
+        sch = build_schedule("t", 1_000_000, 3.45, 12, RepaymentMethod.EQUAL_PRINCIPAL.value, date(2024, 1, 1))
+        assert sch.to_frame(fen=True)["principal"].tolist()[:2] == [8_333_333, 8_333_333]
+        assert sch.to_frame(fen=True)["principal"].sum() == 100_000_000
+
+    def test_combined_sums_in_fen(self):
+        df = generate_combined_schedule(
+            "t", 600_000.01, 400_000.02, 3.45, 2.85, 360,
+            RepaymentMethod.EQUAL_INSTALLMENT.value, date(2024, 1, 1),
+            money_mode=MoneyMode.FEN.value,
+        )
+        assert to_fen(df["principal"].to_numpy()).sum() == 100_000_003
+
+    def test_batch_matches_single(self):
+        principals = [1_000_000, 800_000.55, 500_000]
+        rates = [3.45, 2.85, 4.1]
+        terms = [360, 240, 12]
+        methods = [
+            RepaymentMethod.EQUAL_INSTALLMENT.value,
+            RepaymentMethod.EQUAL_PRINCIPAL.value,
+            RepaymentMethod.EQUAL_INSTALLMENT.value,
+        ]
+        batch = generate_schedules_batch(
+            principals, rates, terms, methods, money_mode=MoneyMode.FEN.value,
+        )
+        assert batch.fen and batch["interest"].dtype == np.int64
+        for i in range(3):
+            payment, prin, interest, remaining = amortize_fen(
+                to_fen(principals[i]), rates[i], terms[i], methods[i],
+            )
+            assert (batch["principal"][i, :terms[i]] == prin).all()
+            assert (batch["interest"][i, :terms[i]] == interest).all()
+            assert (batch["remaining_principal"][i, :terms[i]] == remaining).all()
@@ -0,0 +1,82 @@
+"""通胀调整测试"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from datetime import date
+
+import numpy as np
+import pytest
+from core.calculator import generate_schedule
+from core.inflation import (
+    adjust_for_inflation, calc_real_cost, calc_real_cost_scenarios, sample_inflation_paths,
+)
+from config.constants import RepaymentMethod
+
+
+def _schedule(method=RepaymentMethod.EQUAL_INSTALLMENT.value, term=360):
+    return generate_schedule("t", 1_000_000, 3.45, term, method, date(2024, 1, 1))
+
+
+def test_adjust_for_inflation_discount_factors():
+    df = adjust_for_inflation(_schedule(), 2.4)
+    expected = [(1 + 0.002) ** -p for p in df["period"]]
+    np.testing.assert_allclose(df["discount_factor"], np.round(expected, 6))
+    assert df["real_monthly_payment"].iloc[0] == round(df["monthly_payment"].iloc[0] / 1.002, 2)
+
+
+def test_real_cost_pv_matches_loop():
+    sch = _schedule(RepaymentMethod.EQUAL_PRINCIPAL.value)
+    payments = sch["monthly_payment"].tolist()
+    real = calc_real_cost(sum(payments), sch["interest"].sum(), 360, 3.0, 3.45, payments)
+    expected = sum(p / (1 + 0.0025) ** (i + 1) for i, p in enumerate(payments))
+    assert real["real_total_payment_pv"] == round(expected, 2)
+
+
+def test_constant_paths_reduce_to_deterministic():
+    sch = _schedule()
+    monthly = 0.025 / 12
+    paths = np.full((3, 360), monthly)
+    sc = calc_real_cost_scenarios([sch["monthly_payment"]], 3.45, paths)
+    expected = sch["monthly_payment"].to_numpy() @ (1 + monthly) ** -np.arange(1, 361)
+    np.testing.assert_allclose(sc.real_total_payment, expected)
+    np.testing.assert_allclose(sc.real_interest_rate, (1.0345 / 1.025 - 1) * 100)
+
+
+def test_zero_volatility_scenarios_match_calc_real_cost():
+    sch = _schedule(RepaymentMethod.EQUAL_PRINCIPAL.value)
+    payments = sch["monthly_payment"].tolist()
+    real = calc_real_cost(sum(payments), sch["interest"].sum(), 360, 2.5, 3.45, payments)
+    paths = sample_inflation_paths(4, 360, 2.5, annual_volatility=0.0, seed=0)
+    np.testing.assert_allclose(paths, 2.5 / 100 / 12)
+    sc = calc_real_cost_scenarios([payments], 3.45, paths)
+    np.testing.assert_allclose(sc.real_total_payment.round(2), real["real_total_payment_pv"])
+    np.testing.assert_allclose(sc.real_interest_rate.round(2), real["real_interest_rate"])
+
+
+def test_scenarios_for_plans_of_different_terms():
+    paths = sample_inflation_paths(500, 360, 2.5, 1.0, seed=1)
+    assert paths.shape == (500, 360)
+    sc = calc_real_cost_scenarios(
+        [_schedule()["monthly_payment"], _schedule(term=120)["monthly_payment"]],
+        [3.45, 3.45], paths, names=["30年", "10年"],
+    )
+    assert sc.real_total_payment.shape == (2, 500)
+    bands = sc.bands()
+    assert list(bands.index) == ["30年", "10年"]
+    assert (bands["real_total_payment_p5"] <= bands["real_total_payment_p95"]).all()
+    assert (bands["real_total_payment_p95"] < bands["nominal_total_payment"]).all()
+
+
+def test_padded_matrix_uses_each_plan_term():
+    monthly = 0.025 / 12
+    paths = np.full((2, 360), monthly)
+    short = _schedule(term=120)["monthly_payment"].to_numpy()
+    padded = np.zeros((1, 360))
+    padded[0, :120] = short
+    sc = calc_real_cost_scenarios(padded, 3.45, paths)
+    ragged = calc_real_cost_scenarios([short], 3.45, paths[:, :120])
+    np.testing.assert_allclose(sc.real_total_payment, ragged.real_total_payment)
+    np.testing.assert_allclose(sc.real_interest_rate, (1.0345 / 1.025 - 1) * 100)
+    with pytest.raises(ValueError, match="短于"):
+        calc_real_cost_scenarios([short], 3.45, paths[:, :60])
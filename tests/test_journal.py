@@ -0,0 +1,112 @@
+"""Excel 事件日志测试"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+import pandas as pd
+
+from data_manager.excel_handler import (
+    init_excel, save_prepayment, get_prepayments, update_prepayment,
+    save_rate_adjustment, get_rate_adjustments, delete_plan, compact_journal, transaction,
+)
+from data_manager import excel_handler, journal
+from config.constants import SHEET_PREPAYMENTS, SHEET_RATE_ADJUSTMENTS
+
+
+@pytest.fixture
+def temp_excel(tmp_path):
+    filepath = tmp_path / "test_data.xlsx"
+    init_excel(filepath)
+    return filepath
+
+
+def _prepayment(i, plan_id="A"):
+    return {"prepayment_id": f"pp{i}", "plan_id": plan_id, "prepayment_date": "2025-01-01", "amount": 10000.0 * (i + 1)}
+
+
+class TestJournal:
+    def test_append_does_not_rewrite_workbook(self, temp_excel):
+        mtime = temp_excel.stat().st_mtime_ns
+        for i in range(3):
+            save_prepayment(_prepayment(i), temp_excel)
+        save_rate_adjustment({"adjustment_id": "a1", "plan_id": "A", "new_rate": 3.1}, temp_excel)
+        assert temp_excel.stat().st_mtime_ns == mtime
+        assert journal.journal_path(temp_excel).exists()
+        assert get_prepayments("A", temp_excel)["prepayment_id"].tolist() == ["pp0", "pp1", "pp2"]
+        assert get_rate_adjustments("A", temp_excel)["new_rate"].tolist() == [3.1]
+
+    def test_update_is_journaled(self, temp_excel):
+        save_prepayment(_prepayment(0), temp_excel)
+        assert update_prepayment("pp0", {"amount": 123.0}, temp_excel)
+        assert not update_prepayment("missing", {"amount": 1.0}, temp_excel)
+        assert get_prepayments("A", temp_excel).iloc[0]["amount"] == 123.0
+
+    def test_compaction_folds_into_workbook(self, temp_excel):
+        for i in range(3):
+            save_prepayment(_prepayment(i), temp_excel)
+        update_prepayment("pp1", {"amount": 5.0}, temp_excel)
+        compact_journal(temp_excel)
+        assert not journal.journal_path(temp_excel).exists()
+        assert not journal.compacting_path(temp_excel).exists()
+        on_disk = pd.read_excel(temp_excel, sheet_name=SHEET_PREPAYMENTS)
+        assert on_disk["prepayment_id"].tolist() == ["pp0", "pp1", "pp2"]
+        assert on_disk["amount"].tolist() == [10000.0, 5.0, 30000.0]
+
+    def test_replay_after_crash_is_idempotent(self, temp_excel):
+        for i in range(2):
+            save_prepayment(_prepayment(i), temp_excel)
+        journal_file = journal.journal_path(temp_excel)
+        saved = journal_file.read_text(encoding="utf-8")
+        compact_journal(temp_excel)
+        # 模拟保存工作簿后、删除 .compacting 前崩溃
+        journal.compacting_path(temp_excel).write_text(saved, encoding="utf-8")
+        assert get_prepayments("A", temp_excel)["prepayment_id"].tolist() == ["pp0", "pp1"]
+        compact_journal(temp_excel)
+        assert len(pd.read_excel(temp_excel, sheet_name=SHEET_PREPAYMENTS)) == 2
+
+    def test_crash_after_full_sheet_write_does_not_resurrect_rows(self, temp_excel, monkeypatch):
+        save_prepayment(_prepayment(0, "A"), temp_excel)
+        save_prepayment(_prepayment(1, "B"), temp_excel)
+        save_rate_adjustment({"adjustment_id": "a1", "plan_id": "A", "new_rate": 3.1}, temp_excel)
+
+        # 模拟 delete_plan 保存工作簿后、删除 .compacting 前崩溃
+        def crash(filepath):
+            raise OSError("crash")
+        monkeypatch.setattr(journal, "finish_compaction", crash)
+        with pytest.raises(OSError):
+            delete_plan("A", temp_excel)
+        monkeypatch.undo()
+        assert journal.compacting_path(temp_excel).exists()
+        excel_handler.invalidate_cache()
+
+        assert get_prepayments("A", temp_excel).empty
+        assert get_rate_adjustments("A", temp_excel).empty
+        assert get_prepayments("B", temp_excel)["prepayment_id"].tolist() == ["pp1"]
+        # 之后的追加与压缩丢弃遗留的 .compacting，只并入新事件
+        save_prepayment(_prepayment(2, "B"), temp_excel)
+        compact_journal(temp_excel)
+        assert not journal.compacting_path(temp_excel).exists()
+        on_disk = pd.read_excel(temp_excel, sheet_name=SHEET_PREPAYMENTS)
+        assert on_disk["prepayment_id"].tolist() == ["pp1", "pp2"]
+        assert pd.read_excel(temp_excel, sheet_name=SHEET_RATE_ADJUSTMENTS).empty
+
+    def test_torn_last_line_ignored(self, temp_excel):
+        save_prepayment(_prepayment(0), temp_excel)
+        with open(journal.journal_path(temp_excel), "a", encoding="utf-8") as f:
+            f.write('{"sheet": "提前还')
+        assert len(get_prepayments("A", temp_excel)) == 1
+
+    def test_full_sheet_write_supersedes_journal(self, temp_excel):
+        save_prepayment(_prepayment(0, "A"), temp_excel)
+        save_prepayment(_prepayment(1, "B"), temp_excel)
+        delete_plan("A", temp_excel)
+        assert get_prepayments("A", temp_excel).empty
+        assert len(get_prepayments("B", temp_excel)) == 1
+        assert not journal.journal_path(temp_excel).exists()
+
+    def test_transaction_bypasses_journal(self, temp_excel):
+        with transaction(temp_excel):
+            save_prepayment(_prepayment(0), temp_excel)
+        assert not journal.journal_path(temp_excel).exists()
+        assert len(pd.read_excel(temp_excel, sheet_name=SHEET_PREPAYMENTS)) == 1
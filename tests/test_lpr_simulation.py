@@ -0,0 +1,73 @@
+"""LPR 蒙特卡洛模拟测试"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from datetime import date
+
+import numpy as np
+import pytest
+from core.calculator import build_schedule
+from core.lpr_simulation import (
+    MEAN_REVERTING, _repricing_index, simulate_lpr_paths, simulate_schedule_under_lpr,
+)
+from config.constants import RepaymentMethod
+
+
+def _schedule(method=RepaymentMethod.EQUAL_INSTALLMENT.value, rate=3.95):
+    return build_schedule("P1", 1_000_000, rate, 360, method, date(2024, 3, 15), 15)
+
+
+@pytest.mark.parametrize("method", [m.value for m in RepaymentMethod])
+def test_zero_volatility_reproduces_schedule(method):
+    sch = _schedule(method)
+    sim = simulate_schedule_under_lpr(
+        sch, method, 3.45, n_paths=50, from_period=13, volatility=0.0, seed=1, max_workers=1,
+    )
+    assert sim.payments.shape == (50, 348)
+    np.testing.assert_allclose(sim.payments, np.broadcast_to(sch.monthly_payment[12:], (50, 348)), atol=1e-6)
+    assert sim.total_interest == pytest.approx(np.full(50, sch.total("interest", 13)))
+    assert (sim.payoff_period == 360).all()
+
+
+def test_paths_quoted_in_ticks_and_floored():
+    levels = simulate_lpr_paths(1000, 30, 3.45, volatility=0.5, floor=1.0, seed=7)
+    assert levels.shape == (1000, 31)
+    assert (levels >= 1.0).all()
+    np.testing.assert_allclose(levels * 20, np.round(levels * 20), atol=1e-9)
+
+
+def test_rate_changes_only_on_repricing_date():
+    sim = simulate_schedule_under_lpr(
+        _schedule(), RepaymentMethod.EQUAL_INSTALLMENT.value, 3.45,
+        n_paths=200, repricing_month=1, repricing_day=1, seed=3, max_workers=1,
+    )
+    changed = np.flatnonzero((np.diff(sim.rates, axis=1) != 0).any(axis=0)) + 1
+    # 首个还款日 2024-04-15，之后每年 1 月的还款日起执行新利率
+    assert (sim.due_dates[changed].astype("datetime64[M]").astype(np.int64) % 12 == 0).all()
+    assert sim.rates[:, 0] == pytest.approx(np.full(200, 3.95))
+
+
+def test_repricing_day_clamped_to_month_end():
+    due = np.array(["2024-02-29", "2024-03-01", "2025-02-28", "2025-03-02"], dtype="datetime64[D]")
+    # 2 月 30 日重定价即 2 月最后一天，不滚到 3 月
+    assert _repricing_index(due, 2, 30).tolist() == [0, 0, 1, 1]
+
+
+def test_chunking_is_deterministic():
+    kwargs = dict(n_paths=300, seed=11, model=MEAN_REVERTING, long_run_lpr=3.0)
+    a = simulate_schedule_under_lpr(_schedule(), RepaymentMethod.EQUAL_INSTALLMENT.value, 3.45,
+                                    chunk_paths=100, max_workers=1, **kwargs)
+    b = simulate_schedule_under_lpr(_schedule(), RepaymentMethod.EQUAL_INSTALLMENT.value, 3.45,
+                                    chunk_paths=100, max_workers=2, **kwargs)
+    np.testing.assert_array_equal(a.total_interest, b.total_interest)
+
+
+def test_keep_payment_pays_off_early_when_rates_fall():
+    sim = simulate_schedule_under_lpr(
+        _schedule(), RepaymentMethod.EQUAL_INSTALLMENT.value, 3.45,
+        n_paths=200, drift=-0.2, volatility=0.0, keep_payment=True, seed=5, max_workers=1,
+    )
+    assert (sim.payoff_period < 360).all()
+    assert sim.payments[:, 0] == pytest.approx(np.full(200, _schedule().monthly_payment[0]))
+    assert (sim.remaining[:, -1] == 0).all()
@@ -0,0 +1,68 @@
+"""提前还款规划测试"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from datetime import date
+
+import pytest
+from core.planner import plan_prepayments
+from core.schedule_generator import generate_plan_schedules
+from config.constants import PlanObjective
+
+
+def _propose(plan, **kwargs):
+    schedules = generate_plan_schedules(plan)
+    return schedules, plan_prepayments(plan, schedules, date(2024, 1, 15), 15, 1, **kwargs)
+
+
+@pytest.mark.parametrize("loan_type", ["commercial", "combined"])
+def test_events_replay_to_proposed_schedule(loan_type, make_plan):
+    plan = make_plan(loan_type, start_date="2024-01-15")
+    base, proposal = _propose(plan, monthly_surplus=3000, annual_bonus=50_000, initial_cash=20_000)
+    assert proposal.events
+    assert len(proposal.schedules.merged) < len(base.merged)
+    # 建议事件按现有事件重放得到同一计划，可直接保存
+    replayed = generate_plan_schedules(plan, proposal.to_frame())
+    assert len(replayed.merged) == len(proposal.schedules.merged)
+    assert replayed.merged.total("interest") == pytest.approx(proposal.schedules.merged.total("interest"))
+    if loan_type == "combined":
+        events = proposal.to_frame()
+        assert (events["amount_commercial"] + events["amount_provident"]).tolist() == pytest.approx(events["amount"].tolist())
+
+
+def test_cash_constraints_respected(make_plan):
+    plan = make_plan(start_date="2024-01-15")
+    _, proposal = _propose(
+        plan, monthly_surplus=2000, initial_cash=30_000, liquidity_floor=20_000, min_amount=10_000,
+    )
+    events = proposal.to_frame()
+    assert (events["amount"] >= 10_000).all()
+    assert (events["amount"] % 1000 == 0).all()
+    # 任一时点累计还款不超过累计现金减去流动性底线
+    cash = 30_000 + 2000 * events["prepayment_period"] - 20_000
+    assert (events["amount"].cumsum() <= cash + 1e-6).all()
+    assert events["prepayment_period"].iloc[0] == 1
+    assert events["amount"].iloc[0] == 12_000
+
+
+def test_earliest_payoff_objective(make_plan):
+    plan = make_plan("combined", start_date="2024-01-15")
+    _, by_interest = _propose(plan, monthly_surplus=3000, objective=PlanObjective.MAX_INTEREST_SAVED.value)
+    _, by_payoff = _propose(plan, monthly_surplus=3000, objective=PlanObjective.EARLIEST_PAYOFF.value)
+    assert len(by_payoff.schedules.merged) <= len(by_interest.schedules.merged)
+
+
+def test_no_budget_no_events(make_plan):
+    plan = make_plan(start_date="2024-01-15")
+    base, proposal = _propose(plan, monthly_surplus=0, initial_cash=5_000)
+    assert proposal.events == []
+    assert len(proposal.schedules.merged) == len(base.merged)
+
+
+def test_combined_rate_matches_generated_schedule(make_plan):
+    plan = make_plan("combined", start_date="2024-01-15")
+    plan["commercial_rate"] = 3.456
+    _, proposal = _propose(plan, monthly_surplus=3000, annual_bonus=50_000)
+    replayed = generate_plan_schedules(plan, proposal.to_frame())
+    assert proposal.schedules.merged.applied_rate.tolist() == replayed.merged.applied_rate.tolist()
@@ -4,6 +4,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from datetime import date
+import numpy as np
 import pytest
 from core.calculator import generate_schedule
 from core.prepayment import (
@@ -11,6 +12,7 @@ from core.prepayment import (
     calc_reduce_payment,
     calc_interest_saved,
     apply_prepayment,
+    prepayment_grid,
 )
 from config.constants import RepaymentMethod, PrepaymentMethod
 
@@ -85,6 +87,36 @@ class TestInterestSaved:
         assert saved > 0
 
 
+class TestVectorized:
+    @pytest.mark.parametrize("repayment_method", [m.value for m in RepaymentMethod])
+    @pytest.mark.parametrize("method", [m.value for m in PrepaymentMethod])
+    def test_array_matches_scalar(self, repayment_method, method):
+        amounts = np.array([0, 50_000, 200_000, 500_000])
+        rates = np.array([3.45, 2.85, 0.0, 4.1])
+        terms = np.array([300, 120, 240, 360])
+        saved = calc_interest_saved(800_000, amounts, rates, terms, repayment_method, method)
+        assert saved.shape == (4,)
+        for i in range(4):
+            scalar = calc_interest_saved(
+                800_000, float(amounts[i]), float(rates[i]), int(terms[i]), repayment_method, method,
+            )
+            assert isinstance(scalar, float)
+            assert abs(saved[i] - scalar) < 1e-6
+
+    def test_grid_broadcast(self):
+        amounts = np.linspace(10_000, 300_000, 30)[:, None]
+        rates = np.array([2.85, 3.45])[None, :]
+        terms, monthly = calc_reduce_payment(
+            800_000, amounts, rates, 300, RepaymentMethod.EQUAL_INSTALLMENT.value,
+        )
+        assert monthly.shape == terms.shape == (30, 2)
+        new_term, _ = calc_shorten_term(
+            800_000, amounts, rates, 4462, RepaymentMethod.EQUAL_INSTALLMENT.value,
+        )
+        assert new_term.dtype == np.int64
+        assert (np.diff(new_term, axis=0) <= 0).all()
+
+
 class TestApplyPrepayment:
     def test_schedule_updated(self):
         sch = generate_schedule(
@@ -102,3 +134,46 @@ class TestApplyPrepayment:
         assert len(new_sch) < len(sch)
         assert info["remaining_principal_after"] < info["remaining_principal_before"]
         assert info["interest_saved"] > 0
+
+    def test_two_prepayments_in_one_period_stack(self):
+        # 同一期的第二笔提前还款从第一笔之后的余额开始，两笔都计入本金
+        start = date(2024, 1, 15)
+        sch = generate_schedule(
+            "test", 1_000_000, 3.45, 360, RepaymentMethod.EQUAL_INSTALLMENT.value, start,
+        )
+        args = (PrepaymentMethod.REDUCE_PAYMENT.value, 3.45, RepaymentMethod.EQUAL_INSTALLMENT.value, start, 15)
+        first, info1 = apply_prepayment("test", sch, 13, 100000, *args)
+        second, info2 = apply_prepayment("test", first, 13, 50000, *args)
+        assert info1["remaining_principal_before"] == pytest.approx(sch.iloc[11]["remaining_principal"])
+        assert info2["remaining_principal_before"] == pytest.approx(info1["remaining_principal_after"])
+        assert info2["remaining_principal_after"] == pytest.approx(info1["remaining_principal_after"] - 50000)
+        assert second["principal"].sum() == pytest.approx(1_000_000 - 150000)
+        assert second.iloc[-1]["remaining_principal"] == pytest.approx(0, abs=0.01)
+
+
+class TestPrepaymentGrid:
+    def test_grid_matches_point_calculation(self):
+        sch = generate_schedule(
+            "test", 1_000_000, 3.45, 360,
+            RepaymentMethod.EQUAL_INSTALLMENT.value,
+            date(2024, 1, 1),
+        )
+        amounts = np.linspace(10_000, 1_000_000, 100)
+        grid = prepayment_grid(sch, amounts, RepaymentMethod.EQUAL_INSTALLMENT.value, from_period=13)
+        assert grid.interest_saved.shape == (348, 100, 2)
+        assert grid.periods[0] == 13
+
+        row = sch[sch["period"] == 13].iloc[0]
+        remaining = row["remaining_principal"] + row["principal"]
+        k = grid.method_index(PrepaymentMethod.REDUCE_PAYMENT.value)
+        expected = calc_interest_saved(
+            remaining, amounts[19], 3.45, 348,
+            RepaymentMethod.EQUAL_INSTALLMENT.value, PrepaymentMethod.REDUCE_PAYMENT.value,
+        )
+        assert grid.interest_saved[0, 19, k] == pytest.approx(expected)
+        # 减少月供期数不变
+        assert grid.new_term[0, 19, k] == 348
+        assert grid.new_term[10, 0, k] == 338
+        # 金额超过剩余本金的格子无效
+        assert np.isnan(grid.interest_saved[-1, -1]).all()
+        assert (grid.new_term[-1, -1] == -1).all()
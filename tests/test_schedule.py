@@ -0,0 +1,142 @@
+"""列式还款计划测试"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from datetime import date
+import numpy as np
+import pandas as pd
+from core.calculator import build_schedule, generate_schedule
+from core.prepayment import apply_prepayment
+from core.rate_adjustment import apply_rate_adjustment
+from core.schedule import Schedule, MONEY_COLUMNS, merge_components
+from config.constants import RepaymentMethod, PrepaymentMethod, REPAYMENT_SCHEDULE_COLUMNS
+
+
+def _build():
+    return build_schedule(
+        "test", 1_000_000, 3.45, 360,
+        RepaymentMethod.EQUAL_INSTALLMENT.value,
+        date(2024, 1, 31), 31,
+    )
+
+
+class TestSchedule:
+    def test_column_dtypes(self):
+        sch = _build()
+        assert sch.period.dtype == np.int32
+        assert sch.due_date.dtype == np.dtype("datetime64[D]")
+        for col in MONEY_COLUMNS:
+            assert getattr(sch, col).dtype == np.float64
+
+    def test_frame_roundtrip(self):
+        sch = _build()
+        df = sch.to_frame()
+        assert list(df.columns) == REPAYMENT_SCHEDULE_COLUMNS
+        assert df["due_date"].iloc[0] == "2024-02-29"
+        back = Schedule.from_frame(df)
+        assert back.plan_id == "test"
+        np.testing.assert_array_equal(back.period, sch.period)
+        np.testing.assert_array_equal(back.due_date, sch.due_date)
+        np.testing.assert_array_equal(back.remaining_principal, sch.remaining_principal)
+
+    def test_from_frame_coerces_strings(self):
+        df = generate_schedule(
+            "test", 100_000, 3.0, 12,
+            RepaymentMethod.EQUAL_PRINCIPAL.value, date(2024, 1, 1),
+        )
+        df["principal"] = df["principal"].astype(str)
+        sch = Schedule.from_frame(df)
+        assert sch.principal.dtype == np.float64
+        assert abs(sch.principal.sum() - 100_000) < 0.01
+
+    def test_period_lookup(self):
+        sch = _build()
+        assert sch.index_of(1) == 0
+        assert sch.index_of(360) == 359
+        assert sch.index_of(361) == -1
+        assert abs(sch.opening_principal(1) - 1_000_000) < 1e-6
+        assert sch.opening_principal(361) == sch.remaining_principal[-1]
+        assert len(sch.before(13)) == 12
+
+    def test_apply_events_keep_schedule_type(self):
+        sch = _build()
+        sch, _ = apply_rate_adjustment(
+            "test", sch, 13, 3.1,
+            RepaymentMethod.EQUAL_INSTALLMENT.value, date(2024, 1, 31), 31,
+        )
+        assert isinstance(sch, Schedule)
+        new_sch, info = apply_prepayment(
+            "test", sch, 25, 200_000,
+            PrepaymentMethod.SHORTEN_TERM.value,
+            3.1, RepaymentMethod.EQUAL_INSTALLMENT.value,
+            date(2024, 1, 31), 31,
+        )
+        assert isinstance(new_sch, Schedule)
+        assert len(new_sch) < len(sch)
+
+        # DataFrame 输入仍返回 DataFrame，结果与列式路径一致
+        df_sch, df_info = apply_prepayment(
+            "test", sch.to_frame(), 25, 200_000,
+            PrepaymentMethod.SHORTEN_TERM.value,
+            3.1, RepaymentMethod.EQUAL_INSTALLMENT.value,
+            date(2024, 1, 31), 31,
+        )
+        assert isinstance(df_sch, pd.DataFrame)
+        assert df_info == info
+        np.testing.assert_allclose(df_sch["interest"].to_numpy(), new_sch.interest)
+
+
+class TestSegments:
+    def test_events_append_segments(self):
+        sch = _build()
+        for period in (13, 25, 37):
+            sch, _ = apply_prepayment(
+                "test", sch, period, 50_000,
+                PrepaymentMethod.REDUCE_PAYMENT.value,
+                3.45, RepaymentMethod.EQUAL_INSTALLMENT.value,
+                date(2024, 1, 31), 31,
+            )
+        assert sch.segment_count == 4
+        assert len(sch) == 360
+        np.testing.assert_array_equal(sch.period, np.arange(1, 361))
+        assert not sch.principal.flags.writeable
+
+    def test_lazy_generation(self):
+        sch = _build()
+        segment = sch._parts[0][0]
+        assert segment._columns is None
+        assert len(sch.before(100)) == 99
+        assert segment._columns is None
+        sch.value_at("interest", 100)
+        assert segment._columns is not None
+
+    def test_window_and_total(self):
+        sch = _build()
+        sch, _ = apply_rate_adjustment(
+            "test", sch, 121, 4.0,
+            RepaymentMethod.EQUAL_INSTALLMENT.value, date(2024, 1, 31), 31,
+        )
+        window = sch.window(115, 126)
+        assert window.period.tolist() == list(range(115, 127))
+        assert window.segment_count == 2
+        np.testing.assert_allclose(window.interest, sch.interest[114:126])
+        assert abs(sch.total("interest", 121) - sch.interest[120:].sum()) < 1e-6
+        assert sch.value_at("applied_rate", 120) == 3.45
+        assert sch.value_at("applied_rate", 121) == 4.0
+
+
+class TestMergeComponents:
+    def test_pads_flows_and_carries_cumulative(self):
+        longer = build_schedule("c", 600_000, 3.45, 24, RepaymentMethod.EQUAL_INSTALLMENT.value, date(2024, 1, 1))
+        shorter = build_schedule("p", 400_000, 2.85, 12, RepaymentMethod.EQUAL_INSTALLMENT.value, date(2024, 1, 1))
+        merged = merge_components("m", shorter, longer, 3.45)
+        assert len(merged) == 24 and merged.plan_id == "m"
+        np.testing.assert_allclose(merged.principal[:12], longer.principal[:12] + shorter.principal)
+        np.testing.assert_allclose(merged.principal[12:], longer.principal[12:])
+        np.testing.assert_allclose(
+            merged.cumulative_interest[12:],
+            longer.cumulative_interest[12:] + shorter.cumulative_interest[-1],
+        )
+        assert abs(merged.cumulative_principal[-1] - 1_000_000) < 1e-6
+        assert (merged.applied_rate == 3.45).all()
@@ -0,0 +1,121 @@
+"""还款计划动态生成测试"""
+import sys
+import threading
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+import pytest
+import core.schedule_generator as sg
+from core.schedule_generator import (
+    clear_replay_cache, generate_plan_schedule_from_events, generate_plan_schedules, resolve_plan_periods,
+)
+
+
+@pytest.fixture
+def counted_prepayments(monkeypatch):
+    calls = []
+    original = sg.apply_prepayment
+
+    def counting(*args, **kwargs):
+        calls.append(args[2])
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(sg, "apply_prepayment", counting)
+    clear_replay_cache()
+    yield calls
+    clear_replay_cache()
+
+
+class TestReplayCheckpoints:
+    @pytest.mark.parametrize("loan_type", ["commercial", "combined"])
+    def test_cached_result_identical(self, loan_type, counted_prepayments, make_plan, make_prepayments):
+        plan, pps = make_plan(loan_type), make_prepayments(10)
+        first = generate_plan_schedule_from_events(plan, pps)
+        replayed = len(counted_prepayments)
+        second = generate_plan_schedule_from_events(plan, pps)
+        assert len(counted_prepayments) == replayed
+        pd.testing.assert_frame_equal(first, second)
+
+    def test_edit_replays_from_first_changed_event(self, counted_prepayments, make_plan, make_prepayments):
+        plan, pps = make_plan(), make_prepayments(10)
+        generate_plan_schedule_from_events(plan, pps)
+        counted_prepayments.clear()
+
+        pps.loc[8, "amount"] = 20_000
+        edited = generate_plan_schedule_from_events(plan, pps)
+        assert counted_prepayments == [12 + 6 * 8, 12 + 6 * 9]
+
+        clear_replay_cache()
+        full = generate_plan_schedule_from_events(plan, pps)
+        pd.testing.assert_frame_equal(edited, full)
+
+    def test_plan_change_invalidates(self, counted_prepayments, make_plan, make_prepayments):
+        plan, pps = make_plan(), make_prepayments(3)
+        generate_plan_schedule_from_events(plan, pps)
+        counted_prepayments.clear()
+        plan["commercial_rate"] = 4.1
+        sch = generate_plan_schedule_from_events(plan, pps)
+        assert len(counted_prepayments) == 3
+        assert sch["applied_rate"].iloc[0] == 4.1
+
+    def test_concurrent_replays_with_eviction(self, monkeypatch, make_plan, make_prepayments):
+        # 缓存很小时多线程同时查找、插入、淘汰，不应出错
+        monkeypatch.setattr(sg, "REPLAY_CACHE_SIZE", 4)
+        clear_replay_cache()
+        errors = []
+
+        def worker(n):
+            try:
+                for i in range(20):
+                    plan = make_plan()
+                    plan["commercial_rate"] = 3.0 + (n * 20 + i) % 7 / 10
+                    generate_plan_schedule_from_events(plan, make_prepayments(6))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        clear_replay_cache()
+        assert errors == []
+
+
+class TestRateAdjustmentMapping:
+    def test_effective_date_resolves_to_period(self, make_plan):
+        plan = make_plan()
+        ras = pd.DataFrame([
+            {"adjustment_id": "r1", "plan_id": "P1", "effective_date": "2021-01-16",
+             "effective_period": None, "rate_type": "commercial", "old_rate": 3.45, "new_rate": 4.1},
+            {"adjustment_id": "r2", "plan_id": "P1", "effective_date": "2060-01-01",
+             "effective_period": None, "rate_type": "commercial", "old_rate": 4.1, "new_rate": 3.0},
+        ])
+        sch = generate_plan_schedule_from_events(plan, None, ras)
+        # 2021-01-16 之后的第一个还款日是 2021-02-15，即第 13 期；超出范围的调整被忽略
+        assert sch.loc[sch["period"] == 12, "applied_rate"].item() == 3.45
+        assert (sch.loc[sch["period"] >= 13, "applied_rate"] == 4.1).all()
+        assert resolve_plan_periods(plan, ["2021-01-16", "2060-01-01"]).tolist() == [13, 0]
+
+
+class TestPlanSchedules:
+    def test_combined_bundle_matches_merged(self, make_plan, make_prepayments):
+        bundle = generate_plan_schedules(make_plan("combined"), make_prepayments(5))
+        assert bundle.is_combined
+        merged = bundle.to_frame()
+        commercial, provident = bundle.to_frame("commercial"), bundle.to_frame("provident")
+        assert commercial["plan_id"].iloc[0] == "P1_c"
+        n = len(provident)
+        np.testing.assert_allclose(
+            merged["principal"].to_numpy()[:n],
+            commercial["principal"].to_numpy()[:n] + provident["principal"].to_numpy(),
+        )
+        pd.testing.assert_frame_equal(merged, generate_plan_schedule_from_events(make_plan("combined"), make_prepayments(5)))
+
+    def test_single_loan_has_no_components(self, make_plan, make_prepayments):
+        bundle = generate_plan_schedules(make_plan(), make_prepayments(2))
+        assert not bundle.is_combined
+        empty = bundle.to_frame("provident")
+        assert empty.empty and "remaining_principal" in empty.columns
@@ -0,0 +1,90 @@
+"""物化还款计划持久化缓存测试"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+import pytest
+import core.schedule_generator as sg
+import data_manager.excel_handler as excel_handler
+from config import settings
+from core.schedule import COLUMN_DTYPES
+from core.schedule_store import plan_fingerprint, load_schedules, save_schedules, clear_schedule_store
+
+
+def _is_memory_mapped(values: np.ndarray) -> bool:
+    while values is not None:
+        if isinstance(values, np.memmap):
+            return True
+        values = getattr(values, "base", None)
+    return False
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch, make_plan, make_prepayments):
+    """get_plan_schedules 改为从内存数据读取，缓存写入临时目录"""
+    data = {"prepayments": make_prepayments(5), "replays": 0}
+    monkeypatch.setattr(settings, "SCHEDULE_STORE_DIR", tmp_path / "store")
+    monkeypatch.setattr(excel_handler, "get_plan_by_id", lambda plan_id: make_plan("combined"))
+    monkeypatch.setattr(excel_handler, "get_prepayments", lambda plan_id: data["prepayments"])
+    monkeypatch.setattr(excel_handler, "get_rate_adjustments", lambda plan_id: pd.DataFrame())
+    original = sg.generate_plan_schedules
+
+    def counting(*args, **kwargs):
+        data["replays"] += 1
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(sg, "generate_plan_schedules", counting)
+    return data
+
+
+class TestScheduleStore:
+    def test_round_trip_memory_mapped(self, tmp_path, make_plan, make_prepayments):
+        expected = sg.generate_plan_schedules(make_plan("combined"), make_prepayments(3))
+        components = {"merged": expected.merged, "commercial": expected.commercial}
+        save_schedules(tmp_path, "P1", "fp", components)
+        loaded = load_schedules(tmp_path, "P1", "fp")
+        assert set(loaded) == {"merged", "commercial"}
+        for which, sch in components.items():
+            assert loaded[which].plan_id == sch.plan_id
+            for name in COLUMN_DTYPES:
+                np.testing.assert_array_equal(loaded[which].column(name), sch.column(name))
+            assert _is_memory_mapped(loaded[which].monthly_payment)
+        assert load_schedules(tmp_path, "P1", "other") is None
+
+    def test_fingerprint_tracks_events(self, make_plan, make_prepayments):
+        base = plan_fingerprint(make_plan("combined"), make_prepayments(3), None)
+        assert plan_fingerprint(make_plan("combined"), make_prepayments(3), pd.DataFrame()) == base
+        assert plan_fingerprint(make_plan("combined"), make_prepayments(4), None) != base
+        assert plan_fingerprint(make_plan("combined").replace(3.45, 3.5), make_prepayments(3), None) != base
+
+    def test_fingerprint_tracks_money_mode(self, monkeypatch, make_plan, make_prepayments):
+        base = plan_fingerprint(make_plan("combined"), make_prepayments(3))
+        monkeypatch.setattr(settings, "MONEY_MODE", "fen")
+        fen = plan_fingerprint(make_plan("combined"), make_prepayments(3))
+        assert fen != base
+        monkeypatch.setattr(settings, "FEN_ROUNDING", "half_even")
+        assert plan_fingerprint(make_plan("combined"), make_prepayments(3)) not in (base, fen)
+
+    def test_get_plan_schedules_reuses_store(self, store):
+        first = sg.get_plan_schedules("P1")
+        second = sg.get_plan_schedules("P1")
+        assert store["replays"] == 1
+        assert second.is_combined
+        pd.testing.assert_frame_equal(first.to_frame(), second.to_frame())
+
+    def test_event_change_regenerates_and_prunes(self, store, make_prepayments):
+        sg.get_plan_schedules("P1")
+        store["prepayments"] = make_prepayments(6)
+        sg.get_plan_schedules("P1")
+        assert store["replays"] == 2
+        assert len(list(settings.SCHEDULE_STORE_DIR.iterdir())) == 1
+        clear_schedule_store(settings.SCHEDULE_STORE_DIR, "P1")
+        assert not list(settings.SCHEDULE_STORE_DIR.iterdir())
+
+    def test_delete_plan_clears_store(self, store, tmp_path):
+        sg.get_plan_schedules("P1")
+        assert list(settings.SCHEDULE_STORE_DIR.iterdir())
+        excel_handler.delete_plan("P1", tmp_path / "data.xlsx")
+        assert not list(settings.SCHEDULE_STORE_DIR.iterdir())
@@ -0,0 +1,106 @@
+"""SQLite 存储后端测试"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+import pandas as pd
+
+from data_manager.excel_handler import (
+    init_excel, read_sheet, transaction,
+    save_plan, get_all_plans, get_plan_by_id, delete_plan,
+    get_rate_adjustments, save_rate_adjustment,
+    get_prepayments, save_prepayment, update_prepayment,
+    get_config, set_config, get_all_config,
+)
+from data_manager import sqlite_handler
+from config.constants import SHEET_LOAN_PLANS, SHEET_PREPAYMENTS
+
+
+PLAN = {
+    "plan_id": "p-001",
+    "plan_name": "测试方案",
+    "loan_type": "commercial",
+    "total_amount": 1000000,
+    "commercial_amount": 1000000,
+    "provident_amount": 0,
+    "term_months": 360,
+    "repayment_method": "equal_installment",
+    "commercial_rate": 3.45,
+    "provident_rate": 0,
+    "start_date": "2024-01-01",
+    "repayment_day": 1,
+    "status": "active",
+    "notes": "",
+}
+
+
+@pytest.fixture
+def temp_db(tmp_path):
+    filepath = tmp_path / "test_data.db"
+    init_excel(filepath)
+    yield filepath
+    sqlite_handler.close(filepath)
+
+
+class TestSqliteBackend:
+    def test_default_config(self, temp_db):
+        assert float(get_config("lpr_5y", temp_db)) > 0
+        assert "provident_limit" in get_all_config(temp_db)["key"].tolist()
+
+    def test_plan_crud(self, temp_db):
+        save_plan(PLAN, temp_db)
+        save_plan(dict(PLAN, plan_id="p-002", plan_name="方案二"), temp_db)
+        save_plan(dict(PLAN, plan_name="改名"), temp_db)
+        plans = get_all_plans(temp_db)
+        assert plans["plan_id"].tolist() == ["p-001", "p-002"]
+        assert get_plan_by_id("p-001", temp_db)["plan_name"] == "改名"
+        assert get_plan_by_id("missing", temp_db) is None
+
+    def test_events_and_delete(self, temp_db):
+        save_plan(PLAN, temp_db)
+        save_prepayment({"prepayment_id": "pp1", "plan_id": "p-001", "amount": 100000.0}, temp_db)
+        save_prepayment({"prepayment_id": "pp2", "plan_id": "other", "amount": 50000.0}, temp_db)
+        save_rate_adjustment({"adjustment_id": "a1", "plan_id": "p-001", "new_rate": 3.1}, temp_db)
+        assert get_prepayments("p-001", temp_db)["prepayment_id"].tolist() == ["pp1"]
+        assert update_prepayment("pp1", {"amount": 80000.0}, temp_db)
+        assert not update_prepayment("missing", {"amount": 1.0}, temp_db)
+        assert get_prepayments("p-001", temp_db).iloc[0]["amount"] == 80000.0
+
+        delete_plan("p-001", temp_db)
+        assert get_plan_by_id("p-001", temp_db) is None
+        assert get_prepayments("p-001", temp_db).empty
+        assert get_rate_adjustments("p-001", temp_db).empty
+        assert len(get_prepayments("other", temp_db)) == 1
+
+    def test_set_config(self, temp_db):
+        set_config("lpr_5y", "3.60", "", temp_db)
+        set_config("new_key", "v", "新配置", temp_db)
+        assert get_config("lpr_5y", temp_db) == "3.60"
+        assert get_config("new_key", temp_db) == "v"
+
+    def test_transaction_rollback(self, temp_db):
+        with pytest.raises(RuntimeError):
+            with transaction(temp_db):
+                save_plan(PLAN, temp_db)
+                raise RuntimeError
+        assert get_all_plans(temp_db).empty
+
+    def test_point_lookups_use_index(self, temp_db):
+        conn = sqlite_handler._connect(temp_db)
+        plan = conn.execute("EXPLAIN QUERY PLAN SELECT * FROM prepayments WHERE plan_id = ?", ("x",)).fetchall()
+        assert "idx_prepayments_plan_id" in str(plan)
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    def test_excel_round_trip(self, temp_db, tmp_path):
+        save_plan(PLAN, temp_db)
+        save_prepayment({"prepayment_id": "pp1", "plan_id": "p-001", "amount": 100000.0}, temp_db)
+        xlsx = tmp_path / "export.xlsx"
+        sqlite_handler.export_excel(xlsx, temp_db)
+        assert read_sheet(SHEET_LOAN_PLANS, xlsx)["plan_id"].tolist() == ["p-001"]
+
+        other = tmp_path / "imported.db"
+        sqlite_handler.import_excel(xlsx, other)
+        assert get_plan_by_id("p-001", other)["term_months"] == 360
+        assert read_sheet(SHEET_PREPAYMENTS, other)["amount"].tolist() == [100000.0]
+        sqlite_handler.close(other)
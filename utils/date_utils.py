@@ -1,4 +1,7 @@
 from datetime import date
+from functools import lru_cache
+
+import numpy as np
 from dateutil.relativedelta import relativedelta
 
 
@@ -17,6 +20,46 @@ def get_due_date(start_date: date, period: int, repayment_day: int) -> date:
     return target.replace(day=day)
 
 
+def clamp_due_dates(months: np.ndarray, repayment_day) -> np.ndarray:
+    """datetime64[M] 月份数组 -> 当月还款日（datetime64[D]），超出当月天数时取月末"""
+    month_start = months.astype("datetime64[D]")
+    month_len = ((months + 1).astype("datetime64[D]") - month_start).astype(np.int64)
+    return month_start + (np.minimum(repayment_day, month_len) - 1)
+
+
+@lru_cache(maxsize=512)
+def _due_date_calendar(year: int, month: int, repayment_day: int, periods: int) -> np.ndarray:
+    first_month = np.datetime64(f"{year:04d}-{month:02d}", "M")
+    due = clamp_due_dates(first_month + np.arange(1, periods + 1), repayment_day)
+    due.setflags(write=False)
+    return due
+
+
+def format_dates(dates: np.ndarray) -> np.ndarray:
+    """datetime64[D] 数组 -> YYYY-MM-DD 字符串数组（只格式化传入的日期）"""
+    return np.datetime_as_string(np.asarray(dates, dtype="datetime64[D]"), unit="D")
+
+
+def get_due_dates(start_date: date, periods: int, repayment_day: int) -> np.ndarray:
+    """
+    一次性计算第 1..periods 期的还款日，返回只读 datetime64[D] 数组。
+
+    结果按 (起始年月, 还款日, 期数) 缓存，事件重放、提前还款预览和图表共享同一份日历。
+    """
+    return _due_date_calendar(start_date.year, start_date.month, int(repayment_day), int(periods))
+
+
+def periods_on_or_after(start_date: date, periods: int, repayment_day: int, dates) -> np.ndarray:
+    """
+    将日期映射为期数：还款日不早于该日期的第一期（从 1 开始），超出计划范围为 0。
+
+    在缓存的还款日历上一次 searchsorted 完成，dates 可为单个日期或日期序列。
+    """
+    calendar = get_due_dates(start_date, periods, repayment_day)
+    idx = np.searchsorted(calendar, np.asarray(dates, dtype="datetime64[D]"), side="left")
+    return np.where(idx < len(calendar), idx + 1, 0)
+
+
 def months_between(d1: date, d2: date) -> int:
     """计算两个日期之间的月数（向上取整）"""
     delta = relativedelta(d2, d1)